@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+'''
+End-to-end benchmark of exporting reports through `Host`, `Course`,
+`Assignment` and `Dashboard` against the mock zyBooks server in
+`benchmarks.MockZyBooks`.
+For each scenario, the wall time, the number of requests received by the
+server (by endpoint), and the peak memory allocated by the client
+(traced with `tracemalloc`) are reported.
+
+The server runs in a child process, so that neither its CPU time nor its
+memory is counted against the client.
+
+Usage (from the repository root):
+	python3 -m benchmarks.BenchEndToEnd --students 2000 --sections 16
+	python3 -m benchmarks.BenchEndToEnd --error-rate 0.05 --scenarios many-section
+'''
+
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from typing import Callable, Dict, List, Tuple
+
+import requests
+
+from zyAPI.Auth.Token import Token
+from zyAPI.Due.Datetime import Datetime
+from zyAPI.Due.DueWithExtensions import DueWithExtensions
+from zyAPI.Due.DueWithVectorPolicy import DueWithVectorPolicy
+from zyAPI.ExportPoller import PollPolicy
+from zyAPI.Host import Host
+from zyAPI.Instrumentation import Instrumentation, MetricsCollector
+from zyAPI.Interfaces.Dashboard import Dashboard
+from zyAPI.RateLimiter import RateLimiter
+
+from .MockZyBooks import AddServerArgs, GetServerArgv
+
+
+TZ = 'America/Los_Angeles'
+DUE_DATE = Datetime.FromComponents(2024, 3, 8, 23, 59, 59, TZ)
+LATE_DATE = Datetime.FromComponents(2024, 3, 10, 23, 59, 59, TZ)
+EXTENDED_DATE = Datetime.FromComponents(2024, 3, 12, 23, 59, 59, TZ)
+
+
+class MockServerProcess(object):
+	'''
+	A `benchmarks.MockZyBooks` server running in a child process.
+	'''
+
+	def __init__(self, serverArgs: List[str]) -> None:
+		super(MockServerProcess, self).__init__()
+
+		repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+		self.proc = subprocess.Popen(
+			[
+				sys.executable, '-m', 'benchmarks.MockZyBooks',
+				'--port', '0',
+			] + serverArgs,
+			cwd=repoDir,
+			stdout=subprocess.PIPE,
+			text=True,
+		)
+
+		line = self.proc.stdout.readline()
+		match = re.match(r'^Serving on (http://(.+))$', line.strip())
+		if match is None:
+			self.proc.kill()
+			raise RuntimeError(f'Mock server failed to start: {line!r}')
+		self.baseUrl = match.group(1)
+		self.host = match.group(2)
+
+	def __enter__(self) -> 'MockServerProcess':
+		return self
+
+	def __exit__(self, excType, excValue, traceback) -> None:
+		self.proc.terminate()
+		self.proc.wait()
+
+	def GetStats(self) -> dict:
+		return requests.get(f'{self.baseUrl}/mock/stats').json()
+
+	def ResetStats(self) -> None:
+		requests.get(f'{self.baseUrl}/mock/reset').raise_for_status()
+
+
+def CreateDashboard(
+	server: MockServerProcess,
+	args: argparse.Namespace,
+) -> Tuple[Host, Dashboard, MetricsCollector]:
+	metrics = MetricsCollector()
+	rateLimiter = None
+	if args.rate is not None:
+		rates = { kind: args.rate for kind in RateLimiter.DEFAULT_RATES }
+		rateLimiter = RateLimiter(rates=rates, bursts=rates)
+
+	host = Host(
+		server.host,
+		scheme='http',
+		pollPolicy=PollPolicy(
+			initialInterval=args.poll_interval,
+			maxInterval=max(args.poll_interval, 1.0),
+		),
+		rateLimiter=rateLimiter,
+		instrumentation=Instrumentation([ metrics ] if args.metrics else []),
+	)
+	dashboard = Dashboard(host=host, auth=Token('benchmark'), uid=1)
+	return host, dashboard, metrics
+
+
+def RunSingleSection(dashboard: Dashboard, args: argparse.Namespace) -> None:
+	course = dashboard.OpenCourse(courseCode='MockCourse1')
+	assignment = course.OpenAssignment(assignmentID=1001)
+	course.ExportReportByDate(
+		date=DUE_DATE,
+		secIds=assignment.sections.GetIdList()[:1],
+	)
+
+
+def RunManySection(dashboard: Dashboard, args: argparse.Namespace) -> None:
+	course = dashboard.OpenCourse(courseCode='MockCourse1')
+	assignment = course.OpenAssignment(assignmentID=1001)
+	assignment.ExportReportByDate(
+		date=DUE_DATE,
+		maxWorkers=args.max_workers,
+	)
+
+
+def RunMultiDue(dashboard: Dashboard, args: argparse.Namespace) -> None:
+	course = dashboard.OpenCourse(courseCode='MockCourse1')
+	assignment = course.OpenAssignment(assignmentID=1001)
+	dues = [
+		DueWithExtensions(
+			base=DueWithVectorPolicy(dueDate=DUE_DATE),
+			extensions={
+				f'student{i}@example.com': EXTENDED_DATE
+				for i in range(0, args.students, 10)
+			},
+		),
+		DueWithVectorPolicy(dueDate=LATE_DATE, multiplier=0.5),
+		# shares the export of the first due
+		DueWithVectorPolicy(dueDate=DUE_DATE, cap=90.0),
+	]
+	assignment.ExportReportWithDues(
+		dues=dues,
+		maxWorkers=args.max_workers,
+	)
+
+
+def RunMultiCourse(dashboard: Dashboard, args: argparse.Namespace) -> None:
+	courses = dashboard.OpenCourses(titlePattern=r'^Mock Course')
+
+	def _Export(course) -> None:
+		assignmentDues = [
+			(assignment, DueWithVectorPolicy(dueDate=DUE_DATE))
+			for assignment in course.OpenAssignments()
+		]
+		course.ExportGradebook(
+			assignmentDues=assignmentDues,
+			maxWorkers=args.max_workers,
+		)
+
+	for _, future in dashboard.ExportCourses(
+		courses,
+		export=_Export,
+		maxWorkers=args.max_workers,
+	):
+		future.result()
+
+
+SCENARIOS: Dict[str, Callable[[Dashboard, argparse.Namespace], None]] = {
+	'single-section': RunSingleSection,
+	'many-section': RunManySection,
+	'multi-due': RunMultiDue,
+	'multi-course': RunMultiCourse,
+}
+
+
+def RunScenario(
+	name: str,
+	server: MockServerProcess,
+	args: argparse.Namespace,
+) -> dict:
+	server.ResetStats()
+	host, dashboard, metrics = CreateDashboard(server, args)
+
+	tracemalloc.start()
+	start = time.perf_counter()
+	try:
+		SCENARIOS[name](dashboard, args)
+		wallTime = time.perf_counter() - start
+		_, peakMemory = tracemalloc.get_traced_memory()
+	finally:
+		tracemalloc.stop()
+
+	return {
+		'scenario': name,
+		'wallTime': wallTime,
+		'peakMemory': peakMemory,
+		'server': server.GetStats(),
+		'client': host.GetStats(),
+		'metrics': metrics.GetSummary(),
+		'metricsSummary': metrics.FormatSummary(),
+	}
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(
+		description='Benchmark report exports against a mock zyBooks server'
+	)
+	AddServerArgs(parser)
+	parser.add_argument(
+		'--scenarios', type=str, nargs='+',
+		choices=list(SCENARIOS.keys()), default=list(SCENARIOS.keys()),
+	)
+	parser.add_argument('--max-workers', type=int, default=4)
+	parser.add_argument('--poll-interval', type=float, default=0.1)
+	parser.add_argument(
+		'--rate', type=float, default=None,
+		help='requests per second of every rate limiter bucket ' +
+			'(the library defaults if not given)'
+	)
+	parser.add_argument(
+		'--metrics', action='store_true',
+		help='collect and print the instrumentation spans of each scenario'
+	)
+	parser.add_argument(
+		'--json', action='store_true',
+		help='print the results as JSON'
+	)
+	args = parser.parse_args()
+
+	results = []
+	with MockServerProcess(GetServerArgv(args)) as server:
+		for name in args.scenarios:
+			results.append(RunScenario(name, server, args))
+
+	if args.json:
+		for result in results:
+			result.pop('metricsSummary')
+		print(json.dumps(results, indent='\t'))
+		return 0
+
+	print(
+		f'students: {args.students}, sections: {args.sections}, ' +
+		f'assignments: {args.assignments}, courses: {args.courses}, ' +
+		f'pending: {args.pending}s, error rate: {args.error_rate}, ' +
+		f'throttle rate: {args.throttle_rate}'
+	)
+	for result in results:
+		stats = result['server']
+		endpoints = ', '.join(
+			f'{k}={v}' for k, v in sorted(stats.items())
+			if k in (
+				'export', 'status', 'download', 'assignments', 'items',
+				'injected',
+			)
+		)
+		print(
+			f'{result["scenario"]:16s} ' +
+			f'wall: {result["wallTime"]:8.3f}s  ' +
+			f'requests: {stats.get("requests", 0):5d} ({endpoints})  ' +
+			f'peak memory: {result["peakMemory"] / (1 << 20):8.2f} MiB'
+		)
+		if args.metrics:
+			print(result['metricsSummary'])
+			print()
+
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+'''
+Import-time benchmark of the zyAPI package and its CLI.
+Each target is imported in a fresh interpreter, several times, and the
+best time above a bare interpreter is reported.
+The light targets must not load pandas or numpy; if any of them does, or
+exceeds `--budget-ms`, the benchmark exits with a non-zero status, so it
+can be used as a check in CI.
+
+Usage (from the repository root):
+	python3 -m benchmarks.BenchImportTime
+	python3 -m benchmarks.BenchImportTime --budget-ms 150 --repeat 10
+'''
+
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from typing import List, Tuple
+
+
+HEAVY_MODULES = ('pandas', 'numpy')
+
+
+# (name, statement, is light, i.e., held to the budget)
+TARGETS: List[Tuple[str, str, bool]] = [
+	('zyAPI', 'import zyAPI', True),
+	('zyAPI.Host', 'import zyAPI.Host', True),
+	# aiohttp is what AsyncHost is for, so it isn't held to the budget
+	('zyAPI.AsyncHost', 'import zyAPI.AsyncHost', False),
+	('zyAPI.Due', 'import zyAPI.Due.DueWithVectorPolicy', True),
+	('zyAPI.Interfaces', 'import zyAPI.Interfaces.Dashboard', True),
+	('zyAPI.Utils', 'import zyAPI.Utils', True),
+	('zyAPI --version', 'import zyAPI.__main__', True),
+	('pandas (reference)', 'import pandas', False),
+]
+
+
+CHECK_TEMPLATE = '''
+import sys, time
+start = time.perf_counter()
+{statement}
+end = time.perf_counter()
+heavy = [ m for m in {heavy!r} if m in sys.modules ]
+print(end - start, ','.join(heavy))
+'''
+
+
+def TimeProcess(argv: List[str], repoDir: str) -> Tuple[float, str]:
+	start = time.perf_counter()
+	proc = subprocess.run(
+		argv,
+		cwd=repoDir,
+		stdout=subprocess.PIPE,
+		stderr=subprocess.PIPE,
+		text=True,
+	)
+	wallTime = time.perf_counter() - start
+	if proc.returncode != 0:
+		raise RuntimeError(f'{argv} failed: {proc.stderr.strip()}')
+	return wallTime, proc.stdout
+
+
+def MeasureTarget(
+	statement: str,
+	repeat: int,
+	repoDir: str,
+) -> Tuple[float, float, List[str]]:
+	'''
+	Returns the best wall time of a fresh interpreter running `statement`,
+	the best in-process time of the statement, and the heavy modules loaded.
+	'''
+	script = CHECK_TEMPLATE.format(statement=statement, heavy=HEAVY_MODULES)
+	bestWall = float('inf')
+	bestImport = float('inf')
+	heavy = []
+	for _ in range(repeat):
+		wallTime, out = TimeProcess([ sys.executable, '-c', script ], repoDir)
+		importTime, heavyStr = (out.strip().split(' ') + [ '' ])[:2]
+		bestWall = min(bestWall, wallTime)
+		bestImport = min(bestImport, float(importTime))
+		heavy = [ m for m in heavyStr.split(',') if m ]
+	return bestWall, bestImport, heavy
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(
+		description='Benchmark the import time of the zyAPI package'
+	)
+	parser.add_argument('--repeat', type=int, default=5)
+	parser.add_argument(
+		'--budget-ms', type=float, default=200.0,
+		help='the maximum import time of each light target, in milliseconds'
+	)
+	parser.add_argument(
+		'--json', action='store_true',
+		help='print the results as JSON'
+	)
+	args = parser.parse_args()
+
+	repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+	baseline, _, _ = MeasureTarget('pass', args.repeat, repoDir)
+
+	results = []
+	for name, statement, isLight in TARGETS:
+		wallTime, importTime, heavy = MeasureTarget(
+			statement,
+			args.repeat,
+			repoDir,
+		)
+		failures = []
+		if isLight and heavy:
+			failures.append(f'loads {", ".join(heavy)}')
+		if isLight and (importTime * 1000.0 > args.budget_ms):
+			failures.append(f'over budget of {args.budget_ms:.0f} ms')
+		results.append({
+			'target': name,
+			'importTime': importTime,
+			'wallTime': wallTime,
+			'overBaseline': wallTime - baseline,
+			'heavy': heavy,
+			'failures': failures,
+		})
+
+	# the CLI is also timed as a whole, as invoked by cron jobs
+	cliTime = float('inf')
+	for _ in range(args.repeat):
+		wallTime, _ = TimeProcess(
+			[ sys.executable, '-m', 'zyAPI', '--version' ],
+			repoDir,
+		)
+		cliTime = min(cliTime, wallTime)
+	cliFailures = []
+	if (cliTime - baseline) * 1000.0 > args.budget_ms:
+		cliFailures.append(f'over budget of {args.budget_ms:.0f} ms')
+	results.append({
+		'target': 'python -m zyAPI --version',
+		'importTime': None,
+		'wallTime': cliTime,
+		'overBaseline': cliTime - baseline,
+		'heavy': [],
+		'failures': cliFailures,
+	})
+
+	failed = any(result['failures'] for result in results)
+
+	if args.json:
+		print(json.dumps(
+			{ 'baseline': baseline, 'results': results },
+			indent='\t'
+		))
+		return 1 if failed else 0
+
+	print(f'bare interpreter: {baseline * 1000.0:8.1f} ms')
+	for result in results:
+		importTime = (
+			'' if result['importTime'] is None
+			else f'import: {result["importTime"] * 1000.0:8.1f} ms  '
+		)
+		print(
+			f'{result["target"]:28s} ' +
+			f'{importTime:24s}' +
+			f'wall: {result["wallTime"] * 1000.0:8.1f} ms ' +
+			f'(+{result["overBaseline"] * 1000.0:.1f} ms)' +
+			(
+				'  FAIL: ' + '; '.join(result['failures'])
+				if result['failures'] else ''
+			)
+		)
+
+	return 1 if failed else 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
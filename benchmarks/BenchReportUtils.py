@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+'''
+Benchmark `Report.MergeEmailCols` and `Report.CheckEmailsFormat` against
+their original row-by-row implementations on a synthetic roster.
+
+Usage (from the repository root):
+	python3 -m benchmarks.BenchReportUtils --rows 100000
+'''
+
+
+import argparse
+import re
+import sys
+import time
+
+import numpy
+import pandas
+
+from zyAPI.Utils import Report
+
+
+PREFERRED_EMAIL_FORMAT = r'@ucsc\.edu$'
+
+
+def MakeRoster(numRows: int, seed: int) -> pandas.DataFrame:
+	rng = numpy.random.default_rng(seed)
+
+	ids = numpy.arange(numRows)
+	# a third of the students use their school email as primary email,
+	# the others have a school email, a school email in another format,
+	# or none at all
+	priIsSchool = rng.random(numRows) < (1.0 / 3.0)
+	schKind = rng.integers(0, 3, numRows)
+
+	priEmails = numpy.where(
+		priIsSchool,
+		[ f'student{i}@ucsc.edu' for i in ids ],
+		[ f'student{i}@gmail.com' for i in ids ],
+	)
+	schEmails = numpy.array(
+		[
+			f'student{i}@ucsc.edu' if k == 0 else
+			(f'student{i}@alumni.example.edu' if k == 1 else numpy.nan)
+			for i, k in zip(ids, schKind)
+		],
+		dtype=object,
+	)
+
+	df = pandas.DataFrame({
+		'primary_email': priEmails,
+		'last_name': [ f'Last{i}' for i in ids ],
+		'first_name': [ f'First{i}' for i in ids ],
+		'school_email': schEmails,
+		'total': rng.random(numRows) * 100.0,
+	})
+	df.set_index('primary_email', inplace=True)
+	return df
+
+
+def RowWiseMergeEmailCols(
+	df: pandas.DataFrame,
+	preferredEmailFormat: str,
+) -> None:
+	# the original iterrows implementation, except for the last branch:
+	# the original left the email of such a row NaN, and its duplicate check
+	# failed once there were two of them
+	for index, row in df.iterrows():
+		if re.search(preferredEmailFormat, index):
+			df.at[index, 'email'] = index
+		elif pandas.isna(row['school_email']):
+			df.at[index, 'email'] = index
+		elif re.search(preferredEmailFormat, row['school_email']):
+			df.at[index, 'email'] = row['school_email']
+		else:
+			df.at[index, 'email'] = index
+
+	df.drop(columns=['school_email'], inplace=True)
+	df.reset_index(drop=True, inplace=True)
+	df.set_index('email', inplace=True)
+
+
+def RowWiseCheckEmailsFormat(df: pandas.DataFrame, emailFormat: str) -> list:
+	# the original iterrows implementation, returning the invalid emails
+	invalidEmails = []
+	for index, row in df.iterrows():
+		if not re.search(emailFormat, index):
+			invalidEmails.append({
+				'email': index,
+				'name': f'{row["first_name"]} {row["last_name"]}'
+			})
+	return invalidEmails
+
+
+def CheckEmailsFormat(df: pandas.DataFrame, emailFormat: str) -> list:
+	try:
+		Report.CheckEmailsFormat(df, emailFormat)
+	except ValueError as e:
+		return str(e)
+	return '[]'
+
+
+def Time(func, repeat: int) -> float:
+	best = float('inf')
+	for _ in range(repeat):
+		start = time.perf_counter()
+		func()
+		best = min(best, time.perf_counter() - start)
+	return best
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(
+		description='Benchmark the vectorized report email utilities'
+	)
+	parser.add_argument('--rows', type=int, default=100000)
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('--repeat', type=int, default=3)
+	parser.add_argument(
+		'--min-speedup', type=float, default=10.0,
+		help='exit with an error if the speedup is lower than this'
+	)
+	args = parser.parse_args()
+
+	roster = MakeRoster(args.rows, args.seed)
+
+	# correctness
+	expected = roster.copy()
+	RowWiseMergeEmailCols(expected, PREFERRED_EMAIL_FORMAT)
+	actual = roster.copy()
+	Report.MergeEmailCols(actual, PREFERRED_EMAIL_FORMAT)
+	pandas.testing.assert_frame_equal(expected, actual)
+
+	expectedInvalid = RowWiseCheckEmailsFormat(expected, PREFERRED_EMAIL_FORMAT)
+	actualInvalid = CheckEmailsFormat(actual, PREFERRED_EMAIL_FORMAT)
+	if actualInvalid != f'Invalid emails: {expectedInvalid}':
+		print('CheckEmailsFormat results differ', file=sys.stderr)
+		return 1
+
+	# timing; MergeEmailCols modifies the frame in place, so each run gets
+	# a fresh copy (which is included in both timings)
+	results = [
+		(
+			'MergeEmailCols',
+			Time(
+				lambda: RowWiseMergeEmailCols(
+					roster.copy(), PREFERRED_EMAIL_FORMAT
+				),
+				args.repeat,
+			),
+			Time(
+				lambda: Report.MergeEmailCols(
+					roster.copy(), PREFERRED_EMAIL_FORMAT
+				),
+				args.repeat,
+			),
+		),
+		(
+			'CheckEmailsFormat',
+			Time(
+				lambda: RowWiseCheckEmailsFormat(
+					expected, PREFERRED_EMAIL_FORMAT
+				),
+				args.repeat,
+			),
+			Time(
+				lambda: CheckEmailsFormat(actual, PREFERRED_EMAIL_FORMAT),
+				args.repeat,
+			),
+		),
+	]
+
+	ret = 0
+	print(f'rows: {args.rows}')
+	for name, rowWise, vectorized in results:
+		speedup = rowWise / vectorized
+		print(
+			f'{name:20s} row-wise: {rowWise:8.3f}s  ' +
+			f'vectorized: {vectorized:8.3f}s  speedup: {speedup:8.1f}x'
+		)
+		if speedup < args.min_speedup:
+			print(
+				f'{name} speedup is below {args.min_speedup}x',
+				file=sys.stderr
+			)
+			ret = 1
+
+	return ret
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+'''
+A local stand-in for the zyBooks API, serving synthetic courses,
+assignments and activity reports, for benchmarks and end-to-end tests.
+
+The server implements the endpoints used by `Host`, `Dashboard`, `Course`
+and `Assignment`:
+	GET /v1/user/<uid>
+	GET /v1/user/<uid>/items
+	GET /v1/zybook/<code>/roster
+	GET /v1/zybook/<code>/assignments
+	GET /v1/zybook/<code>/activities/export
+	GET /v1/export/<id>/status
+	GET /v1/export/<id>/<report filename>.csv
+and two control endpoints, which are neither counted nor subject to error
+injection:
+	GET /mock/stats
+	GET /mock/reset
+
+Usage (from the repository root):
+	python3 -m benchmarks.MockZyBooks --port 8080 --students 200
+and point a host at it with `Host('127.0.0.1:8080', scheme='http')`.
+'''
+
+
+import argparse
+import collections
+import datetime
+import http.server
+import itertools
+import json
+import random
+import re
+import sys
+import threading
+import time
+import urllib.parse
+
+from typing import Dict, List, Tuple, Union
+
+import numpy
+import pandas
+
+
+class MockZyBooks(object):
+	'''
+	A mock zyBooks server on a `ThreadingHTTPServer`.
+	`numCourses` courses have `numAssignments` assignments each, and each
+	assignment has `numSections` sections of its own; every course has
+	`numStudents` students, i.e., the number of rows of its reports.
+
+	- `requestLatency`: seconds added to every request.
+	- `exportLatency`: seconds added to every export request.
+	- `pendingDuration`: seconds an export stays `PENDING`.
+	- `errorRate`: fraction of requests answered with a 503.
+	- `throttleRate`: fraction of requests answered with a 429, with a
+	  `Retry-After` of `retryAfter` seconds.
+
+	It can be run in a background thread, e.g.,
+	```
+	with MockZyBooks(numStudents=1000) as server:
+		host = Host(server.GetHost(), scheme='http')
+	```
+	'''
+
+	EPOCH = datetime.datetime(1970, 1, 1)
+
+	def __init__(
+		self,
+		address: str='127.0.0.1',
+		port: int=0,
+		numCourses: int=2,
+		numAssignments: int=2,
+		numSections: int=8,
+		numStudents: int=200,
+		requestLatency: float=0.0,
+		exportLatency: float=0.0,
+		pendingDuration: float=0.5,
+		errorRate: float=0.0,
+		throttleRate: float=0.0,
+		retryAfter: int=0,
+		seed: int=0,
+	) -> None:
+		super(MockZyBooks, self).__init__()
+
+		if not (0.0 <= errorRate + throttleRate <= 1.0):
+			raise ValueError('errorRate + throttleRate must be in [0.0, 1.0]')
+
+		self.numCourses = numCourses
+		self.numAssignments = numAssignments
+		self.numSections = numSections
+		self.numStudents = numStudents
+		self.requestLatency = requestLatency
+		self.exportLatency = exportLatency
+		self.pendingDuration = pendingDuration
+		self.errorRate = errorRate
+		self.throttleRate = throttleRate
+		self.retryAfter = retryAfter
+		self.seed = seed
+
+		self.courses = self._BuildCourses()
+
+		self.lock = threading.Lock()
+		self.rand = random.Random(seed)
+		self.stats = collections.Counter()
+		# export ID -> (creation time, course code, export params)
+		self.exports = {}
+		self.exportIds = itertools.count(1)
+		# (course code, section IDs, end date) -> CSV bytes
+		self.reports = {}
+		self.reportLocks = collections.defaultdict(threading.Lock)
+
+		self.server = http.server.ThreadingHTTPServer(
+			(address, port),
+			self._MakeHandler(),
+		)
+		self.server.daemon_threads = True
+		self.thread = None
+
+	def __enter__(self) -> 'MockZyBooks':
+		self.Start()
+		return self
+
+	def __exit__(self, excType, excValue, traceback) -> None:
+		self.Stop()
+
+	def GetHost(self) -> str:
+		address, port = self.server.server_address[:2]
+		return f'{address}:{port}'
+
+	def GetBaseUrl(self) -> str:
+		return f'http://{self.GetHost()}'
+
+	def Start(self) -> None:
+		self.thread = threading.Thread(
+			target=self.server.serve_forever,
+			name=f'{self.__class__.__name__}',
+			daemon=True,
+		)
+		self.thread.start()
+
+	def Stop(self) -> None:
+		self.server.shutdown()
+		self.server.server_close()
+		if self.thread is not None:
+			self.thread.join()
+			self.thread = None
+
+	def GetStats(self) -> dict:
+		with self.lock:
+			return dict(self.stats)
+
+	def ResetStats(self) -> None:
+		with self.lock:
+			self.stats.clear()
+
+	def _BuildCourses(self) -> Dict[str, dict]:
+		courses = {}
+		for c in range(self.numCourses):
+			code = f'MockCourse{c + 1}'
+			assignments = []
+			for a in range(self.numAssignments):
+				sections = []
+				for s in range(self.numSections):
+					# distinct section numbers for every assignment of a
+					# course, since they share the same book
+					secIdx = a * self.numSections + s
+					part = 10 + 5 * (secIdx % 3)
+					chal = 5 + (secIdx % 4)
+					labs = 10 if (secIdx % 2) == 1 else 0
+					sections.append({
+						'canonical_section_id': (c + 1) * 100000 + secIdx + 1,
+						'chapter_number': 1 + (secIdx // 10),
+						'section_number': 1 + (secIdx % 10),
+						'title': f'{1 + (secIdx // 10)}.{1 + (secIdx % 10)} Section {secIdx + 1}',
+						'total_points': part + chal + labs,
+						'include_participations': True,
+						'include_challenges': True,
+						'include_labs': labs > 0,
+						# activity points, not part of the real payload
+						'_pts': { 'part': part, 'chal': chal, 'labs': labs },
+					})
+				assignments.append({
+					'assignment_id': (c + 1) * 1000 + a + 1,
+					'creator_user_id': 1,
+					'title': f'Mock Assignment {a + 1}',
+					'visible': 1,
+					'sections': sections,
+				})
+			courses[code] = {
+				'payload': {
+					'zybook_id': c + 1,
+					'zybook_code': code,
+					'title': f'Mock Course {c + 1}',
+				},
+				'assignments': assignments,
+				'sections': {
+					sec['canonical_section_id']: sec
+					for assignment in assignments
+					for sec in assignment['sections']
+				},
+			}
+		return courses
+
+	@classmethod
+	def _GetReportSuffix(cls, params: dict) -> str:
+		'''
+		The local time suffix of the report filename,
+		e.g., `2024-01-20_0759_PST`
+		'''
+		endDate = datetime.datetime.strptime(
+			params['end_date'], '%Y-%m-%dT%H:%M:%S.%fZ'
+		)
+		localDate = endDate - datetime.timedelta(
+			minutes=int(params['time_zone_offset'])
+		)
+		abbr = params['time_zone_abbreviation']
+		return f'{localDate.strftime("%Y-%m-%d_%H%M")}_{abbr}'
+
+	def _BuildReport(self, code: str, secIds: Tuple[int, ...], endDate: str) -> bytes:
+		course = self.courses[code]
+		secs = [ course['sections'][secId] for secId in secIds ]
+		numStudents = self.numStudents
+
+		endTs = (
+			datetime.datetime.strptime(endDate, '%Y-%m-%dT%H:%M:%S.%fZ') -
+			self.EPOCH
+		).total_seconds()
+
+		# activity columns in report order, i.e., by category then section
+		colNames = []
+		colPts = []
+		colKinds = []
+		pcts = []
+		for k, (kind, name) in enumerate((
+			('part', 'Participation'),
+			('chal', 'Challenge'),
+			('labs', 'Lab'),
+		)):
+			for sec in secs:
+				pts = sec['_pts'][kind]
+				colNames.append(
+					f'{sec["chapter_number"]}.{sec["section_number"]} - ' +
+					f'{name} ({pts})'
+				)
+				colPts.append(pts)
+				colKinds.append(kind)
+
+				rng = numpy.random.default_rng(
+					[ self.seed, sec['canonical_section_id'], k, int(endTs) ]
+				)
+				pct = numpy.round(rng.uniform(0.0, 100.0, numStudents), 2)
+				pct[rng.random(numStudents) < 0.2] = 100.0
+				pct[rng.random(numStudents) < 0.1] = numpy.nan
+				pcts.append(pct)
+
+		pctMat = numpy.column_stack(pcts)
+		ptsVec = numpy.array(colPts, dtype=float)
+		kinds = numpy.array(colKinds)
+		earned = numpy.nan_to_num(pctMat) * ptsVec / 100.0
+
+		def _TotalPct(mask: numpy.ndarray) -> Tuple[int, numpy.ndarray]:
+			total = ptsVec[mask].sum()
+			if total == 0.0:
+				return 0, numpy.zeros(numStudents)
+			return int(total), earned[:, mask].sum(axis=1) * 100.0 / total
+
+		ids = numpy.arange(numStudents)
+		data = {
+			'Last name': [ f'Last{i}' for i in ids ],
+			'First name': [ f'First{i}' for i in ids ],
+			'Primary email': [ f'student{i}@example.com' for i in ids ],
+			'School email': [
+				f'student{i}@ucsc.edu' if (i % 3) != 0 else ''
+				for i in ids
+			],
+		}
+		totalPts, totalPct = _TotalPct(numpy.ones(len(colPts), dtype=bool))
+		data[f'Total ({totalPts})'] = numpy.round(totalPct, 2)
+		for kind, name in (
+			('part', 'Participation'),
+			('chal', 'Challenge'),
+			('labs', 'Lab'),
+		):
+			kindPts, kindPct = _TotalPct(kinds == kind)
+			data[f'{name} total ({kindPts})'] = numpy.round(kindPct, 2)
+		for i, colName in enumerate(colNames):
+			data[colName] = pctMat[:, i]
+
+		return pandas.DataFrame(data).to_csv(index=False).encode('utf-8')
+
+	def _GetReport(self, code: str, secIds: Tuple[int, ...], endDate: str) -> bytes:
+		key = (code, secIds, endDate)
+		with self.lock:
+			reportLock = self.reportLocks[key]
+		# concurrent downloads of the same report only build it once
+		with reportLock:
+			with self.lock:
+				report = self.reports.get(key, None)
+			if report is None:
+				report = self._BuildReport(code, secIds, endDate)
+				with self.lock:
+					self.reports[key] = report
+		return report
+
+	def _InjectError(self) -> Union[Tuple[int, dict], None]:
+		with self.lock:
+			r = self.rand.random()
+		if r < self.errorRate:
+			return 503, {}
+		if r < self.errorRate + self.throttleRate:
+			return 429, { 'Retry-After': str(self.retryAfter) }
+		return None
+
+	def _Route(
+		self,
+		path: str,
+		query: Dict[str, str],
+	) -> Tuple[str, int, dict, Union[dict, bytes]]:
+		'''
+		Returns (endpoint, status, headers, JSON body or raw body).
+		'''
+		if path == '/mock/stats':
+			return 'mock', 200, {}, self.GetStats()
+		if path == '/mock/reset':
+			self.ResetStats()
+			return 'mock', 200, {}, { 'success': True }
+
+		if match := re.match(r'^/v1/user/(\d+)$', path):
+			return 'user', 200, {}, {
+				'success': True,
+				'user': { 'user_id': int(match.group(1)) },
+			}
+
+		if match := re.match(r'^/v1/user/(\d+)/items$', path):
+			return 'items', 200, {}, {
+				'success': True,
+				'items': {
+					'zybooks': [
+						course['payload'] for course in self.courses.values()
+					],
+				},
+			}
+
+		match = re.match(r'^/v1/zybook/([^/]+)/([a-z/]+)$', path)
+		if (match is not None) and (match.group(1) in self.courses):
+			code, endpoint = match.group(1), match.group(2)
+			course = self.courses[code]
+
+			if endpoint == 'roster':
+				return 'roster', 200, {}, {
+					'success': True,
+					'roster': {
+						'Student': [
+							{
+								'primary_email': f'student{i}@example.com',
+								'first_name': f'First{i}',
+								'last_name': f'Last{i}',
+							}
+							for i in range(self.numStudents)
+						],
+					},
+				}
+
+			if endpoint == 'assignments':
+				assignments = []
+				for assignment in course['assignments']:
+					assignment = dict(assignment)
+					assignment['sections'] = [
+						{ k: v for k, v in sec.items() if not k.startswith('_') }
+						for sec in assignment['sections']
+					]
+					assignments.append(assignment)
+				return 'assignments', 200, {}, {
+					'success': True,
+					'assignments': assignments,
+				}
+
+			if endpoint == 'activities/export':
+				if self.exportLatency > 0.0:
+					time.sleep(self.exportLatency)
+				secIds = json.loads(query['sections'])
+				unknown = [ s for s in secIds if s not in course['sections'] ]
+				if len(unknown) > 0:
+					return 'export', 400, {}, {
+						'success': False,
+						'error': { 'message': f'Unknown sections: {unknown}' },
+					}
+				with self.lock:
+					exportId = next(self.exportIds)
+					self.exports[exportId] = (time.monotonic(), code, query)
+				return 'export', 200, {}, {
+					'success': True,
+					'location': f'{self.GetBaseUrl()}/v1/export/{exportId}/status',
+				}
+
+		if match := re.match(r'^/v1/export/(\d+)/status$', path):
+			with self.lock:
+				export = self.exports.get(int(match.group(1)), None)
+			if export is None:
+				return 'status', 404, {}, {
+					'success': False,
+					'error': { 'message': 'Export not found' },
+				}
+			created, code, params = export
+			if time.monotonic() - created < self.pendingDuration:
+				return 'status', 200, {}, { 'success': True, 'state': 'PENDING' }
+			filename = f'report_{self._GetReportSuffix(params)}.csv'
+			return 'status', 200, {}, {
+				'success': True,
+				'state': 'SUCCESS',
+				'url': f'{self.GetBaseUrl()}/v1/export/{match.group(1)}/{filename}',
+			}
+
+		if match := re.match(r'^/v1/export/(\d+)/[^/]+\.csv$', path):
+			with self.lock:
+				export = self.exports.get(int(match.group(1)), None)
+			if export is None:
+				return 'download', 404, {}, b''
+			_, code, params = export
+			report = self._GetReport(
+				code,
+				tuple(json.loads(params['sections'])),
+				params['end_date'],
+			)
+			return 'download', 200, { 'Content-Type': 'text/csv' }, report
+
+		return 'unknown', 404, {}, {
+			'success': False,
+			'error': { 'message': f'Unknown path: {path}' },
+		}
+
+	def _MakeHandler(self) -> type:
+		server = self
+
+		class _Handler(http.server.BaseHTTPRequestHandler):
+
+			# keep connections alive, like the real service
+			protocol_version = 'HTTP/1.1'
+
+			def log_message(self, format: str, *args) -> None:
+				pass
+
+			def do_GET(self) -> None:
+				url = urllib.parse.urlsplit(self.path)
+				query = dict(urllib.parse.parse_qsl(url.query))
+				isControl = url.path.startswith('/mock/')
+
+				if (not isControl) and (server.requestLatency > 0.0):
+					time.sleep(server.requestLatency)
+
+				injected = None if isControl else server._InjectError()
+				if injected is not None:
+					status, headers = injected
+					endpoint, body = 'injected', { 'success': False }
+				elif (
+					(not isControl) and
+					(not self.headers.get('Authorization', '').startswith('Bearer '))
+				):
+					status, headers = 401, {}
+					endpoint, body = 'unauthorized', { 'success': False }
+				else:
+					endpoint, status, headers, body = server._Route(
+						url.path, query
+					)
+
+				if isinstance(body, dict):
+					body = json.dumps(body).encode('utf-8')
+					headers = { 'Content-Type': 'application/json', **headers }
+
+				if not isControl:
+					with server.lock:
+						server.stats['requests'] += 1
+						server.stats[endpoint] += 1
+						server.stats[f'status.{status}'] += 1
+						server.stats['bytesSent'] += len(body)
+
+				self.send_response(status)
+				for name, value in headers.items():
+					self.send_header(name, value)
+				self.send_header('Content-Length', str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+		return _Handler
+
+
+# command line options of the server: (option, type, default, keyword)
+SERVER_OPTIONS = [
+	('--courses', int, 2, 'numCourses'),
+	('--assignments', int, 2, 'numAssignments'),
+	('--sections', int, 8, 'numSections'),
+	('--students', int, 200, 'numStudents'),
+	('--request-latency', float, 0.0, 'requestLatency'),
+	('--export-latency', float, 0.0, 'exportLatency'),
+	('--pending', float, 0.5, 'pendingDuration'),
+	('--error-rate', float, 0.0, 'errorRate'),
+	('--throttle-rate', float, 0.0, 'throttleRate'),
+	('--retry-after', int, 0, 'retryAfter'),
+	('--seed', int, 0, 'seed'),
+]
+
+
+def _GetDest(option: str) -> str:
+	return option[2:].replace('-', '_')
+
+
+def AddServerArgs(parser: argparse.ArgumentParser) -> None:
+	for option, optType, default, _ in SERVER_OPTIONS:
+		parser.add_argument(option, type=optType, default=default)
+
+
+def GetServerArgv(args: argparse.Namespace) -> List[str]:
+	'''
+	The command line options to start a server with the same settings.
+	'''
+	argv = []
+	for option, _, _, _ in SERVER_OPTIONS:
+		argv += [ option, str(getattr(args, _GetDest(option))) ]
+	return argv
+
+
+def GetServerKwargs(args: argparse.Namespace) -> dict:
+	return {
+		keyword: getattr(args, _GetDest(option))
+		for option, _, _, keyword in SERVER_OPTIONS
+	}
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(
+		description='Run a mock zyBooks API server'
+	)
+	parser.add_argument('--address', type=str, default='127.0.0.1')
+	parser.add_argument('--port', type=int, default=8080)
+	AddServerArgs(parser)
+	args = parser.parse_args()
+
+	server = MockZyBooks(
+		address=args.address,
+		port=args.port,
+		**GetServerKwargs(args),
+	)
+	# the first line tells the parent process where the server is
+	print(f'Serving on {server.GetBaseUrl()}', flush=True)
+	try:
+		server.server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server.server_close()
+
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -33,4 +33,15 @@ setup(
 		'pandas==2.2.1',
 		'numpy==1.26.4',
 	],
+	extras_require={
+		'async': [
+			'aiohttp>=3.9',
+		],
+		'yaml': [
+			'pyyaml>=6.0',
+		],
+		'parquet': [
+			'pyarrow>=15.0',
+		],
+	},
 )
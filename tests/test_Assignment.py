@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import unittest
+
+import numpy
+import pandas
+
+from benchmarks.MockZyBooks import MockZyBooks
+from zyAPI.Auth.Token import Token
+from zyAPI.Due.Datetime import Datetime
+from zyAPI.Due.DueWithExtensions import DueWithExtensions
+from zyAPI.Due.DueWithLambdaPolicy import DueWithLambdaPolicy
+from zyAPI.ExportPoller import PollPolicy
+from zyAPI.Host import Host
+from zyAPI.Interfaces.Assignment import Section
+from zyAPI.Interfaces.Dashboard import Dashboard
+
+
+TZ = 'America/Los_Angeles'
+DATE = Datetime.FromComponents(2024, 3, 8, 23, 59, 59, TZ)
+LATE_DATE = Datetime.FromComponents(2024, 3, 10, 23, 59, 59, TZ)
+
+
+def _BaselineExportReportByDate(assignment, date):
+	'''
+	The report of an assignment as built by zyAPI before the batched and
+	index-aligned merges: one export per section, merged with
+	`pandas.merge`.
+	'''
+	dfs = {}
+	for sec in assignment.sections.sections:
+		secId = sec.id
+		_, df = assignment.course.ExportReportByDate(date=date, secIds=[ secId ])
+
+		colInfo = assignment.ParseReportHeader(list(df.columns))
+		names = {
+			df.columns[colInfo['idx']['lname']]: 'last_name',
+			df.columns[colInfo['idx']['fname']]: 'first_name',
+			df.columns[colInfo['idx']['priEmail']]: 'primary_email',
+			df.columns[colInfo['idx']['schEmail']]: 'school_email',
+		}
+		for kind in sec.GetCategories():
+			names[df.columns[colInfo['idx'][f'{kind}Total']]] = f'{secId}.{kind}'
+		df = df[list(names.keys())].rename(columns=names)
+		df = df.set_index('primary_email')
+
+		df.insert(3, f'{secId}', 0.0)
+		for kind in sec.GetCategories():
+			df[f'{secId}.{kind}'] = (
+				df[f'{secId}.{kind}'].fillna(0.0) *
+				colInfo['pts'][f'{kind}Total'] / 100
+			)
+			df[f'{secId}'] += df[f'{secId}.{kind}']
+		dfs[secId] = df
+
+	secIds = list(dfs.keys())
+	df = dfs[secIds[0]]
+	for secId in secIds[1:]:
+		df = pandas.merge(
+			df, dfs[secId],
+			how='inner',
+			on='primary_email',
+			suffixes=('', f'_{secId}'),
+		)
+		df = df.drop(columns=[
+			f'last_name_{secId}',
+			f'first_name_{secId}',
+			f'school_email_{secId}',
+		])
+
+	df['total'] = 0.0
+	df['total_percent'] = 0.0
+	asgTotal = 0.0
+	for secId in secIds:
+		df['total'] += df[f'{secId}']
+		asgTotal += assignment.sections.GetTotalPtsBySecId(secId)
+	df['total_percent'] += (df['total'] * 100) / asgTotal
+
+	return df
+
+
+def _BaselineApplyDue(due, df):
+	due.Apply2Pd(df=df, totalColName='total', destColName='total_due')
+	due.Apply2Pd(df=df, totalColName='total_percent', destColName='total_percent_due')
+	return df
+
+
+class TestAssignment(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls) -> None:
+		cls.server = MockZyBooks(numStudents=30, numSections=4, pendingDuration=0.0)
+		cls.server.Start()
+		cls.host = Host(
+			cls.server.GetHost(),
+			scheme='http',
+			pollPolicy=PollPolicy(initialInterval=0.01),
+		)
+		course = Dashboard(cls.host, Token('x'), 1).OpenCourse(courseCode='MockCourse1')
+		cls.assignment = course.OpenAssignment(assignmentID=1001)
+
+	@classmethod
+	def tearDownClass(cls) -> None:
+		cls.server.Stop()
+
+	def AssertSameReport(self, df: pandas.DataFrame, expected: pandas.DataFrame, **kwargs) -> None:
+		pandas.testing.assert_frame_equal(
+			df[list(expected.columns)],
+			expected,
+			check_dtype=False,
+			**kwargs,
+		)
+
+	def test_SectionsMatchBaseline(self) -> None:
+		expected = _BaselineExportReportByDate(self.assignment, DATE)
+		for maxWorkers in (1, 4):
+			_, df = self.assignment.ExportReportByDate(DATE, maxWorkers=maxWorkers)
+			self.AssertSameReport(df, expected)
+
+	def test_MergeChecksEmails(self) -> None:
+		_, dfs = self.assignment._ExportSectionReports(DATE)
+		secIds = list(dfs.keys())
+
+		dupDfs = dict(dfs)
+		dupDfs[secIds[1]] = pandas.concat([ dfs[secIds[1]], dfs[secIds[1]].iloc[:1] ])
+		with self.assertRaisesRegex(RuntimeError, 'Duplicate emails'):
+			self.assignment._MergeSectionReports(dupDfs)
+
+		missingDfs = dict(dfs)
+		missingDfs[secIds[2]] = dfs[secIds[2]].iloc[1:]
+		with self.assertRaisesRegex(RuntimeError, dfs[secIds[2]].index[0]):
+			self.assignment._MergeSectionReports(missingDfs)
+
+		# students only in the other sections are dropped, as with an inner
+		# merge
+		extraDfs = dict(dfs)
+		extraDfs[secIds[0]] = dfs[secIds[0]].iloc[1:]
+		df = self.assignment._MergeSectionReports(extraDfs)
+		self.assertEqual(list(df.index), list(dfs[secIds[0]].index[1:]))
+
+	def test_BatchedMatchesBaseline(self) -> None:
+		expected = _BaselineExportReportByDate(self.assignment, DATE)
+		_, df = self.assignment.ExportReportByDate(DATE, batchSections=True)
+		# the batched report is split from the activity columns, while the
+		# baseline uses the category totals, which are rounded to 0.01%
+		self.AssertSameReport(df, expected, check_exact=False, atol=0.01)
+
+	def test_SectionNumber(self) -> None:
+		payload = {
+			'canonical_section_id': 1,
+			'title': '3.12 Loops',
+			'total_points': 10,
+			'include_participations': True,
+			'include_challenges': False,
+			'include_labs': False,
+		}
+		self.assertEqual(Section(payload).GetNumber(), '3.12')
+		self.assertEqual(
+			Section({ **payload, 'chapter_number': 4, 'section_number': 2 }).GetNumber(),
+			'4.2',
+		)
+		with self.assertRaises(ValueError):
+			Section({ **payload, 'title': 'Loops' }).GetNumber()
+
+	def test_DuesMatchBaseline(self) -> None:
+		dues = [
+			DueWithLambdaPolicy(DATE),
+			DueWithLambdaPolicy(LATE_DATE, policy=lambda x: x * 0.5),
+		]
+		expected = _BaselineApplyDue(
+			dues[0],
+			_BaselineExportReportByDate(self.assignment, DATE),
+		)
+		dfLate = _BaselineApplyDue(
+			dues[1],
+			_BaselineExportReportByDate(self.assignment, LATE_DATE),
+		)
+		for col in expected.columns:
+			if col not in ('last_name', 'first_name', 'school_email'):
+				expected[col] = numpy.maximum(expected[col], dfLate[col])
+
+		_, df = self.assignment.ExportReportWithDues(dues)
+		self.AssertSameReport(df, expected)
+
+		# mergeOps other than ufuncs get the series of each column
+		_, df = self.assignment.ExportReportWithDues(
+			dues,
+			mergeOps=lambda a, b: a.combine(b, max),
+		)
+		self.AssertSameReport(df, expected)
+
+	def test_ExtensionsMatchBaseline(self) -> None:
+		base = DueWithLambdaPolicy(DATE, policy=lambda x: x * 0.9)
+		due = DueWithExtensions(
+			base,
+			{
+				# by primary and by school email
+				'student1@example.com': LATE_DATE,
+				'student2@ucsc.edu': LATE_DATE,
+			},
+		)
+
+		expected = _BaselineExportReportByDate(self.assignment, DATE)
+		dfLate = _BaselineExportReportByDate(self.assignment, LATE_DATE)
+		extended = [ 'student1@example.com', 'student2@example.com' ]
+		cols = [
+			col for col in expected.columns
+			if col not in ('last_name', 'first_name', 'school_email')
+		]
+		expected.loc[extended, cols] = dfLate.loc[extended, cols]
+		expected = _BaselineApplyDue(base, expected)
+
+		_, df = self.assignment.ExportReportWithDue(due)
+		self.AssertSameReport(df, expected)
+		self.assertFalse(
+			df.loc[extended, cols].equals(
+				_BaselineExportReportByDate(self.assignment, DATE).loc[extended, cols]
+			)
+		)
+
+		unknown = DueWithExtensions(base, { 'nobody@example.com': LATE_DATE })
+		with self.assertRaisesRegex(ValueError, 'nobody@example.com'):
+			self.assignment.ExportReportWithDue(unknown)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import asyncio
+import inspect
+import time
+import unittest
+
+import pandas
+
+from benchmarks.MockZyBooks import MockZyBooks
+from zyAPI.AsyncHost import AsyncHost
+from zyAPI.Auth.Token import Token
+from zyAPI.Due.Datetime import Datetime
+from zyAPI.ExportPoller import PollPolicy
+from zyAPI.Host import Host
+from zyAPI.Interfaces.Assignment import Assignment, AssignmentBase
+from zyAPI.Interfaces.AsyncAssignment import AsyncAssignment
+from zyAPI.Interfaces.AsyncCourse import AsyncCourse
+from zyAPI.Interfaces.AsyncDashboard import AsyncDashboard
+from zyAPI.Interfaces.Course import Course, CourseBase
+from zyAPI.Interfaces.Dashboard import Dashboard, DashboardBase
+from zyAPI.Transport import TransportConfig
+
+
+DATE = Datetime.FromComponents(2024, 3, 8, 23, 59, 59, 'America/Los_Angeles')
+ASYNC_GEN_WRAPPERS = { 'ExportCourses': '_ExportCourses' }
+
+
+class TestAsyncInterfaces(unittest.TestCase):
+
+	def test_NoSyncMethods(self) -> None:
+		classes = [
+			(Dashboard, DashboardBase, AsyncDashboard),
+			(Course, CourseBase, AsyncCourse),
+			(Assignment, AssignmentBase, AsyncAssignment),
+		]
+		for syncCls, baseCls, asyncCls in classes:
+			self.assertFalse(issubclass(asyncCls, syncCls))
+			self.assertTrue(issubclass(asyncCls, baseCls))
+			# whatever the sync class adds to the base sends requests, so
+			# the async class must not inherit it
+			ioNames = set(vars(syncCls).keys()) - { '__doc__', '__module__', '__str__' }
+			for name in ioNames:
+				attr = getattr(asyncCls, name, None)
+				if attr is None:
+					continue
+				if name in ASYNC_GEN_WRAPPERS:
+					# checks its arguments, and returns an async generator
+					attr = getattr(asyncCls, ASYNC_GEN_WRAPPERS[name])
+				self.assertTrue(
+					inspect.iscoroutinefunction(attr) or inspect.isasyncgenfunction(attr),
+					f'{asyncCls.__name__}.{name} is not a coroutine function',
+				)
+
+
+class TestAsyncExport(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls) -> None:
+		cls.server = MockZyBooks(numStudents=20, numSections=3, pendingDuration=0.05)
+		cls.server.Start()
+
+		host = Host(
+			cls.server.GetHost(),
+			scheme='http',
+			pollPolicy=PollPolicy(initialInterval=0.01),
+		)
+		course = Dashboard(host, Token('x'), 1).OpenCourse(courseCode='MockCourse1')
+		cls.expected = course.OpenAssignment(assignmentID=1001).ExportReportByDate(DATE)
+
+	@classmethod
+	def tearDownClass(cls) -> None:
+		cls.server.Stop()
+
+	def CreateHost(self, **kwargs) -> AsyncHost:
+		return AsyncHost(
+			self.server.GetHost(),
+			scheme='http',
+			pollPolicy=kwargs.pop('pollPolicy', PollPolicy(initialInterval=0.01)),
+			**kwargs,
+		)
+
+	async def _ExportReports(self, host: AsyncHost) -> list:
+		async with host:
+			dashboard = AsyncDashboard(host, Token('x'), 1)
+			course = await dashboard.OpenCourse(courseCode='MockCourse1')
+			assignment = await course.OpenAssignment(assignmentID=1001)
+			return await asyncio.gather(
+				assignment.ExportReportByDate(DATE, maxWorkers=2),
+				assignment.ExportReportByDate(DATE, batchSections=True),
+			)
+
+	def test_MatchesSync(self) -> None:
+		expectedFilename, expectedDf = self.expected
+		(filename, df), (_, batchedDf) = asyncio.run(
+			self._ExportReports(self.CreateHost())
+		)
+		self.assertEqual(filename, expectedFilename)
+		pandas.testing.assert_frame_equal(df, expectedDf)
+		pandas.testing.assert_frame_equal(
+			batchedDf,
+			expectedDf,
+			check_exact=False,
+			atol=0.01,
+		)
+
+	def test_ExportWaitGivesUp(self) -> None:
+		async def _ExportWait() -> str:
+			async with self.CreateHost() as host:
+				headers = { 'Authorization': 'Bearer x' }
+				respJson = await host.GetJson(
+					f'{host.GetBaseUrl()}/v1/zybook/MockCourse1/activities/export',
+					headers=headers,
+					params={ 'sections': '[100001]', 'end_date': '2024-03-09T07:59:59' },
+				)
+				return await host.ExportWait(
+					auth=Token('x'),
+					exportDict=respJson,
+					policy=PollPolicy(initialInterval=0.01, maxPolls=2),
+				)
+
+		with self.assertRaisesRegex(RuntimeError, 'maximum attempts'):
+			self.server.pendingDuration = 10.0
+			try:
+				asyncio.run(_ExportWait())
+			finally:
+				self.server.pendingDuration = 0.05
+
+	def test_ExportCourses(self) -> None:
+		async def _Export(course: str) -> str:
+			await asyncio.sleep(0.01)
+			return course.upper()
+
+		async def _ExportCourses(dashboard: AsyncDashboard) -> dict:
+			return {
+				course: task.result()
+				async for course, task in dashboard.ExportCourses(
+					[ 'a', 'b', 'c' ],
+					_Export,
+					maxWorkers=2,
+					startsPerSecond=100.0,
+				)
+			}
+
+		dashboard = AsyncDashboard(self.CreateHost(), Token('x'), 1)
+		# invalid arguments are rejected by the call, not the first iteration
+		with self.assertRaises(ValueError):
+			dashboard.ExportCourses([ 'a' ], _Export, maxWorkers=0)
+		with self.assertRaises(ValueError):
+			dashboard.ExportCourses([ 'a' ], _Export, startsPerSecond=0.0)
+
+		self.assertEqual(
+			asyncio.run(_ExportCourses(dashboard)),
+			{ 'a': 'A', 'b': 'B', 'c': 'C' },
+		)
+
+
+class TestAsyncTransport(unittest.TestCase):
+
+	def GetItems(self, server: MockZyBooks, transport: TransportConfig, **kwargs) -> dict:
+		async def _GetItems() -> dict:
+			async with AsyncHost(
+				server.GetHost(),
+				scheme='http',
+				transport=transport,
+			) as host:
+				return await host.GetJson(
+					f'{host.GetBaseUrl()}/v1/user/1/items',
+					headers={ 'Authorization': 'Bearer x' },
+					**kwargs,
+				)
+		return asyncio.run(_GetItems())
+
+	def test_Retries(self) -> None:
+		transport = TransportConfig(retries=8, backoffFactor=0.0)
+		with MockZyBooks(numStudents=1, errorRate=0.3, throttleRate=0.3) as server:
+			for _ in range(5):
+				self.assertTrue(self.GetItems(server, transport)['success'])
+			stats = server.GetStats()
+			self.assertEqual(stats['items'], 5)
+			self.assertGreater(stats['status.503'], 0)
+			self.assertGreater(stats['status.429'], 0)
+
+			# requests that aren't idempotent aren't retried
+			server.ResetStats()
+			results = [
+				self.GetItems(server, transport, idempotent=False)['success']
+				for _ in range(10)
+			]
+			self.assertIn(False, results)
+			self.assertEqual(server.GetStats()['requests'], 10)
+
+	def test_Backoff(self) -> None:
+		transport = TransportConfig(backoffFactor=0.5)
+		self.assertEqual(
+			[ transport.GetBackoff(n) for n in range(1, 5) ],
+			[ 0.0, 1.0, 2.0, 4.0 ],
+		)
+		self.assertEqual(transport.GetBackoff(20), TransportConfig.MAX_BACKOFF)
+
+	def test_ReadTimeout(self) -> None:
+		transport = TransportConfig(readTimeout=0.1, retries=1, backoffFactor=0.0)
+		with MockZyBooks(numStudents=1, requestLatency=0.3) as server:
+			with self.assertRaises(asyncio.TimeoutError):
+				self.GetItems(server, transport)
+			time.sleep(0.5)
+			# the first attempt and one retry
+			self.assertEqual(server.GetStats()['items'], 2)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import pandas
+
+from benchmarks.MockZyBooks import MockZyBooks
+from zyAPI.Auth.Token import Token
+from zyAPI.Due.Datetime import Datetime
+from zyAPI.ExportPoller import PollPolicy
+from zyAPI.Host import Host
+from zyAPI.Interfaces.Dashboard import Dashboard
+from zyAPI.Journal import Journal
+from zyAPI.ReportCache import ReportCache
+
+
+DATE = Datetime.FromComponents(2024, 3, 8, 23, 59, 59, 'America/Los_Angeles')
+SEC_IDS = [ 100001 ]
+
+
+class TestCourseExport(unittest.TestCase):
+
+	def setUp(self) -> None:
+		self.server = MockZyBooks(numStudents=10, pendingDuration=0.2)
+		self.server.Start()
+		self.tmpDir = tempfile.TemporaryDirectory()
+
+	def tearDown(self) -> None:
+		self.server.Stop()
+		self.tmpDir.cleanup()
+
+	def OpenCourse(self, **kwargs):
+		host = Host(
+			self.server.GetHost(),
+			scheme='http',
+			pollPolicy=kwargs.pop('pollPolicy', PollPolicy(initialInterval=0.01)),
+			**kwargs,
+		)
+		return Dashboard(host, Token('x'), 1).OpenCourse(courseCode='MockCourse1')
+
+	def GetNumExports(self) -> int:
+		return self.server.GetStats().get('export', 0)
+
+	def test_CacheHit(self) -> None:
+		course = self.OpenCourse(
+			reportCache=ReportCache(os.path.join(self.tmpDir.name, 'cache')),
+		)
+		filename, df = course.ExportReportByDate(DATE, SEC_IDS)
+		self.assertEqual(self.GetNumExports(), 1)
+
+		cachedFilename, cachedDf = course.ExportReportByDate(DATE, SEC_IDS)
+		self.assertEqual(self.GetNumExports(), 1)
+		self.assertEqual(cachedFilename, filename)
+		pandas.testing.assert_frame_equal(cachedDf, df)
+
+		course.ExportReportByDate(DATE, SEC_IDS, refresh=True)
+		self.assertEqual(self.GetNumExports(), 2)
+
+	def test_CacheEvictedBeforeRead(self) -> None:
+		course = self.OpenCourse(
+			reportCache=ReportCache(os.path.join(self.tmpDir.name, 'cache')),
+		)
+		_, df = course.ExportReportByDate(DATE, SEC_IDS)
+
+		cache = course.host.reportCache
+		get = cache.Get
+
+		def _GetAndEvict(key: str):
+			cached = get(key)
+			if cached is not None:
+				# as if another thread evicted it right after the lookup
+				cache.Invalidate(key)
+			return cached
+
+		cache.Get = _GetAndEvict
+		_, evictedDf = course.ExportReportByDate(DATE, SEC_IDS)
+		self.assertEqual(self.GetNumExports(), 2)
+		pandas.testing.assert_frame_equal(evictedDf, df)
+
+	def test_JournalResume(self) -> None:
+		journalPath = os.path.join(self.tmpDir.name, 'journal.db')
+
+		# a run that stops after submitting the export
+		course = self.OpenCourse(
+			journal=Journal(journalPath),
+			pollPolicy=PollPolicy(initialInterval=0.01, maxPolls=1),
+		)
+		with self.assertRaises(RuntimeError):
+			course.ExportReportByDate(DATE, SEC_IDS)
+		self.assertEqual(self.GetNumExports(), 1)
+
+		# the restarted run polls the same export instead of submitting again
+		course = self.OpenCourse(journal=Journal(journalPath))
+		filename, df = course.ExportReportByDate(DATE, SEC_IDS)
+		self.assertEqual(self.GetNumExports(), 1)
+		self.assertEqual(self.server.GetStats().get('download', 0), 1)
+
+		# and the next one reuses the downloaded CSV
+		course = self.OpenCourse(journal=Journal(journalPath))
+		journaledFilename, journaledDf = course.ExportReportByDate(DATE, SEC_IDS)
+		self.assertEqual(self.GetNumExports(), 1)
+		self.assertEqual(self.server.GetStats().get('download', 0), 1)
+		self.assertEqual(journaledFilename, filename)
+		pandas.testing.assert_frame_equal(journaledDf, df)
+
+	def test_Flights(self) -> None:
+		course = self.OpenCourse()
+		flights = course.host.exportFlights
+		results = {}
+
+		def _Export(name: str, refresh: bool) -> None:
+			results[name] = course.ExportReportByDate(DATE, SEC_IDS, refresh=refresh)
+
+		leader = threading.Thread(target=_Export, args=('leader', False))
+		leader.start()
+		while flights.GetNumInFlight() == 0:
+			time.sleep(0.005)
+
+		# joins the export in flight
+		follower = threading.Thread(target=_Export, args=('follower', False))
+		# never joins a non-refresh export
+		refresher = threading.Thread(target=_Export, args=('refresher', True))
+		follower.start()
+		refresher.start()
+		for thread in (leader, follower, refresher):
+			thread.join()
+
+		self.assertEqual(self.GetNumExports(), 2)
+		self.assertEqual(flights.GetStats()['shared'], 1)
+		pandas.testing.assert_frame_equal(results['follower'][1], results['leader'][1])
+		# each caller gets its own dataframe
+		self.assertIsNot(results['follower'][1], results['leader'][1])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import threading
+import time
+import unittest
+
+from zyAPI.Auth.Token import Token
+from zyAPI.Host import Host
+from zyAPI.Interfaces.Dashboard import Dashboard
+
+
+class TestExportCourses(unittest.TestCase):
+
+	def setUp(self) -> None:
+		self.dashboard = Dashboard(Host('zyserver.zybooks.com'), Token('x'), 1)
+
+	def test_InvalidArguments(self) -> None:
+		# rejected by the call, not the first iteration
+		with self.assertRaises(ValueError):
+			self.dashboard.ExportCourses([ 'a' ], str.upper, maxWorkers=0)
+		with self.assertRaises(ValueError):
+			self.dashboard.ExportCourses([ 'a' ], str.upper, startsPerSecond=0.0)
+
+	def test_Results(self) -> None:
+		def _Export(course: str) -> str:
+			if course == 'b':
+				raise RuntimeError('failed to export b')
+			return course.upper()
+
+		results = {}
+		for course, future in self.dashboard.ExportCourses(
+			[ 'a', 'b', 'c' ],
+			_Export,
+			maxWorkers=2,
+		):
+			results[course] = future.exception() or future.result()
+
+		self.assertEqual(results['a'], 'A')
+		self.assertEqual(results['c'], 'C')
+		self.assertIsInstance(results['b'], RuntimeError)
+
+	def test_StartsPerSecond(self) -> None:
+		lock = threading.Lock()
+		startTimes = []
+
+		def _Export(course: str) -> str:
+			with lock:
+				startTimes.append(time.monotonic())
+			return course
+
+		courses = [ f'course{i}' for i in range(4) ]
+		for _ in self.dashboard.ExportCourses(
+			courses,
+			_Export,
+			maxWorkers=4,
+			startsPerSecond=20.0,
+		):
+			pass
+
+		startTimes.sort()
+		self.assertGreaterEqual(startTimes[-1] - startTimes[0], 0.14)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import unittest
+
+import numpy
+import pandas
+
+from zyAPI.Due.Datetime import Datetime
+from zyAPI.Due.DueWithLambdaPolicy import DueWithLambdaPolicy
+
+
+DUE_DATE = Datetime.FromComponents(2024, 3, 8, 23, 59, 59, 'America/Los_Angeles')
+
+
+class TestDueWithLambdaPolicy(unittest.TestCase):
+
+	def test_ScalarPolicyAfterSingleRow(self) -> None:
+		due = DueWithLambdaPolicy(
+			DUE_DATE,
+			policy=lambda x: x * 0.5 if x > 50 else 0,
+		)
+		numpy.testing.assert_array_equal(
+			due.Evaluate(numpy.array([ 80.0 ])).astype(float),
+			[ 40.0 ],
+		)
+		numpy.testing.assert_array_equal(
+			due.Evaluate(numpy.array([ 80.0, 10.0 ])).astype(float),
+			[ 40.0, 0.0 ],
+		)
+
+	def test_ArrayPolicyFallsBack(self) -> None:
+		def _Policy(x):
+			# works on arrays of up to two scores only
+			if numpy.ndim(x) > 0 and len(x) > 2:
+				raise TypeError('too many scores')
+			return x * 0.5
+
+		due = DueWithLambdaPolicy(DUE_DATE, policy=_Policy)
+		due.Evaluate(numpy.array([ 80.0, 90.0 ]))
+		self.assertTrue(due.isArrayPolicy)
+		numpy.testing.assert_array_equal(
+			due.Evaluate(numpy.array([ 80.0, 10.0, 20.0 ])).astype(float),
+			[ 40.0, 5.0, 10.0 ],
+		)
+		self.assertFalse(due.isArrayPolicy)
+
+	def test_SameAsSeriesApply(self) -> None:
+		rnd = numpy.random.default_rng(0)
+		scores = rnd.uniform(0.0, 100.0, 200).round(2)
+		scores[::7] = numpy.nan
+		policies = [
+			lambda x: x * 0.5,
+			lambda x: min(x, 80.0),
+			lambda x: x * 0.5 if x > 50 else 0,
+			lambda x: numpy.floor(x / 10.0) * 10.0,
+		]
+		for policy in policies:
+			df = pandas.DataFrame({ 'total': scores })
+			expected = df['total'].apply(policy)
+			res = DueWithLambdaPolicy(DUE_DATE, policy=policy).Apply2Pd(
+				df,
+				totalColName='total',
+				destColName='late',
+			)
+			pandas.testing.assert_series_equal(
+				res['late'],
+				expected,
+				check_names=False,
+			)
+
+
+if __name__ == '__main__':
+	unittest.main()
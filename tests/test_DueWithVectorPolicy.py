@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import unittest
+
+import numpy
+import pandas
+
+from zyAPI.Due.Datetime import Datetime
+from zyAPI.Due.DueWithVectorPolicy import DueWithVectorPolicy
+
+
+DUE_DATE = Datetime.FromComponents(2024, 3, 8, 23, 59, 59, 'America/Los_Angeles')
+
+NAN = numpy.nan
+
+
+class TestDueWithVectorPolicy(unittest.TestCase):
+
+	def AssertEvaluates(self, due: DueWithVectorPolicy, scores: list, expected: list) -> None:
+		numpy.testing.assert_allclose(
+			due.Evaluate(numpy.array(scores, dtype=float)),
+			expected,
+		)
+
+	def test_Piecewise(self) -> None:
+		due = DueWithVectorPolicy(DUE_DATE, piecewise=([ 50, 100 ], [ 0, 80 ]))
+		self.AssertEvaluates(
+			due,
+			[ 0, 50, 75, 100, 120 ],
+			[ 0, 0, 40, 80, 80 ],
+		)
+
+	def test_Steps(self) -> None:
+		due = DueWithVectorPolicy(DUE_DATE, steps=([ 60, 90 ], [ 0, 50, 100 ]))
+		self.AssertEvaluates(
+			due,
+			[ 0, 59.9, 60, 89.9, 90, 100 ],
+			[ 0, 0, 50, 50, 100, 100 ],
+		)
+
+	def test_MultiplierFloorCap(self) -> None:
+		self.AssertEvaluates(
+			DueWithVectorPolicy(DUE_DATE, multiplier=0.5),
+			[ 0, 50, 100 ],
+			[ 0, 25, 50 ],
+		)
+		self.AssertEvaluates(
+			DueWithVectorPolicy(DUE_DATE, multiplier=0.5, floor=10, cap=40),
+			[ 0, 50, 100 ],
+			[ 10, 25, 40 ],
+		)
+		# the multiplier applies after the piecewise function
+		self.AssertEvaluates(
+			DueWithVectorPolicy(
+				DUE_DATE,
+				piecewise=([ 0, 100 ], [ 0, 50 ]),
+				multiplier=2.0,
+				cap=90,
+			),
+			[ 40, 100 ],
+			[ 40, 90 ],
+		)
+
+	def test_NaNStaysNaN(self) -> None:
+		due = DueWithVectorPolicy(
+			DUE_DATE,
+			piecewise=([ 50, 100 ], [ 0, 80 ]),
+			steps=([ 40 ], [ 0, 60 ]),
+			multiplier=0.5,
+			floor=5,
+			cap=20,
+		)
+		self.AssertEvaluates(
+			due,
+			[ NAN, 100, NAN, 0 ],
+			[ NAN, 20, NAN, 5 ],
+		)
+
+	def test_InvalidPolicy(self) -> None:
+		with self.assertRaises(ValueError):
+			DueWithVectorPolicy(DUE_DATE, piecewise=([ 100, 50 ], [ 0, 80 ]))
+		with self.assertRaises(ValueError):
+			DueWithVectorPolicy(DUE_DATE, steps=([ 60, 90 ], [ 0, 100 ]))
+		with self.assertRaises(ValueError):
+			DueWithVectorPolicy(DUE_DATE, floor=50, cap=10)
+
+	def test_SameAsSeriesApply(self) -> None:
+		rnd = numpy.random.default_rng(0)
+		scores = rnd.uniform(0.0, 100.0, 200).round(2)
+		scores[::7] = NAN
+		df = pandas.DataFrame({ 'total': scores })
+
+		due = DueWithVectorPolicy(
+			DUE_DATE,
+			steps=([ 60 ], [ 0, 1 ]),
+			multiplier=0.5,
+			cap=0.4,
+		)
+		expected = df['total'].apply(lambda x: min((x >= 60) * 0.5, 0.4) if x == x else x)
+		res = due.Apply2Pd(df, totalColName='total', destColName='late')
+		pandas.testing.assert_series_equal(res['late'], expected, check_names=False)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import threading
+import time
+import unittest
+
+from zyAPI.Auth.Token import Token
+from zyAPI.ExportPoller import ExportPoller, ExportPollState, PollPolicy
+from zyAPI.Instrumentation import Instrumentation, InstrumentationSink
+
+
+class _Resp(object):
+
+	def __init__(self, statusDict: dict) -> None:
+		self.statusDict = statusDict
+
+	def json(self) -> dict:
+		return self.statusDict
+
+
+class TestExportPoller(unittest.TestCase):
+
+	def test_SlowPollDoesNotBlockOthers(self) -> None:
+		release = threading.Event()
+
+		def _Request(url: str, headers: dict) -> _Resp:
+			if url == 'slow':
+				release.wait(timeout=10.0)
+			return _Resp({ 'success': True, 'state': 'SUCCESS', 'url': url })
+
+		poller = ExportPoller(
+			session=None,
+			policy=PollPolicy(initialInterval=0.01),
+			request=_Request,
+		)
+		auth = Token('x')
+		slow = poller.Submit(auth, 'slow')
+		# give the slow poll time to start
+		time.sleep(0.05)
+		fast = [ poller.Submit(auth, f'fast{i}') for i in range(3) ]
+
+		for i, future in enumerate(fast):
+			self.assertEqual(future.result(timeout=2.0), f'fast{i}')
+		self.assertFalse(slow.done())
+
+		release.set()
+		self.assertEqual(slow.result(timeout=2.0), 'slow')
+
+	def test_PollsAreChildrenOfSubmitterSpan(self) -> None:
+		ended = []
+
+		class _Sink(InstrumentationSink):
+			def OnSpanEnd(self, span) -> None:
+				ended.append(span)
+
+		instrumentation = Instrumentation([ _Sink() ])
+		numPolls = [ 0 ]
+
+		def _Request(url: str, headers: dict) -> _Resp:
+			with instrumentation.Span('http.poll'):
+				numPolls[0] += 1
+				if numPolls[0] < 3:
+					return _Resp({ 'success': True, 'state': 'PENDING' })
+				return _Resp({ 'success': True, 'state': 'SUCCESS', 'url': url })
+
+		poller = ExportPoller(
+			session=None,
+			policy=PollPolicy(initialInterval=0.01),
+			request=_Request,
+			instrumentation=instrumentation,
+		)
+		with instrumentation.Span('export.wait') as waitSpan:
+			poller.Submit(Token('x'), 'loc').result(timeout=2.0)
+
+		polls = [ span for span in ended if span.name == 'http.poll' ]
+		self.assertEqual(len(polls), 3)
+		for span in polls:
+			self.assertIs(span.parent, waitSpan)
+		self.assertEqual(waitSpan.attrs['polls'], 3)
+
+
+PENDING = { 'success': True, 'state': 'PENDING' }
+
+
+class TestExportPollState(unittest.TestCase):
+
+	def test_Backoff(self) -> None:
+		policy = PollPolicy(
+			initialInterval=1.0,
+			maxInterval=3.0,
+			jitter=0.0,
+			deadline=None,
+			maxPolls=5,
+		)
+		state = ExportPollState(policy)
+		delays = []
+		for _ in range(4):
+			self.assertIsNone(state.OnStatus(PENDING, Instrumentation()))
+			delays.append(state.GetNextDelay())
+		self.assertEqual(delays, [ 1.0, 2.0, 3.0, 3.0 ])
+
+		self.assertIsNone(state.OnStatus(PENDING, Instrumentation()))
+		with self.assertRaisesRegex(RuntimeError, 'maximum attempts'):
+			state.GetNextDelay()
+
+	def test_Deadline(self) -> None:
+		state = ExportPollState(PollPolicy(initialInterval=5.0, jitter=0.0, deadline=0.05))
+		state.OnStatus(PENDING, Instrumentation())
+		# one last poll right at the deadline
+		self.assertLessEqual(state.GetNextDelay(), 0.05)
+		time.sleep(0.06)
+		state.OnStatus(PENDING, Instrumentation())
+		with self.assertRaisesRegex(RuntimeError, 'deadline'):
+			state.GetNextDelay()
+
+	def test_Status(self) -> None:
+		state = ExportPollState(PollPolicy())
+		self.assertEqual(
+			state.OnStatus(
+				{ 'success': True, 'state': 'SUCCESS', 'url': 'report.csv' },
+				Instrumentation(),
+			),
+			'report.csv',
+		)
+		with self.assertRaisesRegex(RuntimeError, 'FAILURE'):
+			state.OnStatus({ 'success': True, 'state': 'FAILURE' }, Instrumentation())
+		with self.assertRaisesRegex(RuntimeError, 'status failed'):
+			state.OnStatus({ 'success': False }, Instrumentation())
+
+
+if __name__ == '__main__':
+	unittest.main()
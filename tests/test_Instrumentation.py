@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import importlib.util
+import subprocess
+import sys
+import unittest
+
+from zyAPI.Instrumentation import Instrumentation
+
+
+def _HasModule(name: str) -> bool:
+	try:
+		return importlib.util.find_spec(name) is not None
+	except ImportError:
+		# the parent package is missing
+		return False
+
+
+HAS_OTEL_SDK = _HasModule('opentelemetry.sdk')
+HAS_PROMETHEUS = _HasModule('prometheus_client')
+
+
+class TestInstrumentation(unittest.TestCase):
+
+	def test_SinkPackagesNotImported(self) -> None:
+		code = (
+			'import sys, zyAPI.Host, zyAPI.Instrumentation; ' +
+			'print(any(m.split(".")[0] in ("opentelemetry", "prometheus_client") ' +
+			'for m in sys.modules))'
+		)
+		out = subprocess.check_output([ sys.executable, '-c', code ], text=True)
+		self.assertEqual(out.strip(), 'False')
+
+
+@unittest.skipUnless(HAS_OTEL_SDK, 'opentelemetry-sdk is not installed')
+class TestOpenTelemetrySink(unittest.TestCase):
+
+	def setUp(self) -> None:
+		from opentelemetry.sdk.trace import TracerProvider
+		from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+		from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+			InMemorySpanExporter,
+		)
+		from zyAPI.Instrumentation import OpenTelemetrySink
+
+		self.exporter = InMemorySpanExporter()
+		provider = TracerProvider()
+		provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+		self.instr = Instrumentation([ OpenTelemetrySink(provider) ])
+
+	def test_Spans(self) -> None:
+		from opentelemetry.trace import StatusCode
+
+		with self.instr.Span('export.wait', kind='poll') as outer:
+			outer.SetAttribute('polls', 3)
+			self.instr.Count('http.bytes', 10, kind='download')
+			with self.assertRaises(ValueError):
+				with self.instr.Span('report.read', path=None):
+					raise ValueError('bad report')
+
+		spans = { s.name: s for s in self.exporter.get_finished_spans() }
+		self.assertEqual(set(spans.keys()), { 'export.wait', 'report.read' })
+
+		outer = spans['export.wait']
+		inner = spans['report.read']
+		self.assertEqual(inner.parent.span_id, outer.context.span_id)
+		self.assertEqual(dict(outer.attributes), { 'kind': 'poll', 'polls': 3 })
+		# non-primitive attributes are stringified
+		self.assertEqual(dict(inner.attributes), { 'path': 'None' })
+
+		self.assertEqual(inner.status.status_code, StatusCode.ERROR)
+		self.assertEqual(inner.status.description, 'ValueError')
+		self.assertNotEqual(outer.status.status_code, StatusCode.ERROR)
+
+		self.assertEqual(len(outer.events), 1)
+		self.assertEqual(outer.events[0].name, 'http.bytes')
+		self.assertEqual(
+			dict(outer.events[0].attributes),
+			{ 'value': 10, 'kind': 'download' },
+		)
+		self.assertLessEqual(outer.start_time, inner.start_time)
+		self.assertLessEqual(inner.end_time, outer.end_time)
+
+
+@unittest.skipUnless(HAS_PROMETHEUS, 'prometheus_client is not installed')
+class TestPrometheusSink(unittest.TestCase):
+
+	def setUp(self) -> None:
+		import prometheus_client
+		from zyAPI.Instrumentation import PrometheusSink
+
+		self.registry = prometheus_client.CollectorRegistry()
+		self.sink = PrometheusSink(self.registry)
+		self.instr = Instrumentation([ self.sink ])
+
+	def GetValue(self, name: str, **labels) -> float:
+		return self.registry.get_sample_value(name, labels)
+
+	def test_Metrics(self) -> None:
+		for _ in range(2):
+			with self.instr.Span('report.read'):
+				pass
+		with self.assertRaises(ValueError):
+			with self.instr.Span('report.read'):
+				raise ValueError('bad report')
+		self.instr.Count('http.bytes', 10, kind='download')
+		self.instr.Count('http.bytes', 5, kind='download')
+		self.instr.Count('export.polls', 3)
+
+		self.assertEqual(
+			self.GetValue('zyapi_span_duration_seconds_count', span='report.read'),
+			3.0,
+		)
+		self.assertEqual(
+			self.GetValue('zyapi_span_errors_total', span='report.read'),
+			1.0,
+		)
+		self.assertEqual(
+			self.GetValue('zyapi_counter_total', counter='http.bytes', kind='download'),
+			15.0,
+		)
+		self.assertEqual(
+			self.GetValue('zyapi_counter_total', counter='export.polls', kind=''),
+			3.0,
+		)
+		self.assertIn(b'zyapi_span_duration_seconds_bucket', self.sink.GenerateLatest())
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import datetime
+import os
+import tempfile
+import unittest
+
+import pandas
+
+from benchmarks.MockZyBooks import MockZyBooks
+from zyAPI.Jobs import JobFile, JobRunner, ParseDatetime
+
+
+class TestJobs(unittest.TestCase):
+
+	def test_ParseDatetime(self) -> None:
+		tz = 'America/Los_Angeles'
+		expected = ParseDatetime('2024-03-08 23:59:59', tz).GetReportKey()
+		self.assertEqual(
+			ParseDatetime(datetime.datetime(2024, 3, 8, 23, 59, 59), tz).GetReportKey(),
+			expected,
+		)
+		self.assertEqual(
+			ParseDatetime(datetime.date(2024, 3, 8), tz).GetReportKey(),
+			ParseDatetime('2024-03-08', tz).GetReportKey(),
+		)
+		with self.assertRaises(ValueError):
+			ParseDatetime('not a date', tz)
+
+	def test_InvalidJobFile(self) -> None:
+		base = { 'token': 'x', 'uid': 1 }
+		job = { 'course': 'C', 'assignment': 1, 'due': '2024-03-08' }
+		specs = [
+			{ **base, 'jobs': [ { **job, 'lateDues': [ { 'policy': {} } ] } ] },
+			{ **base, 'jobs': [ { **job, 'policy': { 'steps': 5 } } ] },
+			{ **base, 'jobs': [ job ], 'pollPolicy': { 'interval': 1 } },
+		]
+		for spec in specs:
+			with self.assertRaises(ValueError):
+				JobFile(spec)
+
+	def test_RunWritesEmails(self) -> None:
+		with MockZyBooks(numStudents=20, pendingDuration=0.0) as server, \
+			tempfile.TemporaryDirectory() as tmpDir:
+			jobFile = JobFile(
+				{
+					'host': server.GetHost(),
+					'scheme': 'http',
+					'token': 'x',
+					'uid': 1,
+					'outputDir': tmpDir,
+					'pollPolicy': { 'initialInterval': 0.01 },
+					'defaults': { 'timezone': 'America/Los_Angeles' },
+					'jobs': [
+						{
+							'name': 'a1',
+							'course': 'MockCourse1',
+							'assignment': 1001,
+							'due': datetime.datetime(2024, 3, 8, 23, 59, 59),
+						},
+					],
+				},
+				baseDir=tmpDir,
+			)
+			results = JobRunner(jobFile).Run()
+			self.assertTrue(results[0].IsSuccess(), str(results[0]))
+
+			df = pandas.read_csv(os.path.join(tmpDir, 'a1.csv'))
+			self.assertIn('primary_email', df.columns)
+			self.assertEqual(len(df), 20)
+			self.assertFalse(df['primary_email'].isna().any())
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from benchmarks.MockZyBooks import MockZyBooks
+from zyAPI.Auth.Token import Token
+from zyAPI.Host import Host
+from zyAPI.Interfaces.Dashboard import Dashboard
+from zyAPI.MetadataCache import MetadataCache
+
+
+URL = 'https://zyserver.zybooks.com/v1/user/1'
+HEADERS = { 'Authorization': 'Bearer secret' }
+
+
+class _FakeResponse(object):
+
+	def __init__(self, statusCode: int, value: dict, headers: dict) -> None:
+		self.status_code = statusCode
+		self.ok = statusCode < 400
+		self.value = value
+		self.headers = headers
+
+	def json(self) -> dict:
+		return self.value
+
+
+class TestMetadataCache(unittest.TestCase):
+
+	def setUp(self) -> None:
+		self.tmpDir = tempfile.TemporaryDirectory()
+		self.persistPath = os.path.join(self.tmpDir.name, 'metadata.json')
+
+	def tearDown(self) -> None:
+		self.tmpDir.cleanup()
+
+	def test_Ttl(self) -> None:
+		cache = MetadataCache(ttls={ 'userInfo': 0.1 })
+		key = cache.MakeKey('userInfo', URL, HEADERS)
+		self.assertIsNone(cache.GetFresh(key))
+
+		cache.Store('userInfo', key, { 'success': True }, {})
+		self.assertEqual(cache.GetFresh(key), { 'success': True })
+		time.sleep(0.15)
+		self.assertIsNone(cache.GetFresh(key))
+
+		# with no TTL and no validators, there's nothing to keep
+		cache.Store('unknown', 'other', { 'success': True }, {})
+		self.assertNotIn('other', cache.entries)
+
+	def test_KeyDoesNotLeakToken(self) -> None:
+		key = MetadataCache.MakeKey('userInfo', URL, HEADERS)
+		self.assertNotIn('secret', key)
+		self.assertNotEqual(
+			key,
+			MetadataCache.MakeKey('userInfo', URL, { 'Authorization': 'Bearer other' }),
+		)
+
+	def test_Revalidation(self) -> None:
+		cache = MetadataCache(ttls={ 'userInfo': 0.0 })
+		key = cache.MakeKey('userInfo', URL, HEADERS)
+		self.assertEqual(cache.GetRevalidationHeaders(key), {})
+
+		cache.Store(
+			'userInfo',
+			key,
+			{ 'success': True },
+			{ 'ETag': '"v1"', 'Last-Modified': 'Fri, 08 Mar 2024 00:00:00 GMT' },
+		)
+		self.assertIsNone(cache.GetFresh(key))
+		self.assertEqual(
+			cache.GetRevalidationHeaders(key),
+			{
+				'If-None-Match': '"v1"',
+				'If-Modified-Since': 'Fri, 08 Mar 2024 00:00:00 GMT',
+			},
+		)
+		self.assertEqual(cache.Revalidated(key), { 'success': True })
+
+		cache.Invalidate('userInfo')
+		self.assertIsNone(cache.Revalidated(key))
+
+	def test_RefetchWhenInvalidatedBeforeRevalidated(self) -> None:
+		cache = MetadataCache(ttls={ 'userInfo': 0.0 })
+		host = Host('zyserver.zybooks.com', metadataCache=cache)
+		key = cache.MakeKey('userInfo', URL, HEADERS)
+		cache.Store('userInfo', key, { 'success': True, 'v': 1 }, { 'ETag': '"v1"' })
+
+		requests = []
+
+		def _Request(kind: str, method: str, url: str, headers: dict, **kwargs):
+			requests.append(headers)
+			if 'If-None-Match' in headers:
+				# invalidated while the 304 is on its way
+				cache.Invalidate()
+				return _FakeResponse(304, {}, {})
+			return _FakeResponse(200, { 'success': True, 'v': 2 }, { 'ETag': '"v2"' })
+
+		host.Request = _Request
+		value = host.GetJson(URL, headers=HEADERS, cacheEndpoint='userInfo')
+		self.assertEqual(value, { 'success': True, 'v': 2 })
+		self.assertEqual(len(requests), 2)
+		self.assertNotIn('If-None-Match', requests[1])
+		self.assertEqual(cache.GetRevalidationHeaders(key), { 'If-None-Match': '"v2"' })
+
+	def test_PersistDebounced(self) -> None:
+		cache = MetadataCache(persistPath=self.persistPath, saveDelay=60.0)
+		for i in range(10):
+			key = cache.MakeKey('userInfo', f'{URL}{i}', HEADERS)
+			cache.Store('userInfo', key, { 'success': True, 'i': i }, {})
+		# the burst of changes is pending a single write
+		self.assertFalse(os.path.exists(self.persistPath))
+
+		cache.Flush()
+		with open(self.persistPath, 'r') as f:
+			self.assertEqual(len(json.load(f)), 10)
+
+		loaded = MetadataCache(persistPath=self.persistPath)
+		key = loaded.MakeKey('userInfo', f'{URL}3', HEADERS)
+		self.assertEqual(loaded.GetFresh(key), { 'success': True, 'i': 3 })
+		with open(self.persistPath, 'r') as f:
+			self.assertNotIn('secret', f.read())
+
+	def test_PersistAfterDelay(self) -> None:
+		cache = MetadataCache(persistPath=self.persistPath, saveDelay=0.05)
+		key = cache.MakeKey('userInfo', URL, HEADERS)
+		cache.Store('userInfo', key, { 'success': True }, {})
+
+		deadline = time.time() + 10.0
+		while (not os.path.exists(self.persistPath)) and (time.time() < deadline):
+			time.sleep(0.01)
+		self.assertEqual(
+			MetadataCache(persistPath=self.persistPath).GetFresh(key),
+			{ 'success': True },
+		)
+
+		# without a delay, every change is written right away
+		cache = MetadataCache(persistPath=self.persistPath, saveDelay=0.0)
+		cache.Invalidate()
+		with open(self.persistPath, 'r') as f:
+			self.assertEqual(json.load(f), {})
+
+	def test_Host(self) -> None:
+		with MockZyBooks(numStudents=1) as server:
+			host = Host(server.GetHost(), scheme='http', metadataCache=MetadataCache())
+			dashboard = Dashboard(host, Token('x'), 1)
+
+			courseList = dashboard.GetCourseList()
+			self.assertEqual(dashboard.GetCourseList(), courseList)
+			self.assertEqual(server.GetStats()['items'], 1)
+
+			host.InvalidateMetadata('courseList')
+			self.assertEqual(dashboard.GetCourseList(), courseList)
+			self.assertEqual(server.GetStats()['items'], 2)
+
+
+if __name__ == '__main__':
+	unittest.main()
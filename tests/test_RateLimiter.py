@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import os
+import tempfile
+import unittest
+
+from zyAPI.Jobs import JobFile
+from zyAPI.RateLimiter import RateLimiter, TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+
+	def setUp(self) -> None:
+		self.tmpDir = tempfile.TemporaryDirectory()
+
+	def tearDown(self) -> None:
+		self.tmpDir.cleanup()
+
+	def test_Burst(self) -> None:
+		bucket = TokenBucket('api', rate=10.0, burst=2.0)
+		self.assertEqual(bucket.Reserve(), 0.0)
+		self.assertEqual(bucket.Reserve(), 0.0)
+		# in debt of one token, and then two
+		self.assertAlmostEqual(bucket.Reserve(), 0.1, delta=0.01)
+		self.assertAlmostEqual(bucket.Reserve(), 0.2, delta=0.01)
+
+	def test_AdditiveIncrease(self) -> None:
+		bucket = TokenBucket('api', rate=1.0, burst=1.0, increaseStep=0.5)
+		for _ in range(4):
+			bucket.OnSuccess()
+		self.assertAlmostEqual(bucket.GetRate(), 3.0)
+		bucket.Reserve()
+		self.assertAlmostEqual(bucket.state['rate'], 3.0)
+
+		capped = TokenBucket('api', rate=1.0, burst=1.0, increaseStep=0.5, maxRate=2.0)
+		for _ in range(4):
+			capped.OnSuccess()
+		self.assertAlmostEqual(capped.GetRate(), 2.0)
+
+	def test_BackoffOn429(self) -> None:
+		limiter = RateLimiter(
+			rates={ 'api': 8.0 },
+			bursts={ 'api': 8.0 },
+			decreaseFactor=0.5,
+			increaseStep=1.0,
+			minRate=1.0,
+		)
+		bucket = limiter.GetBucket('api')
+
+		limiter.OnResponse('api', 200)
+		limiter.OnResponse('api', 429, { 'Retry-After': '2' })
+		# the pending increase is dropped, and the burst is gone
+		self.assertAlmostEqual(bucket.GetRate(), 4.0)
+		self.assertGreaterEqual(limiter.Reserve('api'), 1.9)
+
+		for _ in range(5):
+			limiter.OnResponse('api', 429)
+		self.assertAlmostEqual(bucket.GetRate(), 1.0)
+		self.assertEqual(bucket.GetStats()['throttled'], 6)
+
+		# other errors don't change the rate
+		limiter.OnResponse('api', 500)
+		self.assertAlmostEqual(bucket.GetRate(), 1.0)
+
+	def test_ParseRetryAfter(self) -> None:
+		self.assertEqual(RateLimiter.ParseRetryAfter('3'), 3.0)
+		self.assertEqual(RateLimiter.ParseRetryAfter('-1'), 0.0)
+		self.assertEqual(
+			RateLimiter.ParseRetryAfter('Fri, 08 Mar 2024 00:00:00 GMT'),
+			0.0,
+		)
+		self.assertIsNone(RateLimiter.ParseRetryAfter('soon'))
+		self.assertIsNone(RateLimiter.ParseRetryAfter(None))
+
+	def test_SharedStateFile(self) -> None:
+		statePath = os.path.join(self.tmpDir.name, 'api.json')
+		# as if in two processes
+		bucket1 = TokenBucket('api', rate=10.0, burst=2.0, statePath=statePath)
+		bucket2 = TokenBucket('api', rate=10.0, burst=2.0, statePath=statePath)
+
+		self.assertEqual(bucket1.Reserve(), 0.0)
+		self.assertEqual(bucket2.Reserve(), 0.0)
+		# the burst is shared
+		self.assertGreater(bucket1.Reserve(), 0.0)
+
+		bucket2.OnThrottled(retryAfter=5.0)
+		self.assertAlmostEqual(bucket1.GetRate(), 5.0)
+		self.assertGreaterEqual(bucket1.Reserve(), 4.9)
+
+		# a corrupted state file starts over
+		with open(statePath, 'w') as f:
+			f.write('{')
+		self.assertEqual(bucket1.Reserve(), 0.0)
+		self.assertAlmostEqual(bucket2.GetRate(), 10.0)
+
+	def test_JobFile(self) -> None:
+		spec = { 'token': 'x', 'uid': 1 }
+		self.assertIsNone(JobFile(spec, requireJobs=False).CreateHost().rateLimiter)
+
+		jobFile = JobFile(
+			{ **spec, 'rateLimiter': { 'rates': { 'poll': 2.0 }, 'lockDir': 'limits' } },
+			baseDir=self.tmpDir.name,
+			requireJobs=False,
+		)
+		host = jobFile.CreateHost()
+		self.assertIs(host.rateLimiter, jobFile.rateLimiter)
+		self.assertEqual(host.rateLimiter.rates['poll'], 2.0)
+		self.assertEqual(
+			host.rateLimiter.lockDir,
+			os.path.join(self.tmpDir.name, 'limits'),
+		)
+
+		with self.assertRaises(ValueError):
+			JobFile({ **spec, 'rateLimiter': { 'rate': 1.0 } }, requireJobs=False)
+
+
+if __name__ == '__main__':
+	unittest.main()
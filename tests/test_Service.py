@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import datetime
+import http.client
+import json
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+import pandas
+
+from benchmarks.MockZyBooks import MockZyBooks
+from zyAPI.Jobs import JobFile
+from zyAPI.Service import ExportServer, ExportService
+
+
+class TestExportService(unittest.TestCase):
+
+	def setUp(self) -> None:
+		self.server = MockZyBooks(numStudents=10, pendingDuration=0.0)
+		self.server.Start()
+		self.tmpDir = tempfile.TemporaryDirectory()
+		self.jobFile = JobFile(
+			{
+				'host': self.server.GetHost(),
+				'scheme': 'http',
+				'token': 'x',
+				'uid': 1,
+				'reportCache': os.path.join(self.tmpDir.name, 'cache'),
+				'pollPolicy': { 'initialInterval': 0.01 },
+				'defaults': {
+					'course': 'MockCourse1',
+					'timezone': 'America/Los_Angeles',
+				},
+			},
+			baseDir=self.tmpDir.name,
+			requireJobs=False,
+		)
+
+	def tearDown(self) -> None:
+		self.server.Stop()
+		self.tmpDir.cleanup()
+
+	def test_SectionOrderDoesNotMatter(self) -> None:
+		service = ExportService(self.jobFile)
+		date = '2024-03-08 23:59:59'
+
+		_, df1, _ = service.ExportReport({ 'sections': [ 100002, 100001 ], 'date': date })
+		numExports = self.server.GetStats().get('export', 0)
+		_, df2, _ = service.ExportReport({ 'sections': [ 100001, 100002 ], 'date': date })
+
+		pandas.testing.assert_frame_equal(df1, df2)
+		# served from the report cache
+		self.assertEqual(self.server.GetStats().get('export', 0), numExports)
+
+	def test_JobWithDatetimes(self) -> None:
+		service = ExportService(self.jobFile)
+		_, df, _ = service.ExportJob({
+			'assignment': 1001,
+			'due': datetime.datetime(2024, 3, 8, 23, 59, 59),
+			'lateDues': [
+				{ 'due': datetime.date(2024, 3, 10), 'policy': { 'multiplier': 0.5 } },
+			],
+		})
+		self.assertEqual(len(df), 10)
+
+	def test_FullJobQueueIsRejected(self) -> None:
+		release = threading.Event()
+		started = threading.Event()
+
+		def _ExportReport(spec: dict) -> tuple:
+			started.set()
+			release.wait(timeout=10.0)
+			return 'report.csv', pandas.DataFrame({ 'a': [ 1 ] }), False
+
+		service = ExportService(self.jobFile)
+		service.ExportReport = _ExportReport
+
+		def _Post(url: str) -> int:
+			req = urllib.request.Request(url, data=json.dumps({}).encode('utf-8'))
+			try:
+				with urllib.request.urlopen(req, timeout=10.0) as resp:
+					return resp.status
+			except urllib.error.HTTPError as e:
+				return e.code
+
+		with ExportServer(service, port=0, maxJobs=1, maxQueuedJobs=0) as server:
+			url = f'{server.GetBaseUrl()}/v1/report'
+			statuses = []
+			first = threading.Thread(target=lambda: statuses.append(_Post(url)))
+			first.start()
+			self.assertTrue(started.wait(timeout=10.0))
+
+			self.assertEqual(_Post(url), 503)
+
+			release.set()
+			first.join()
+			self.assertEqual(statuses, [ 200 ])
+			self.assertEqual(_Post(url), 200)
+
+	def test_InvalidContentLength(self) -> None:
+		service = ExportService(self.jobFile)
+		with ExportServer(service, port=0) as server:
+			conn = http.client.HTTPConnection(server.GetHost(), timeout=10.0)
+			conn.putrequest('POST', '/v1/report')
+			conn.putheader('Content-Length', 'abc')
+			conn.endheaders()
+			resp = conn.getresponse()
+			self.assertEqual(resp.status, 400)
+			self.assertFalse(json.loads(resp.read())['success'])
+			conn.close()
+
+			self.assertEqual(server.GetStats()['requests']['status.400'], 1)
+
+
+if __name__ == '__main__':
+	unittest.main()
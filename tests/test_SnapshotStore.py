@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import tempfile
+import types
+import unittest
+
+import numpy
+import pandas
+
+from zyAPI.Due.Datetime import Datetime
+from zyAPI.SnapshotStore import SnapshotStore
+
+
+TZ = 'America/Los_Angeles'
+NUM_SNAPSHOTS = 11
+KEYFRAME_INTERVAL = 4
+
+# the store only needs the course code and the ID of an assignment
+ASSIGNMENT = types.SimpleNamespace(
+	course=types.SimpleNamespace(code='MockCourse1'),
+	id=1001,
+)
+
+
+def _GetDate(i: int) -> Datetime:
+	return Datetime.FromComponents(2024, 1, 1 + i, 23, 59, 59, TZ)
+
+
+def _MakeReports() -> list:
+	'''
+	A report per day, where a few students make progress every day.
+	'''
+	rng = numpy.random.default_rng(0)
+	numStudents = 20
+	emails = [ f'student{i}@example.com' for i in range(numStudents) ]
+	values = numpy.zeros((numStudents, 3))
+	values[0, 1] = numpy.nan
+
+	reports = []
+	for i in range(NUM_SNAPSHOTS):
+		rows = rng.choice(numStudents, size=3, replace=False)
+		values[rows, 0] += rng.random(3)
+		values[rows, 2] = values[rows, 0]
+		df = pandas.DataFrame(
+			{
+				'last_name': [ f'Last{j}' for j in range(numStudents) ],
+				'first_name': [ f'First{j}' for j in range(numStudents) ],
+				'school_email': [
+					numpy.nan if j % 3 == 0 else f'student{j}@ucsc.edu'
+					for j in range(numStudents)
+				],
+				'100001': values[:, 0].copy(),
+				'100001.participation': values[:, 1].copy(),
+				'total': values[:, 2].copy(),
+			},
+			index=pandas.Index(emails, name='primary_email'),
+		)
+		reports.append(df)
+	return reports
+
+
+class TestSnapshotStore(unittest.TestCase):
+
+	def setUp(self) -> None:
+		self.tmpDir = tempfile.TemporaryDirectory()
+		self.reports = _MakeReports()
+
+	def tearDown(self) -> None:
+		self.tmpDir.cleanup()
+
+	def CreateStore(self, maxDecoded: int=8) -> SnapshotStore:
+		return SnapshotStore(
+			self.tmpDir.name,
+			keyframeInterval=KEYFRAME_INTERVAL,
+			maxDecoded=maxDecoded,
+		)
+
+	def PutAll(self, store: SnapshotStore) -> None:
+		for i, df in enumerate(self.reports):
+			store.Put(ASSIGNMENT, _GetDate(i), f'report{i}.csv', df)
+
+	def AssertReadsBack(self, store: SnapshotStore, order: list) -> None:
+		for i in order:
+			pandas.testing.assert_frame_equal(
+				store.GetClassAt(ASSIGNMENT, _GetDate(i)),
+				self.reports[i],
+			)
+
+	def test_KeyframeBoundary(self) -> None:
+		store = self.CreateStore()
+		self.PutAll(store)
+
+		index = store._GetIndex(store._GetAsgDir(ASSIGNMENT))
+		depths = [ index[k]['depth'] for k in store._GetSortedKeys(index) ]
+		self.assertEqual(
+			depths,
+			[ i % KEYFRAME_INTERVAL for i in range(NUM_SNAPSHOTS) ],
+		)
+		self.assertEqual(
+			[ filename for _, filename in store.ListSnapshots(ASSIGNMENT) ],
+			[ f'report{i}.csv' for i in range(NUM_SNAPSHOTS) ],
+		)
+
+		# from the decoded snapshots, and then from disk alone
+		self.AssertReadsBack(store, range(NUM_SNAPSHOTS))
+		self.AssertReadsBack(self.CreateStore(), range(NUM_SNAPSHOTS))
+		self.AssertReadsBack(self.CreateStore(), reversed(range(NUM_SNAPSHOTS)))
+
+		store = self.CreateStore()
+		self.assertIsNone(store.GetClassAt(
+			ASSIGNMENT,
+			Datetime.FromComponents(2023, 12, 31, 23, 59, 59, TZ),
+		))
+		# between two snapshots, the earlier one
+		date = Datetime.FromComponents(2024, 1, 3, 12, 0, 0, TZ)
+		pandas.testing.assert_frame_equal(
+			store.GetClassAt(ASSIGNMENT, date),
+			self.reports[1],
+		)
+
+		history = store.GetStudentHistory(ASSIGNMENT, 'student5@example.com')
+		self.assertEqual(
+			list(history.to_numpy()),
+			[ df.loc['student5@example.com', 'total'] for df in self.reports ],
+		)
+		pandas.testing.assert_series_equal(
+			store.GetStudentAt(ASSIGNMENT, 'student0@example.com', _GetDate(7)),
+			self.reports[7].loc['student0@example.com', '100001':'total'].astype(float),
+			check_names=False,
+		)
+
+	def test_NewStudentIsKeyframe(self) -> None:
+		store = self.CreateStore()
+		store.Put(ASSIGNMENT, _GetDate(0), 'report0.csv', self.reports[0])
+		df = self.reports[1].copy()
+		df.loc['new@example.com'] = [ 'New', 'Student', numpy.nan, 1.0, 0.0, 1.0 ]
+		self.reports[1] = df
+		store.Put(ASSIGNMENT, _GetDate(1), 'report1.csv', df)
+
+		index = store._GetIndex(store._GetAsgDir(ASSIGNMENT))
+		self.assertEqual([ e['depth'] for e in index.values() ], [ 0, 0 ])
+		self.AssertReadsBack(self.CreateStore(), [ 1, 0 ])
+
+	def test_DecodedLru(self) -> None:
+		store = self.CreateStore(maxDecoded=2)
+		self.PutAll(store)
+		asgDir = store._GetAsgDir(ASSIGNMENT)
+		keys = store._GetSortedKeys(store._GetIndex(asgDir))
+		# only the latest snapshots are kept decoded
+		self.assertEqual(
+			list(store.decoded.keys()),
+			[ (asgDir, keys[-2]), (asgDir, keys[-1]) ],
+		)
+
+		store = self.CreateStore(maxDecoded=2)
+		store.GetClassAt(ASSIGNMENT, _GetDate(6))
+		store.GetClassAt(ASSIGNMENT, _GetDate(5))
+		# reading 6 again makes 5 the least recently used
+		store.GetClassAt(ASSIGNMENT, _GetDate(6))
+		store.GetClassAt(ASSIGNMENT, _GetDate(7))
+		self.assertEqual(
+			list(store.decoded.keys()),
+			[ (asgDir, keys[6]), (asgDir, keys[7]) ],
+		)
+		self.AssertReadsBack(store, [ 3, 9, 0, 10, 4 ])
+		self.assertEqual(len(store.decoded), 2)
+
+		# and without keeping any decoded
+		store = self.CreateStore(maxDecoded=0)
+		self.AssertReadsBack(store, range(NUM_SNAPSHOTS))
+		self.assertEqual(len(store.decoded), 0)
+
+
+if __name__ == '__main__':
+	unittest.main()
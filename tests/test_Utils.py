@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import re
+import unittest
+
+import numpy
+import pandas
+
+from zyAPI.Utils import Report
+
+
+EMAIL_FORMAT = r'@ucsc\.edu$'
+
+
+def _BaselineMergeEmailCols(df: pandas.DataFrame, preferredEmailFormat: str) -> None:
+	# the iterrows implementation MergeEmailCols replaced, up to the duplicate
+	# check (which failed on its own NaN emails)
+	for index, row in df.iterrows():
+		if re.search(preferredEmailFormat, index):
+			df.at[index, 'email'] = index
+		elif pandas.isna(row['school_email']):
+			df.at[index, 'email'] = index
+		elif re.search(preferredEmailFormat, row['school_email']):
+			df.at[index, 'email'] = row['school_email']
+
+	df.drop(columns=['school_email'], inplace=True)
+	df.reset_index(drop=True, inplace=True)
+	df.set_index('email', inplace=True)
+
+
+def _MakeRoster(rows: list) -> pandas.DataFrame:
+	return pandas.DataFrame(
+		{
+			'primary_email': [ primary for primary, _ in rows ],
+			'school_email': [ school for _, school in rows ],
+			'first_name': [ f'First{i}' for i in range(len(rows)) ],
+			'last_name': [ f'Last{i}' for i in range(len(rows)) ],
+		},
+	).set_index('primary_email')
+
+
+class TestMergeEmailCols(unittest.TestCase):
+
+	def Merge(self, rows: list) -> tuple:
+		df = _MakeRoster(rows)
+		baselineDf = _MakeRoster(rows)
+		Report.MergeEmailCols(df, EMAIL_FORMAT)
+		_BaselineMergeEmailCols(baselineDf, EMAIL_FORMAT)
+		return df, baselineDf
+
+	def test_MatchesBaseline(self) -> None:
+		rows = [
+			# the primary email matches
+			('a@ucsc.edu', 'a2@ucsc.edu'),
+			('b@ucsc.edu', numpy.nan),
+			# the school email is NaN
+			('c@gmail.com', numpy.nan),
+			('d@gmail.com', None),
+			# the school email matches
+			('e@gmail.com', 'e@ucsc.edu'),
+			('f@yahoo.com', 'f@ucsc.edu'),
+		]
+		df, baselineDf = self.Merge(rows)
+		pandas.testing.assert_frame_equal(df, baselineDf)
+		self.assertEqual(
+			list(df.index),
+			[ 'a@ucsc.edu', 'b@ucsc.edu', 'c@gmail.com', 'd@gmail.com', 'e@ucsc.edu', 'f@ucsc.edu' ],
+		)
+
+		# a school_email column with nothing but NaN
+		rows = [ ('a@ucsc.edu', numpy.nan), ('b@gmail.com', numpy.nan) ]
+		df, baselineDf = self.Merge(rows)
+		pandas.testing.assert_frame_equal(df, baselineDf)
+		self.assertEqual(list(df.index), [ 'a@ucsc.edu', 'b@gmail.com' ])
+
+	def test_NeitherMatches(self) -> None:
+		rows = [
+			('a@ucsc.edu', numpy.nan),
+			('b@gmail.com', 'b@yahoo.com'),
+			('c@gmail.com', 'c@ucsc.edu'),
+		]
+		df, baselineDf = self.Merge(rows)
+		# the baseline left the email NaN; the primary email is kept instead
+		self.assertTrue(pandas.isna(baselineDf.index[1]))
+		self.assertEqual(list(df.index), [ 'a@ucsc.edu', 'b@gmail.com', 'c@ucsc.edu' ])
+		pandas.testing.assert_frame_equal(
+			df.reset_index(drop=True),
+			baselineDf.reset_index(drop=True),
+		)
+		# and it still fails the format check, as the NaN email did
+		with self.assertRaises(ValueError):
+			Report.CheckEmailsFormat(df, EMAIL_FORMAT)
+
+		# with no email set at all, the baseline didn't even have the column
+		rows = [ ('a@gmail.com', 'a@yahoo.com'), ('b@gmail.com', 'b@yahoo.com') ]
+		with self.assertRaises(KeyError):
+			_BaselineMergeEmailCols(_MakeRoster(rows), EMAIL_FORMAT)
+		df = _MakeRoster(rows)
+		Report.MergeEmailCols(df, EMAIL_FORMAT)
+		self.assertEqual(list(df.index), [ 'a@gmail.com', 'b@gmail.com' ])
+
+	def test_Duplicates(self) -> None:
+		rows = [ ('a@gmail.com', 'a@ucsc.edu'), ('a@ucsc.edu', numpy.nan) ]
+		with self.assertRaisesRegex(ValueError, 'a@ucsc.edu'):
+			Report.MergeEmailCols(_MakeRoster(rows), EMAIL_FORMAT)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import aiohttp
+import asyncio
+import contextlib
+import logging
+
+from typing import AsyncIterator, Union
+from .Auth.Auth import Auth
+from .ExportPoller import ExportPollState, PollPolicy
+from .Host import Host
+from .Instrumentation import Instrumentation
+from .Journal import Journal
+from .MetadataCache import MetadataCache
+from .RateLimiter import RateLimiter
+from .ReportCache import ReportCache
+from .Transport import TransportConfig
+
+
+class AsyncHost(object):
+	'''
+	The asyncio counterpart of `Host`.
+	All requests share one pooled `aiohttp.ClientSession`, which is created
+	on first use, so the host must be used (and closed) within a running
+	event loop, e.g.,
+	```
+	async with AsyncHost('zyserver.zybooks.com') as host:
+		...
+	```
+	As with `Host`, requests are only rate limited if a `rateLimiter` is
+	given, and the timeouts and retries of the requests are those of
+	`transport`, except for its connection pool settings, which are
+	`connLimit` and `connLimitPerHost`.
+	'''
+
+	LOGGER = logging.getLogger(f'{__name__}')
+
+	def __init__(
+		self,
+		host: str,
+		pollPolicy: Union[PollPolicy, None]=None,
+		transport: Union[TransportConfig, None]=None,
+		connLimit: int=100,
+		connLimitPerHost: int=0,
+		reportCache: Union[ReportCache, None]=None,
+		metadataCache: Union[MetadataCache, None]=None,
+		rateLimiter: Union[RateLimiter, None]=None,
+		journal: Union[Journal, None]=None,
+		scheme: str='https',
+		instrumentation: Union[Instrumentation, None]=None,
+	) -> None:
+		super(AsyncHost, self).__init__()
+
+		self.logger = logging.getLogger(f'{__name__}.{self.__class__.__name__}')
+
+		if scheme not in ('https', 'http'):
+			raise ValueError(f'Unsupported URL scheme: {scheme}')
+
+		self.host = host
+		self.scheme = scheme
+		self.pollPolicy = PollPolicy() if pollPolicy is None else pollPolicy
+		self.transport = TransportConfig() if transport is None else transport
+		self.connLimit = connLimit
+		self.connLimitPerHost = connLimitPerHost
+		self.reportCache = reportCache
+		self.metadataCache = metadataCache
+		self.journal = journal
+		# no client-side rate limit unless one is given
+		self.rateLimiter = rateLimiter
+		self.instrumentation = (
+			Instrumentation() if instrumentation is None else instrumentation
+		)
+		self.session = None
+
+	def __str__(self) -> str:
+		return f'AsyncHost(host={self.host})'
+
+	async def __aenter__(self) -> 'AsyncHost':
+		return self
+
+	async def __aexit__(self, excType, excValue, traceback) -> None:
+		await self.Close()
+
+	def GetHost(self) -> str:
+		return self.host
+
+	def GetBaseUrl(self) -> str:
+		'''
+		The URL that API paths are appended to; the scheme is `https` unless
+		the host is, e.g., a local test server.
+		'''
+		return f'{self.scheme}://{self.host}'
+
+	def GetSession(self) -> aiohttp.ClientSession:
+		if (self.session is None) or self.session.closed:
+			self.session = aiohttp.ClientSession(
+				connector=aiohttp.TCPConnector(
+					limit=self.connLimit,
+					limit_per_host=self.connLimitPerHost,
+				),
+				timeout=aiohttp.ClientTimeout(
+					total=None,
+					connect=self.transport.connectTimeout,
+					sock_read=self.transport.readTimeout,
+				),
+			)
+		return self.session
+
+	async def Close(self) -> None:
+		if self.session is not None:
+			await self.session.close()
+			self.session = None
+
+	@classmethod
+	def CheckRespJsonSuccess(cls, resp: dict) -> dict:
+		return Host.CheckRespJsonSuccess(resp)
+
+	@classmethod
+	def _EncodeParams(cls, params: Union[dict, None]) -> Union[dict, None]:
+		# aiohttp only accepts str, int and float values;
+		# booleans are encoded the same way as requests does
+		if params is None:
+			return None
+		return {
+			k: (str(v) if isinstance(v, bool) else v)
+			for k, v in params.items()
+		}
+
+	@contextlib.asynccontextmanager
+	async def Request(
+		self,
+		kind: str,
+		method: str,
+		url: str,
+		idempotent: bool=True,
+		**kwargs,
+	) -> AsyncIterator[aiohttp.ClientResponse]:
+		'''
+		Send a request through the rate limiter bucket of `kind`
+		(`api`, `poll` or `download`), if the host has a rate limiter;
+		see `Host.Request`.
+		The rate limiter may lock and update its state file, so it's called
+		off the event loop.
+		Requests are retried as by the sessions of `Host`: failed connections
+		always, and, if the request is `idempotent`, errors, timeouts and the
+		`retryStatuses` of the transport, with the same backoff.
+		'''
+		transport = self.transport
+		canRetry = idempotent and (method.upper() in transport.RETRY_METHODS)
+
+		with self.instrumentation.Span(f'http.{kind}', method=method) as span:
+			totalWait = 0.0
+			numRetries = 0
+			while True:
+				if self.rateLimiter is not None:
+					wait = await asyncio.to_thread(self.rateLimiter.Reserve, kind)
+					totalWait += wait
+					if wait > 0.0:
+						await asyncio.sleep(wait)
+
+				try:
+					resp = await self.GetSession().request(method, url, **kwargs)
+				except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+					# the request never reached the server if the connection
+					# failed
+					isConnError = isinstance(e, aiohttp.ClientConnectorError)
+					if (
+						(numRetries >= transport.retries) or
+						not (canRetry or isConnError)
+					):
+						raise
+					numRetries += 1
+					self.logger.debug(f'Retrying {method} {url} after: {e!r}')
+					await asyncio.sleep(transport.GetBackoff(numRetries))
+					continue
+
+				async with resp:
+					if self.rateLimiter is not None:
+						await asyncio.to_thread(
+							self.rateLimiter.OnResponse,
+							kind,
+							resp.status,
+							resp.headers,
+						)
+
+					if (
+						canRetry and
+						(resp.status in transport.retryStatuses) and
+						(numRetries < transport.retries)
+					):
+						numRetries += 1
+						retryAfter = RateLimiter.ParseRetryAfter(
+							resp.headers.get('Retry-After', None)
+						)
+						self.logger.debug(
+							f'Retrying {method} {url} after status {resp.status}'
+						)
+						await asyncio.sleep(
+							transport.GetBackoff(numRetries)
+							if retryAfter is None else retryAfter
+						)
+						continue
+
+					span.SetAttribute('rateLimitWait', totalWait)
+					span.SetAttribute('retries', numRetries)
+					span.SetAttribute('status', resp.status)
+					yield resp
+
+					self.instrumentation.Count(
+						'http.bytes',
+						resp.content.total_bytes,
+						kind=kind,
+					)
+					return
+
+	async def GetJson(
+		self,
+		url: str,
+		headers: dict,
+		params: Union[dict, None]=None,
+		cacheEndpoint: Union[str, None]=None,
+		kind: str='api',
+		idempotent: bool=True,
+	) -> dict:
+		'''
+		GET a JSON API response; see `Host.GetJson`.
+		Requests that aren't `idempotent`, i.e., export submissions, are
+		neither cached nor retried once they may have reached the server.
+		'''
+		if (
+			(cacheEndpoint is None) or
+			(self.metadataCache is None) or
+			(not idempotent)
+		):
+			async with self.Request(
+				kind,
+				'GET',
+				url,
+				idempotent=idempotent,
+				headers=headers,
+				params=self._EncodeParams(params),
+			) as resp:
+				return await resp.json(content_type=None)
+
+		cache = self.metadataCache
+		key = cache.MakeKey(cacheEndpoint, url, headers, params)
+
+		value = cache.GetFresh(key)
+		if value is not None:
+			return value
+
+		reqHeaders = dict(headers)
+		reqHeaders.update(cache.GetRevalidationHeaders(key))
+		async with self.Request(
+			kind,
+			'GET',
+			url,
+			headers=reqHeaders,
+			params=self._EncodeParams(params),
+		) as resp:
+			# the cache may be persisted to a file, so it's updated off the
+			# event loop
+			if resp.status == 304:
+				value = await asyncio.to_thread(cache.Revalidated, key)
+				if value is not None:
+					return value
+			else:
+				value = await resp.json(content_type=None)
+				if resp.ok and value.get('success', False):
+					await asyncio.to_thread(
+						cache.Store,
+						cacheEndpoint,
+						key,
+						value,
+						resp.headers,
+					)
+				return value
+
+		# invalidated since the request was sent
+		async with self.Request(
+			kind,
+			'GET',
+			url,
+			headers=headers,
+			params=self._EncodeParams(params),
+		) as resp:
+			value = await resp.json(content_type=None)
+			if resp.ok and value.get('success', False):
+				await asyncio.to_thread(
+					cache.Store,
+					cacheEndpoint,
+					key,
+					value,
+					resp.headers,
+				)
+			return value
+
+	def InvalidateMetadata(self, endpoint: Union[str, None]=None) -> None:
+		if self.metadataCache is not None:
+			self.metadataCache.Invalidate(endpoint)
+
+	async def GetText(
+		self,
+		url: str,
+		headers: dict,
+		params: Union[dict, None]=None,
+	) -> str:
+		async with self.Request(
+			'api',
+			'GET',
+			url,
+			headers=headers,
+			params=self._EncodeParams(params),
+		) as resp:
+			return await resp.text()
+
+	async def DownloadToFile(
+		self,
+		url: str,
+		headers: dict,
+		path: str,
+		chunkSize: int=64 * 1024,
+	) -> None:
+		async with self.Request('download', 'GET', url, headers=headers) as resp:
+			resp.raise_for_status()
+			with open(path, 'wb') as f:
+				async for chunk in resp.content.iter_chunked(chunkSize):
+					f.write(chunk)
+
+	async def ExportWait(
+		self,
+		auth: Auth,
+		exportDict: dict,
+		policy: Union[PollPolicy, None]=None,
+	) -> str:
+		'''
+		Poll the export with the backoff of `policy` (or the host's default
+		`PollPolicy`), and return the URL of the exported file.
+		Many exports can be awaited concurrently on the same event loop.
+		'''
+		if not exportDict['success']:
+			raise RuntimeError('Export failed')
+
+		policy = self.pollPolicy if policy is None else policy
+
+		loc = exportDict['location']
+
+		headers = {}
+		auth.AddAuth(headers)
+
+		state = ExportPollState(policy)
+		while True:
+			statusDict = await self.GetJson(loc, headers=headers, kind='poll')
+			url = state.OnStatus(statusDict, self.instrumentation)
+			if url is not None:
+				return url
+
+			await asyncio.sleep(state.GetNextDelay())
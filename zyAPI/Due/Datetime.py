@@ -10,6 +10,8 @@
 
 import datetime
 
+from typing import Tuple
+
 try:
 	import zoneinfo
 except ImportError:
@@ -40,6 +42,19 @@ class Datetime(object):
 	def GetZyTimezoneOffsetMin(self) -> int:
 		return -1 * self.GetTimezoneOffsetMin()
 
+	def GetReportKey(self) -> Tuple[str, str, int]:
+		'''
+		Two datetimes with the same key produce the same report.
+		'''
+		return (
+			self.GetUtcTimestampStr(),
+			self.GetTimezoneAbbr(),
+			self.GetZyTimezoneOffsetMin(),
+		)
+
+	def IsPast(self) -> bool:
+		return self.datetime < datetime.datetime.now(tz=datetime.timezone.utc)
+
 	def GetReportNameSuffix(self) -> str:
 		# report_2024-01-20_0759_PST
 		return self.datetime.strftime('%Y-%m-%d_%H%M_%Z')
@@ -8,9 +8,15 @@
 ###
 
 
-import pandas
 
+from __future__ import annotations
+
+from typing import List, Tuple, Union
 from .Datetime import Datetime
+from .._LazyModule import LazyModule
+
+
+pandas = LazyModule('pandas')
 
 
 class Due(object):
@@ -23,6 +29,15 @@ class Due(object):
 
 		self.dueDate = dueDate
 
+	def GetDueDateGroups(self) -> List[Tuple[Datetime, Union[List[str], None]]]:
+		'''
+		Returns the due dates of this due, each with the emails of the
+		students it applies to.
+		The first group is the default due date, whose email list is None,
+		i.e., every student not in the other groups.
+		'''
+		return [ (self.dueDate, None) ]
+
 	def Apply2Pd(
 		self,
 		df: pandas.DataFrame,
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+
+from __future__ import annotations
+
+from typing import List, Mapping, Tuple, Union
+from .Datetime import Datetime
+from .Due import Due
+from .._LazyModule import LazyModule
+
+
+pandas = LazyModule('pandas')
+
+
+class DueWithExtensions(Due):
+	'''
+	A due whose due date is extended for some students.
+	`extensions` maps the email (primary or school email) of a student to
+	their own due date; the late policy of `base` is applied to everyone.
+	Students with the same due date are grouped together, so each distinct
+	due date is only exported once.
+	'''
+
+	def __init__(
+		self,
+		base: Due,
+		extensions: Mapping[str, Datetime],
+	) -> None:
+		super(DueWithExtensions, self).__init__(dueDate=base.dueDate)
+
+		self.base = base
+		self.extensions = dict(extensions)
+
+	def __str__(self) -> str:
+		return (
+			f'{self.__class__.__name__}' +
+			f'(base={self.base}, ' +
+			f'numExtensions={len(self.extensions)})'
+		)
+
+	def GetDueDateGroups(self) -> List[Tuple[Datetime, Union[List[str], None]]]:
+		baseKey = self.dueDate.GetReportKey()
+
+		# key -> (due date, emails)
+		groups = {}
+		for email, date in self.extensions.items():
+			key = date.GetReportKey()
+			if key == baseKey:
+				# not really an extension
+				continue
+			groups.setdefault(key, (date, []))[1].append(email)
+
+		return [ (self.dueDate, None) ] + list(groups.values())
+
+	def Apply2Pd(
+		self,
+		df: pandas.DataFrame,
+		totalColName: str,
+		destColName: str,
+	) -> pandas.DataFrame:
+		return self.base.Apply2Pd(
+			df=df,
+			totalColName=totalColName,
+			destColName=destColName,
+		)
@@ -8,14 +8,28 @@
 ###
 
 
-import pandas
 
-from typing import Callable
+from __future__ import annotations
+
+from typing import Callable, Union
 from .Datetime import Datetime
 from .Due import Due
+from .._LazyModule import LazyModule
+
+
+numpy = LazyModule('numpy')
+pandas = LazyModule('pandas')
 
 
 class DueWithLambdaPolicy(Due):
+	'''
+	A late policy given as a function of a single score.
+	The first time it is applied to more than one score, the function is
+	tried on the whole array of scores, e.g., `lambda x: x * 0.5` works on
+	arrays as is; if that fails or disagrees with calling it on a single
+	score (or fails on a later array), it is vectorized with
+	`numpy.frompyfunc` instead.
+	'''
 
 	def __init__(
 		self,
@@ -25,6 +39,61 @@ class DueWithLambdaPolicy(Due):
 		super(DueWithLambdaPolicy, self).__init__(dueDate=dueDate)
 
 		self.policy = policy
+		# whether the policy accepts arrays; None until probed
+		self.isArrayPolicy = None
+
+	@classmethod
+	def _SameResult(cls, a, b) -> bool:
+		try:
+			return bool((a == b) or (pandas.isna(a) and pandas.isna(b)))
+		except (TypeError, ValueError):
+			return False
+
+	def _ProbeArrayPolicy(self, scores: numpy.ndarray) -> Union[numpy.ndarray, None]:
+		'''
+		Returns the result of applying the policy to the whole array,
+		or None if the policy doesn't work on arrays.
+		'''
+		try:
+			res = self.policy(scores)
+		except Exception:
+			return None
+
+		if (
+			(not isinstance(res, numpy.ndarray)) or
+			(res.shape != scores.shape)
+		):
+			return None
+
+		# spot check against applying it to single scores
+		for i in { 0, len(scores) - 1 }:
+			if not self._SameResult(self.policy(scores[i]), res[i]):
+				return None
+
+		return res
+
+	def Evaluate(self, scores: numpy.ndarray) -> numpy.ndarray:
+		if len(scores) == 0:
+			return scores
+
+		if self.isArrayPolicy is None:
+			# a single score can't tell, e.g., `x * 0.5 if x > 50 else 0`
+			# works on an array of one score but not on longer ones
+			if len(scores) > 1:
+				res = self._ProbeArrayPolicy(scores)
+				self.isArrayPolicy = res is not None
+				if res is not None:
+					return res
+		elif self.isArrayPolicy:
+			try:
+				return self.policy(scores)
+			except Exception:
+				self.isArrayPolicy = False
+
+		# as with Series.apply, the policy gets python objects, and no
+		# floating point warnings are raised on its behalf
+		with numpy.errstate(all='ignore'):
+			return numpy.frompyfunc(self.policy, 1, 1)(scores.astype(object))
 
 	def Apply2Pd(
 		self,
@@ -32,6 +101,7 @@ class DueWithLambdaPolicy(Due):
 		totalColName: str,
 		destColName: str,
 	) -> pandas.DataFrame:
-		df[destColName] = df[totalColName].apply(self.policy)
+		scores = df[totalColName].to_numpy()
+		res = self.Evaluate(scores)
+		df[destColName] = pandas.Series(res, index=df.index).infer_objects()
 		return df
-
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+
+from __future__ import annotations
+
+from typing import Sequence, Tuple, Union
+from .Datetime import Datetime
+from .Due import Due
+from .._LazyModule import LazyModule
+
+
+numpy = LazyModule('numpy')
+pandas = LazyModule('pandas')
+
+
+class DueWithVectorPolicy(Due):
+	'''
+	A late policy described declaratively, and evaluated on all scores at
+	once with numpy.
+	The steps are applied in the following order, each one being optional:
+
+	1. `piecewise`: `(xs, ys)`, linear interpolation between the points
+	   `(xs[i], ys[i])`, and constant beyond the first and the last point;
+	   `xs` must be increasing.
+	2. `steps`: `(bounds, values)`, a step table mapping scores in
+	   `[bounds[i - 1], bounds[i])` to `values[i]`, where
+	   `len(values) == len(bounds) + 1`; `bounds` must be increasing.
+	3. `multiplier`: the score is multiplied by it.
+	4. `floor` and `cap`: the score is clipped to `[floor, cap]`.
+
+	NaN scores stay NaN.
+	'''
+
+	def __init__(
+		self,
+		dueDate: Datetime,
+		multiplier: float=1.0,
+		piecewise: Union[Tuple[Sequence[float], Sequence[float]], None]=None,
+		steps: Union[Tuple[Sequence[float], Sequence[float]], None]=None,
+		floor: Union[float, None]=None,
+		cap: Union[float, None]=None,
+	) -> None:
+		super(DueWithVectorPolicy, self).__init__(dueDate=dueDate)
+
+		self.multiplier = multiplier
+		self.piecewise = None
+		self.steps = None
+		self.floor = floor
+		self.cap = cap
+
+		if piecewise is not None:
+			xs = numpy.asarray(piecewise[0], dtype=float)
+			ys = numpy.asarray(piecewise[1], dtype=float)
+			if (xs.ndim != 1) or (xs.shape != ys.shape) or (len(xs) == 0):
+				raise ValueError('piecewise must be two non-empty sequences of the same length')
+			if numpy.any(numpy.diff(xs) <= 0):
+				raise ValueError('piecewise x values must be increasing')
+			self.piecewise = (xs, ys)
+
+		if steps is not None:
+			bounds = numpy.asarray(steps[0], dtype=float)
+			values = numpy.asarray(steps[1], dtype=float)
+			if (bounds.ndim != 1) or (len(values) != len(bounds) + 1):
+				raise ValueError('steps must have one more value than bounds')
+			if numpy.any(numpy.diff(bounds) <= 0):
+				raise ValueError('steps bounds must be increasing')
+			self.steps = (bounds, values)
+
+		if (floor is not None) and (cap is not None) and (floor > cap):
+			raise ValueError('floor must not be greater than cap')
+
+	def __str__(self) -> str:
+		return (
+			f'{self.__class__.__name__}' +
+			f'(dueDate={self.dueDate}, ' +
+			f'multiplier={self.multiplier}, ' +
+			f'piecewise={self.piecewise is not None}, ' +
+			f'steps={self.steps is not None}, ' +
+			f'floor={self.floor}, ' +
+			f'cap={self.cap})'
+		)
+
+	def Evaluate(self, scores: numpy.ndarray) -> numpy.ndarray:
+		scores = numpy.asarray(scores, dtype=float)
+		nans = numpy.isnan(scores)
+		res = scores
+
+		if self.piecewise is not None:
+			xs, ys = self.piecewise
+			res = numpy.interp(res, xs, ys)
+
+		if self.steps is not None:
+			bounds, values = self.steps
+			res = values[numpy.searchsorted(bounds, res, side='right')]
+
+		if self.multiplier != 1.0:
+			res = res * self.multiplier
+
+		if (self.floor is not None) or (self.cap is not None):
+			res = numpy.clip(res, self.floor, self.cap)
+
+		if nans.any():
+			res = numpy.where(nans, numpy.nan, res)
+
+		return res
+
+	def Apply2Pd(
+		self,
+		df: pandas.DataFrame,
+		totalColName: str,
+		destColName: str,
+	) -> pandas.DataFrame:
+		df[destColName] = self.Evaluate(df[totalColName].to_numpy(dtype=float))
+		return df
@@ -8,3 +8,15 @@
 ###
 
 
+from .._LazyModule import LazySubmodules
+
+
+# submodules are only imported on first access (e.g., `zyAPI.Host`), so that
+# importing the package doesn't pull in pandas and numpy
+__getattr__, __dir__ = LazySubmodules(__name__, [
+	'Datetime',
+	'Due',
+	'DueWithExtensions',
+	'DueWithLambdaPolicy',
+	'DueWithVectorPolicy',
+])
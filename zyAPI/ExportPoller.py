@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import concurrent.futures
+import contextvars
+import heapq
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+import requests
+
+from typing import Callable, Union
+from .Auth.Auth import Auth
+from .Instrumentation import Instrumentation
+
+
+class PollPolicy(object):
+	'''
+	How often an export location is polled.
+	The interval starts at `initialInterval`, and is multiplied by
+	`multiplier` after each pending poll, up to `maxInterval`.
+	Each interval is randomly shortened by up to `jitter` (a fraction of the
+	interval), so that exports submitted together don't poll in lockstep.
+	Polling gives up once `deadline` seconds have passed since the export was
+	submitted, or after `maxPolls` polls; either one can be None to disable it.
+	'''
+
+	def __init__(
+		self,
+		initialInterval: float=0.5,
+		maxInterval: float=8.0,
+		multiplier: float=2.0,
+		jitter: float=0.25,
+		deadline: Union[float, None]=300.0,
+		maxPolls: Union[int, None]=None,
+	) -> None:
+		super(PollPolicy, self).__init__()
+
+		if initialInterval <= 0.0:
+			raise ValueError('initialInterval must be positive')
+		if maxInterval < initialInterval:
+			raise ValueError('maxInterval must not be less than initialInterval')
+		if multiplier < 1.0:
+			raise ValueError('multiplier must be at least 1.0')
+		if not (0.0 <= jitter < 1.0):
+			raise ValueError('jitter must be in [0.0, 1.0)')
+
+		self.initialInterval = initialInterval
+		self.maxInterval = maxInterval
+		self.multiplier = multiplier
+		self.jitter = jitter
+		self.deadline = deadline
+		self.maxPolls = maxPolls
+
+	def __str__(self) -> str:
+		return (
+			f'{self.__class__.__name__}' +
+			f'(initialInterval={self.initialInterval}, ' +
+			f'maxInterval={self.maxInterval}, ' +
+			f'multiplier={self.multiplier}, ' +
+			f'jitter={self.jitter}, ' +
+			f'deadline={self.deadline}, ' +
+			f'maxPolls={self.maxPolls})'
+		)
+
+	def NextInterval(self, interval: float) -> float:
+		return min(interval * self.multiplier, self.maxInterval)
+
+	def Jitter(self, interval: float) -> float:
+		return interval * (1.0 - (self.jitter * random.random()))
+
+
+class ExportPollState(object):
+	'''
+	The status polls of one export, shared by `ExportPoller` and
+	`AsyncHost.ExportWait`: checks the status returned by each poll, and
+	tells when to poll next according to the `PollPolicy`.
+	'''
+
+	def __init__(self, policy: PollPolicy) -> None:
+		super(ExportPollState, self).__init__()
+
+		self.logger = logging.getLogger(f'{__name__}.{self.__class__.__name__}')
+
+		self.policy = policy
+		self.interval = policy.initialInterval
+		self.numPolls = 0
+		if policy.deadline is None:
+			self.deadlineTime = None
+		else:
+			self.deadlineTime = time.monotonic() + policy.deadline
+
+	def OnStatus(
+		self,
+		statusDict: dict,
+		instrumentation: Instrumentation,
+	) -> Union[str, None]:
+		'''
+		Returns the URL of the exported file if the export succeeded, or None
+		if it's still pending; raises RuntimeError if it failed.
+		'''
+		self.numPolls += 1
+
+		if not statusDict['success']:
+			statusDictStr = json.dumps(statusDict, indent='\t')
+			self.logger.error(f'Export status failed:\n{statusDictStr}')
+			raise RuntimeError('Export status failed')
+
+		if statusDict['state'] == 'SUCCESS':
+			self.logger.debug(f'Export success after {self.numPolls} polls')
+			instrumentation.SetAttribute('polls', self.numPolls)
+			instrumentation.Count('export.polls', self.numPolls)
+			return statusDict['url']
+		elif statusDict['state'] != 'PENDING':
+			state = statusDict['state']
+			raise RuntimeError(f'Export failed with state: {state}')
+
+		self.logger.debug('Export pending')
+		return None
+
+	def GetNextDelay(self) -> float:
+		'''
+		How long to wait before polling the pending export again;
+		raises RuntimeError once the policy gives up.
+		'''
+		policy = self.policy
+		if (policy.maxPolls is not None) and (self.numPolls >= policy.maxPolls):
+			raise RuntimeError('Status polling exceeded maximum attempts')
+
+		delay = policy.Jitter(self.interval)
+		self.interval = policy.NextInterval(self.interval)
+		if self.deadlineTime is not None:
+			remaining = self.deadlineTime - time.monotonic()
+			if remaining <= 0.0:
+				raise RuntimeError('Status polling exceeded the deadline')
+			# make one last poll right at the deadline
+			delay = min(delay, remaining)
+
+		return delay
+
+
+class _PendingExport(object):
+
+	def __init__(
+		self,
+		location: str,
+		headers: dict,
+		policy: PollPolicy,
+	) -> None:
+		super(_PendingExport, self).__init__()
+
+		self.location = location
+		self.headers = headers
+		self.policy = policy
+		self.future = concurrent.futures.Future()
+		# the polls are sent in the context of the submitter, e.g., as
+		# children of its open span
+		self.context = contextvars.copy_context()
+		self.state = ExportPollState(policy)
+
+
+class ExportPoller(object):
+	'''
+	Watches many outstanding export locations from a single background
+	scheduler thread, polling each one according to its `PollPolicy`.
+	The polls that are due are sent by a pool of up to `maxWorkers`
+	threads, so a slow or throttled poll doesn't hold back the polls of
+	the other exports.
+	Every submitted export gets a future, which resolves to the URL of the
+	exported file once the export succeeds.
+	'''
+
+	def __init__(
+		self,
+		session: requests.Session,
+		policy: Union[PollPolicy, None]=None,
+		request: Union[Callable[..., requests.Response], None]=None,
+		instrumentation: Union[Instrumentation, None]=None,
+		maxWorkers: int=4,
+	) -> None:
+		super(ExportPoller, self).__init__()
+
+		if maxWorkers < 1:
+			raise ValueError('maxWorkers must be at least 1')
+
+		self.logger = logging.getLogger(f'{__name__}.{self.__class__.__name__}')
+
+		self.session = session
+		# how to send a poll, e.g., through a rate limiter;
+		# called as request(url, headers=headers)
+		self.request = session.get if request is None else request
+		self.policy = PollPolicy() if policy is None else policy
+		self.instrumentation = (
+			Instrumentation() if instrumentation is None else instrumentation
+		)
+
+		self.cond = threading.Condition()
+		# heap of (next poll time, sequence number, pending export)
+		self.schedule = []
+		self.seq = itertools.count()
+		self.thread = None
+		# number of polls sent to the workers and not finished yet
+		self.numInFlight = 0
+		self.executor = concurrent.futures.ThreadPoolExecutor(
+			max_workers=maxWorkers,
+			thread_name_prefix=f'{self.__class__.__name__}Worker',
+		)
+
+	def Submit(
+		self,
+		auth: Auth,
+		location: str,
+		policy: Union[PollPolicy, None]=None,
+		callback: Union[
+			Callable[[concurrent.futures.Future], None],
+			None
+		]=None,
+	) -> concurrent.futures.Future:
+		headers = {}
+		auth.AddAuth(headers)
+
+		pending = _PendingExport(
+			location=location,
+			headers=headers,
+			policy=self.policy if policy is None else policy,
+		)
+		if callback is not None:
+			pending.future.add_done_callback(callback)
+
+		with self.cond:
+			# the first poll happens right away
+			self._Schedule(pending, time.monotonic())
+			if (self.thread is None) or (not self.thread.is_alive()):
+				self.thread = threading.Thread(
+					target=self._Run,
+					name=f'{self.__class__.__name__}',
+					daemon=True,
+				)
+				self.thread.start()
+			self.cond.notify()
+
+		return pending.future
+
+	def GetNumPending(self) -> int:
+		with self.cond:
+			return len(self.schedule) + self.numInFlight
+
+	def _Schedule(self, pending: _PendingExport, pollTime: float) -> None:
+		heapq.heappush(self.schedule, (pollTime, next(self.seq), pending))
+
+	def _Run(self) -> None:
+		while True:
+			with self.cond:
+				while True:
+					if len(self.schedule) == 0:
+						if self.numInFlight == 0:
+							# nothing to watch; a new thread is started on
+							# submit
+							self.thread = None
+							return
+						# a poll in flight may be rescheduled
+						self.cond.wait()
+						continue
+
+					waitTime = self.schedule[0][0] - time.monotonic()
+					if waitTime <= 0.0:
+						break
+					self.cond.wait(timeout=waitTime)
+
+				_, _, pending = heapq.heappop(self.schedule)
+				if pending.future.cancelled():
+					continue
+				self.numInFlight += 1
+
+			self.executor.submit(self._PollAndReschedule, pending)
+
+	def _PollAndReschedule(self, pending: _PendingExport) -> None:
+		nextPollTime = None
+		try:
+			nextPollTime = pending.context.run(self._Poll, pending)
+		finally:
+			with self.cond:
+				self.numInFlight -= 1
+				if nextPollTime is not None:
+					self._Schedule(pending, nextPollTime)
+				self.cond.notify()
+
+	def _Poll(self, pending: _PendingExport) -> Union[float, None]:
+		'''
+		Poll the export once; returns the time of the next poll if the export
+		is still pending, or None if the future has been resolved.
+		'''
+		try:
+			resp = self.request(pending.location, headers=pending.headers)
+			url = pending.state.OnStatus(resp.json(), self.instrumentation)
+			if url is not None:
+				try:
+					pending.future.set_result(url)
+				except concurrent.futures.InvalidStateError:
+					# cancelled by the caller while polling
+					pass
+				return None
+
+			return time.monotonic() + pending.state.GetNextDelay()
+		except Exception as e:
+			try:
+				pending.future.set_exception(e)
+			except concurrent.futures.InvalidStateError:
+				# cancelled by the caller while polling
+				pass
+			return None
@@ -8,25 +8,87 @@
 ###
 
 
+import concurrent.futures
 import json
 import logging
-import time
 import requests
 
+from typing import Callable, Union
 from .Auth.Auth import Auth
+from .ExportPoller import ExportPoller, PollPolicy
+from .Instrumentation import Instrumentation
+from .Journal import Journal
+from .MetadataCache import MetadataCache
+from .RateLimiter import RateLimiter
+from .ReportCache import ReportCache
+from .SingleFlight import SingleFlight
+from .Transport import TransportConfig
 
 class Host(object):
+	'''
+	A zyBooks API server, through which all requests of the interfaces
+	(`Dashboard`, `Course`, `Assignment`) are sent.
+
+	Requests are not rate limited on the client side unless a
+	`rateLimiter` is given; `RateLimiter()` adapts to throttling with no
+	ceiling on its rates, so it finds the highest throughput the server
+	accepts, and it can be shared by many hosts, e.g.,
+	```
+	host = Host('zyserver.zybooks.com', rateLimiter=RateLimiter())
+	```
+	'''
 
 	LOGGER = logging.getLogger(f'{__name__}')
 
-	def __init__(self, host: str) -> None:
+	def __init__(
+		self,
+		host: str,
+		pollPolicy: Union[PollPolicy, None]=None,
+		transport: Union[TransportConfig, None]=None,
+		reportCache: Union[ReportCache, None]=None,
+		metadataCache: Union[MetadataCache, None]=None,
+		rateLimiter: Union[RateLimiter, None]=None,
+		journal: Union[Journal, None]=None,
+		scheme: str='https',
+		instrumentation: Union[Instrumentation, None]=None,
+	) -> None:
 		super(Host, self).__init__()
 
 		self.logger = logging.getLogger(f'{__name__}.{self.__class__.__name__}')
 
+		if scheme not in ('https', 'http'):
+			raise ValueError(f'Unsupported URL scheme: {scheme}')
+
 		self.host = host
+		self.scheme = scheme
+		self.transport = TransportConfig() if transport is None else transport
 		self.session = requests.Session()
+		self.sessionAdapter = self.transport.Mount(self.session)
 		self.exportSession = requests.Session()
+		self.exportSessionAdapter = self.transport.Mount(self.exportSession)
+		# a retried export submission could queue a duplicate export
+		self.submitSession = requests.Session()
+		self.submitSessionAdapter = self.transport.Mount(
+			self.submitSession,
+			idempotent=False,
+		)
+		# no client-side rate limit unless one is given
+		self.rateLimiter = rateLimiter
+		self.instrumentation = (
+			Instrumentation() if instrumentation is None else instrumentation
+		)
+		self.exportPoller = ExportPoller(
+			session=self.exportSession,
+			policy=pollPolicy,
+			request=self._RequestPoll,
+			instrumentation=self.instrumentation,
+		)
+		self.reportCache = reportCache
+		self.metadataCache = metadataCache
+		self.journal = journal
+		# identical report exports in flight, shared by the courses of this
+		# host (see `Course.ExportReportByDate`)
+		self.exportFlights = SingleFlight()
 
 	def __str__(self) -> str:
 		return f'Host(host={self.host})'
@@ -34,6 +96,25 @@ class Host(object):
 	def GetHost(self) -> str:
 		return self.host
 
+	def GetBaseUrl(self) -> str:
+		'''
+		The URL that API paths are appended to; the scheme is `https` unless
+		the host is, e.g., a local test server.
+		'''
+		return f'{self.scheme}://{self.host}'
+
+	def GetStats(self) -> dict:
+		return {
+			'transport': self.transport.ToDict(),
+			'session': self.sessionAdapter.GetStats(),
+			'exportSession': self.exportSessionAdapter.GetStats(),
+			'submitSession': self.submitSessionAdapter.GetStats(),
+			'rateLimiter': (
+				None if self.rateLimiter is None else self.rateLimiter.GetStats()
+			),
+			'exportFlights': self.exportFlights.GetStats(),
+		}
+
 	@classmethod
 	def CheckRespJsonSuccess(cls, resp: dict) -> dict:
 		if not resp['success']:
@@ -43,40 +124,155 @@ class Host(object):
 
 		return resp
 
-	def ExportWait(
+	def Request(
 		self,
-		auth: Auth,
-		exportDict: dict,
-		pollInterval: float=1.0,
-		pollTimes: int=50
-	) -> str:
-		if not exportDict['success']:
-			raise RuntimeError('Export failed')
+		kind: str,
+		method: str,
+		url: str,
+		session: Union[requests.Session, None]=None,
+		**kwargs,
+	) -> requests.Response:
+		'''
+		Send a request through the rate limiter bucket of `kind`
+		(`api`, `poll` or `download`), if the host has a rate limiter;
+		every request to zyBooks goes through here.
+		Throttled responses, including the ones retried by the transport,
+		slow the bucket down.
+		The bytes of streamed responses are counted by whoever reads them.
+		'''
+		session = self.session if session is None else session
+
+		with self.instrumentation.Span(f'http.{kind}', method=method) as span:
+			wait = 0.0
+			if self.rateLimiter is not None:
+				wait = self.rateLimiter.Acquire(kind)
+			resp = session.request(method, url, **kwargs)
+			span.SetAttribute('rateLimitWait', wait)
+			span.SetAttribute('status', resp.status_code)
 
-		loc = exportDict['location']
+		if self.rateLimiter is not None:
+			retries = getattr(resp.raw, 'retries', None)
+			if retries is not None:
+				for history in retries.history:
+					if history.status in self.rateLimiter.THROTTLE_STATUSES:
+						self.rateLimiter.OnResponse(kind, history.status)
+			self.rateLimiter.OnResponse(kind, resp.status_code, resp.headers)
 
-		headers = {}
-		auth.AddAuth(headers)
+		if self.instrumentation.IsEnabled() and (not kwargs.get('stream', False)):
+			self.instrumentation.Count('http.bytes', len(resp.content), kind=kind)
 
-		for _ in range(pollTimes):
-			resp = self.exportSession.get(loc, headers=headers)
-			statusDict = resp.json()
+		return resp
+
+	def _RequestPoll(self, url: str, **kwargs) -> requests.Response:
+		return self.Request(
+			'poll',
+			'GET',
+			url,
+			session=self.exportSession,
+			**kwargs
+		)
+
+	def GetJson(
+		self,
+		url: str,
+		headers: dict,
+		params: Union[dict, None]=None,
+		cacheEndpoint: Union[str, None]=None,
+	) -> dict:
+		'''
+		GET a JSON API response.
+		If `cacheEndpoint` is given and the host has a metadata cache, the
+		response is cached under the TTL of that endpoint.
+		'''
+		if (cacheEndpoint is None) or (self.metadataCache is None):
+			return self.Request(
+				'api',
+				'GET',
+				url,
+				headers=headers,
+				params=params,
+			).json()
 
-			if not statusDict['success']:
-				statusDictStr = json.dumps(statusDict, indent='\t')
-				self.logger.error(f'Export status failed:\n{statusDictStr}')
-				raise RuntimeError('Export status failed')
+		cache = self.metadataCache
+		key = cache.MakeKey(cacheEndpoint, url, headers, params)
 
-			if statusDict['state'] == 'PENDING':
-				self.logger.debug('Export pending')
-				time.sleep(pollInterval)
-			elif statusDict['state'] == 'SUCCESS':
-				self.logger.debug('Export success')
-				url = statusDict['url']
-				return url
-			else:
-				state = statusDict['state']
-				raise RuntimeError(f'Export failed with state: {state}')
+		value = cache.GetFresh(key)
+		if value is not None:
+			return value
 
-		raise RuntimeError('Status polling exceeded maximum attempts')
+		reqHeaders = dict(headers)
+		reqHeaders.update(cache.GetRevalidationHeaders(key))
+		resp = self.Request('api', 'GET', url, headers=reqHeaders, params=params)
+		if resp.status_code == 304:
+			value = cache.Revalidated(key)
+			if value is not None:
+				return value
+			# invalidated since the request was sent
+			resp = self.Request('api', 'GET', url, headers=headers, params=params)
+
+		value = resp.json()
+		if resp.ok and value.get('success', False):
+			cache.Store(cacheEndpoint, key, value, resp.headers)
+		return value
+
+	def InvalidateMetadata(self, endpoint: Union[str, None]=None) -> None:
+		if self.metadataCache is not None:
+			self.metadataCache.Invalidate(endpoint)
+
+	def SubmitExportWait(
+		self,
+		auth: Auth,
+		exportDict: dict,
+		policy: Union[PollPolicy, None]=None,
+		callback: Union[
+			Callable[[concurrent.futures.Future], None],
+			None
+		]=None,
+	) -> concurrent.futures.Future:
+		'''
+		Start watching an export without blocking;
+		the returned future resolves to the URL of the exported file.
+		All exports submitted to the same host are polled together by
+		`self.exportPoller`.
+		'''
+		if not exportDict['success']:
+			raise RuntimeError('Export failed')
+
+		return self.exportPoller.Submit(
+			auth=auth,
+			location=exportDict['location'],
+			policy=policy,
+			callback=callback,
+		)
+
+	def ExportWait(
+		self,
+		auth: Auth,
+		exportDict: dict,
+		pollInterval: Union[float, None]=None,
+		pollTimes: Union[int, None]=None,
+	) -> str:
+		'''
+		Block until the export is ready, and return the URL of the exported
+		file.
+		By default, the host's `PollPolicy` is used; if `pollInterval` or
+		`pollTimes` is given, the export is polled at that fixed interval for
+		at most that many times instead.
+		'''
+		policy = None
+		if (pollInterval is not None) or (pollTimes is not None):
+			policy = PollPolicy(
+				initialInterval=1.0 if pollInterval is None else pollInterval,
+				maxInterval=1.0 if pollInterval is None else pollInterval,
+				multiplier=1.0,
+				jitter=0.0,
+				deadline=None,
+				maxPolls=50 if pollTimes is None else pollTimes,
+			)
 
+		future = self.SubmitExportWait(
+			auth=auth,
+			exportDict=exportDict,
+			policy=policy,
+		)
+		return future.result()
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import collections
+import contextlib
+import contextvars
+import logging
+import math
+import threading
+import time
+
+from typing import Any, Dict, Iterable, Iterator, List, Union
+
+
+class Span(object):
+	'''
+	A timed operation, e.g., an HTTP request or a stage of the report
+	pipeline; spans opened while another one is open (in the same thread or
+	task, or in a worker thread running a copy of its context) are its
+	children.
+	'''
+
+	def __init__(
+		self,
+		name: str,
+		attrs: Dict[str, Any],
+		parent: Union['Span', None],
+	) -> None:
+		super(Span, self).__init__()
+
+		self.name = name
+		self.attrs = attrs
+		self.parent = parent
+		self.error = None
+		# wall clock time for exporters, and a monotonic one for durations
+		self.startTimeNs = time.time_ns()
+		self.startCounter = time.perf_counter()
+		self.endTimeNs = None
+		self.duration = None
+		# per-sink state, e.g., the OpenTelemetry span of an exporter
+		self.sinkData = {}
+
+	def __str__(self) -> str:
+		return f'{self.__class__.__name__}(name={self.name}, duration={self.duration})'
+
+	def SetAttribute(self, key: str, value: Any) -> None:
+		self.attrs[key] = value
+
+	def End(self) -> None:
+		self.duration = time.perf_counter() - self.startCounter
+		self.endTimeNs = self.startTimeNs + int(self.duration * 1e9)
+
+
+class _NullSpan(object):
+	'''
+	The span given out when no sink is attached; it records nothing.
+	'''
+
+	def SetAttribute(self, key: str, value: Any) -> None:
+		pass
+
+
+class InstrumentationSink(object):
+	'''
+	Receives the spans and counters of an `Instrumentation`;
+	the methods are called from any thread, so sinks must be thread-safe.
+	'''
+
+	def OnSpanStart(self, span: Span) -> None:
+		pass
+
+	def OnSpanEnd(self, span: Span) -> None:
+		pass
+
+	def OnCount(
+		self,
+		name: str,
+		value: float,
+		attrs: Dict[str, Any],
+		span: Union[Span, None],
+	) -> None:
+		'''
+		`span` is the span open when the counter was updated, if any.
+		'''
+		pass
+
+
+class Instrumentation(object):
+	'''
+	Timers (spans) and counters around the HTTP calls and the report
+	pipeline, forwarded to the attached sinks, e.g., a `MetricsCollector`.
+	Without any sink, spans and counters cost next to nothing.
+
+	Spans:
+	- `http.<kind>`: every request sent by a host, by rate limiter kind
+	  (`api`, `poll`, `download`), with its `status`
+	- `course.export_report`: `Course.ExportReportByDate`, with `source`
+	  being `cache`, `journal` or `export`
+	- `export.submit`, `export.wait` (with the number of status `polls`
+	  of the export), `report.download` (with `bytes`),
+	  `report.read` and `report.parse_header`: its stages
+	- `assignment.export_report`, `report.merge`, `due.apply` and
+	  `due.merge`: the stages of `Assignment.ExportReportWithDues`
+
+	Counters:
+	- `http.bytes`: bytes received, by `kind`
+	- `export.polls`: status polls of all finished exports; the polls of
+	  each one are on its `export.wait` span
+	'''
+
+	def __init__(self, sinks: Iterable[InstrumentationSink]=()) -> None:
+		super(Instrumentation, self).__init__()
+
+		self.sinks = list(sinks)
+
+	def __str__(self) -> str:
+		return f'{self.__class__.__name__}(sinks={len(self.sinks)})'
+
+	def AddSink(self, sink: InstrumentationSink) -> None:
+		self.sinks = self.sinks + [ sink ]
+
+	def IsEnabled(self) -> bool:
+		return len(self.sinks) > 0
+
+	@contextlib.contextmanager
+	def Span(self, name: str, **attrs) -> Iterator[Union[Span, _NullSpan]]:
+		sinks = self.sinks
+		if len(sinks) == 0:
+			yield _NULL_SPAN
+			return
+
+		span = Span(name=name, attrs=attrs, parent=_CURRENT_SPAN.get())
+		for sink in sinks:
+			sink.OnSpanStart(span)
+		token = _CURRENT_SPAN.set(span)
+		try:
+			yield span
+		except BaseException as e:
+			span.error = type(e).__name__
+			raise
+		finally:
+			_CURRENT_SPAN.reset(token)
+			span.End()
+			for sink in sinks:
+				sink.OnSpanEnd(span)
+
+	def SetAttribute(self, key: str, value: Any) -> None:
+		'''
+		Set an attribute of the innermost open span, if any.
+		'''
+		span = _CURRENT_SPAN.get()
+		if span is not None:
+			span.SetAttribute(key, value)
+
+	def Count(self, name: str, value: float=1.0, **attrs) -> None:
+		sinks = self.sinks
+		if len(sinks) == 0:
+			return
+
+		span = _CURRENT_SPAN.get()
+		for sink in sinks:
+			sink.OnCount(name, value, attrs, span)
+
+
+_NULL_SPAN = _NullSpan()
+
+# the innermost open span of the running thread or task
+_CURRENT_SPAN = contextvars.ContextVar('zyAPI.Instrumentation.currentSpan', default=None)
+
+
+class MetricsCollector(InstrumentationSink):
+	'''
+	An in-process sink aggregating span durations by name (count, errors,
+	total, mean, p50, p95, max) and counters by name and attributes.
+	Percentiles are calculated from the last `maxSamples` spans of a name.
+	'''
+
+	def __init__(self, maxSamples: int=10000) -> None:
+		super(MetricsCollector, self).__init__()
+
+		self.maxSamples = maxSamples
+
+		self.lock = threading.Lock()
+		self.Reset()
+
+	def Reset(self) -> None:
+		with self.lock:
+			self.spans = {}
+			self.counters = collections.Counter()
+
+	def OnSpanEnd(self, span: Span) -> None:
+		with self.lock:
+			stats = self.spans.get(span.name, None)
+			if stats is None:
+				stats = {
+					'count': 0,
+					'errors': 0,
+					'total': 0.0,
+					'max': 0.0,
+					'samples': collections.deque(maxlen=self.maxSamples),
+				}
+				self.spans[span.name] = stats
+			stats['count'] += 1
+			stats['errors'] += 0 if span.error is None else 1
+			stats['total'] += span.duration
+			stats['max'] = max(stats['max'], span.duration)
+			stats['samples'].append(span.duration)
+
+	def OnCount(
+		self,
+		name: str,
+		value: float,
+		attrs: Dict[str, Any],
+		span: Union[Span, None],
+	) -> None:
+		key = name
+		if len(attrs) > 0:
+			attrStr = ','.join(f'{k}={v}' for k, v in sorted(attrs.items()))
+			key = f'{name}{{{attrStr}}}'
+		with self.lock:
+			self.counters[key] += value
+
+	@classmethod
+	def _Percentile(cls, samples: List[float], q: float) -> float:
+		# nearest rank
+		idx = max(math.ceil(q * len(samples)) - 1, 0)
+		return samples[idx]
+
+	def GetSummary(self) -> dict:
+		with self.lock:
+			spans = {
+				name: (dict(stats), sorted(stats['samples']))
+				for name, stats in self.spans.items()
+			}
+			counters = dict(self.counters)
+
+		spanSummary = {}
+		for name, (stats, samples) in spans.items():
+			spanSummary[name] = {
+				'count': stats['count'],
+				'errors': stats['errors'],
+				'total': stats['total'],
+				'mean': stats['total'] / stats['count'],
+				'p50': self._Percentile(samples, 0.50),
+				'p95': self._Percentile(samples, 0.95),
+				'max': stats['max'],
+			}
+
+		return {
+			'spans': spanSummary,
+			'counters': counters,
+		}
+
+	def FormatSummary(self) -> str:
+		summary = self.GetSummary()
+
+		lines = [
+			f'{"span":28s} {"count":>7s} {"errors":>6s} {"total(s)":>10s} ' +
+			f'{"mean(ms)":>10s} {"p50(ms)":>10s} {"p95(ms)":>10s} {"max(ms)":>10s}'
+		]
+		for name, stats in sorted(
+			summary['spans'].items(),
+			key=lambda item: -item[1]['total']
+		):
+			lines.append(
+				f'{name:28s} {stats["count"]:7d} {stats["errors"]:6d} ' +
+				f'{stats["total"]:10.3f} {stats["mean"] * 1e3:10.2f} ' +
+				f'{stats["p50"] * 1e3:10.2f} {stats["p95"] * 1e3:10.2f} ' +
+				f'{stats["max"] * 1e3:10.2f}'
+			)
+		if len(summary['counters']) > 0:
+			lines.append('')
+			lines.append(f'{"counter":44s} {"value":>14s}')
+			for name, value in sorted(summary['counters'].items()):
+				lines.append(f'{name:44s} {value:14.0f}')
+
+		return '\n'.join(lines)
+
+	def LogSummary(self, logger: Union[logging.Logger, None]=None) -> None:
+		logger = logging.getLogger(__name__) if logger is None else logger
+		logger.info(f'Instrumentation summary:\n{self.FormatSummary()}')
+
+
+class OpenTelemetrySink(InstrumentationSink):
+	'''
+	Forwards spans to OpenTelemetry, keeping their parent-child relations,
+	and counters as span events of the current span.
+	Requires the `opentelemetry-api` package; the SDK (e.g., with a
+	`ConsoleSpanExporter` for local testing) is configured by the caller,
+	or passed in as `tracerProvider`.
+	'''
+
+	def __init__(self, tracerProvider: Any=None) -> None:
+		super(OpenTelemetrySink, self).__init__()
+
+		# imported here, so that zyAPI doesn't pay for it unless it's used
+		try:
+			from opentelemetry import trace as otelTrace
+		except ImportError:
+			raise RuntimeError(
+				'OpenTelemetrySink requires the opentelemetry-api package'
+			)
+
+		self.otelTrace = otelTrace
+		self.tracer = otelTrace.get_tracer(
+			'zyAPI',
+			tracer_provider=tracerProvider,
+		)
+
+	@classmethod
+	def _ToOtelAttrs(cls, attrs: Dict[str, Any]) -> dict:
+		# OpenTelemetry only takes primitive values (and sequences of them)
+		return {
+			k: (v if isinstance(v, (bool, int, float, str)) else str(v))
+			for k, v in attrs.items()
+		}
+
+	def OnSpanStart(self, span: Span) -> None:
+		context = None
+		if (span.parent is not None) and (self in span.parent.sinkData):
+			context = self.otelTrace.set_span_in_context(span.parent.sinkData[self])
+
+		span.sinkData[self] = self.tracer.start_span(
+			span.name,
+			context=context,
+			start_time=span.startTimeNs,
+		)
+
+	def OnSpanEnd(self, span: Span) -> None:
+		otelSpan = span.sinkData.pop(self, None)
+		if otelSpan is None:
+			return
+
+		otelSpan.set_attributes(self._ToOtelAttrs(span.attrs))
+		if span.error is not None:
+			otelSpan.set_status(self.otelTrace.Status(
+				self.otelTrace.StatusCode.ERROR,
+				span.error,
+			))
+		otelSpan.end(end_time=span.endTimeNs)
+
+	def OnCount(
+		self,
+		name: str,
+		value: float,
+		attrs: Dict[str, Any],
+		span: Union[Span, None],
+	) -> None:
+		otelSpan = None if span is None else span.sinkData.get(self, None)
+		if otelSpan is not None:
+			otelSpan.add_event(
+				name,
+				attributes={ 'value': value, **self._ToOtelAttrs(attrs) },
+			)
+
+
+class PrometheusSink(InstrumentationSink):
+	'''
+	Exports span durations as the histogram
+	`zyapi_span_duration_seconds{span=...}`, failed spans as
+	`zyapi_span_errors_total{span=...}`, and counters as
+	`zyapi_counter_total{counter=...,kind=...}`.
+	Requires the `prometheus_client` package; the metrics are registered in
+	`registry` (a new one by default), and can be served locally with
+	`StartHttpServer`.
+	'''
+
+	def __init__(self, registry: Any=None) -> None:
+		super(PrometheusSink, self).__init__()
+
+		# imported here, so that zyAPI doesn't pay for it unless it's used
+		try:
+			import prometheus_client
+		except ImportError:
+			raise RuntimeError(
+				'PrometheusSink requires the prometheus_client package'
+			)
+
+		self.prometheusClient = prometheus_client
+		self.registry = (
+			prometheus_client.CollectorRegistry()
+			if registry is None else registry
+		)
+		self.durations = prometheus_client.Histogram(
+			'zyapi_span_duration_seconds',
+			'Duration of zyAPI operations',
+			labelnames=[ 'span' ],
+			registry=self.registry,
+		)
+		self.errors = prometheus_client.Counter(
+			'zyapi_span_errors',
+			'zyAPI operations that raised an error',
+			labelnames=[ 'span' ],
+			registry=self.registry,
+		)
+		self.counters = prometheus_client.Counter(
+			'zyapi_counter',
+			'zyAPI counters, e.g., bytes received and export polls',
+			labelnames=[ 'counter', 'kind' ],
+			registry=self.registry,
+		)
+
+	def OnSpanEnd(self, span: Span) -> None:
+		self.durations.labels(span=span.name).observe(span.duration)
+		if span.error is not None:
+			self.errors.labels(span=span.name).inc()
+
+	def OnCount(
+		self,
+		name: str,
+		value: float,
+		attrs: Dict[str, Any],
+		span: Union[Span, None],
+	) -> None:
+		self.counters.labels(
+			counter=name,
+			kind=str(attrs.get('kind', '')),
+		).inc(value)
+
+	def StartHttpServer(self, port: int, addr: str='127.0.0.1') -> None:
+		self.prometheusClient.start_http_server(
+			port,
+			addr=addr,
+			registry=self.registry,
+		)
+
+	def GenerateLatest(self) -> bytes:
+		return self.prometheusClient.generate_latest(self.registry)
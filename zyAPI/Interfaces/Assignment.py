@@ -19,15 +19,24 @@
 ###
 
 
-import numpy
+from __future__ import annotations
+
+import concurrent.futures
+import contextvars
+import functools
 import re
-import pandas
 
-from typing import Callable, List, Tuple
+from typing import Any, Callable, Dict, List, Tuple, Union
 from ..Auth.Auth import Auth
 from ..Host import Host
+from ..Instrumentation import Instrumentation
 from ..Due import Due
 from ..Due import Datetime
+from .._LazyModule import LazyModule
+
+
+numpy = LazyModule('numpy')
+pandas = LazyModule('pandas')
 
 
 class Section(object):
@@ -47,6 +56,25 @@ class Section(object):
 	def __str__(self) -> str:
 		return f'Section(id={self.id}, title={self.title}, totalPts={self.totalPts})'
 
+	def GetNumber(self) -> str:
+		'''
+		Get the `<chapter>.<section>` number of this section, which is the
+		prefix used by the activity columns of a report,
+		e.g., `1.1` in `1.1 - Participation (21)`
+		'''
+		if (
+			('chapter_number' in self.payload) and
+			('section_number' in self.payload)
+		):
+			chNum = self.payload['chapter_number']
+			secNum = self.payload['section_number']
+			return f'{chNum}.{secNum}'
+
+		match = re.match(r'^\s*(\d+\.\d+)', self.title)
+		if match is None:
+			raise ValueError(f'Unable to find the section number of {self}')
+		return match.group(1)
+
 	def CalcTotalPtsByColInfo(self, colInfo: dict) -> float:
 		total = 0.0
 		if self.incPart:
@@ -61,6 +89,20 @@ class Section(object):
 		total = self.CalcTotalPtsByColInfo(colInfo)
 		assert float(self.totalPts) == total, 'Total points mismatch'
 
+	def GetCategories(self) -> List[str]:
+		'''
+		The activity categories (`part`, `chal`, `labs`) counted by this
+		section, in report order.
+		'''
+		categories = []
+		if self.incPart:
+			categories.append('part')
+		if self.incChal:
+			categories.append('chal')
+		if self.incLabs:
+			categories.append('labs')
+		return categories
+
 
 class Sections(object):
 
@@ -82,7 +124,62 @@ class Sections(object):
 		raise ValueError(f'Section id {secId} not found')
 
 
-class Assignment(object):
+class ReportProjection(object):
+	'''
+	A column selector for `Course.ExportReportByDate`.
+	`select` parses the full report header and returns the parsed header
+	info, the indices of the columns to read, and their dtypes;
+	the header info and the positions of the selected columns are kept for
+	processing the projected dataframe.
+	'''
+
+	def __init__(
+		self,
+		select: Callable[[List[str]], Tuple[dict, List[int], dict]],
+		instrumentation: Union[Instrumentation, None]=None,
+	) -> None:
+		super(ReportProjection, self).__init__()
+
+		self.select = select
+		self.instrumentation = (
+			Instrumentation() if instrumentation is None else instrumentation
+		)
+		self.colInfo = None
+		self.positions = None
+
+	def __call__(self, headers: List[str]) -> Tuple[List[int], dict]:
+		with self.instrumentation.Span('report.parse_header'):
+			self.colInfo, usecols, dtype = self.select(headers)
+		# pandas returns the selected columns in the order of the file
+		self.positions = {
+			colIdx: pos for pos, colIdx in enumerate(sorted(usecols))
+		}
+		return usecols, dtype
+
+	def GetColumn(self, df: pandas.DataFrame, colIdx: int) -> numpy.ndarray:
+		return df.iloc[:, self.positions[colIdx]].to_numpy()
+
+	def GetValues(
+		self,
+		df: pandas.DataFrame,
+		colIdxs: List[int],
+	) -> numpy.ndarray:
+		'''
+		Returns the given columns as a float matrix, with NaN filled with 0.0
+		'''
+		values = df.iloc[
+			:,
+			[ self.positions[colIdx] for colIdx in colIdxs ]
+		].to_numpy(dtype=float)
+		return numpy.nan_to_num(values, nan=0.0)
+
+
+class AssignmentBase(object):
+	'''
+	The parts of an assignment shared by `Assignment` and `AsyncAssignment`:
+	the processing of its section reports, which doesn't depend on how they
+	are exported.
+	'''
 
 	def __init__(
 		self,
@@ -91,7 +188,7 @@ class Assignment(object):
 		course: 'Course',
 		payload: dict,
 	) -> None:
-		super(Assignment, self).__init__()
+		super(AssignmentBase, self).__init__()
 
 		self.host = host
 		self.auth = auth
@@ -104,9 +201,6 @@ class Assignment(object):
 		self.visible = self.payload['visible'] == 1
 		self.sections = Sections(self.payload['sections'])
 
-	def __str__(self) -> str:
-		return f'Assignment(id={self.id}, title={self.title}, visible={self.visible})'
-
 	@classmethod
 	def ParseReportHeader(cls, headers: List[str]) -> dict:
 		'''
@@ -125,6 +219,12 @@ class Assignment(object):
 			'1.2 - Lab (0)'
 		]
 		```
+
+		The activity columns are also grouped by their section number in
+		`info['secs']`, e.g., `info['secs']['1.1']`, which has the same
+		`idx`/`pts` layout as the top level (including `partTotal`,
+		`chalTotal` and `labsTotal` points), so a report exported for
+		multiple sections can be split into per-section column groups.
 		'''
 		REGEX_LNAME = r'^\s*[Ll]ast\s+[Nn]ame\s*$'
 		REGEX_FNAME = r'^\s*[Ff]irst\s+[Nn]ame\s*$'
@@ -149,6 +249,7 @@ class Assignment(object):
 				'chal': [],
 				'labs': [],
 			},
+			'secs': {},
 		}
 		for i in range(len(headers)):
 			if match := re.match(REGEX_LNAME, headers[i]):
@@ -193,12 +294,21 @@ class Assignment(object):
 			elif match := re.match(REGEX_PART, headers[i]):
 				info['idx']['part'].append(i)
 				info['pts']['part'].append(float(match.group(2)))
+				cls._AddSectionActivity(
+					info, match.group(1), 'part', i, float(match.group(2))
+				)
 			elif match := re.match(REGEX_CHAL, headers[i]):
 				info['idx']['chal'].append(i)
 				info['pts']['chal'].append(float(match.group(2)))
+				cls._AddSectionActivity(
+					info, match.group(1), 'chal', i, float(match.group(2))
+				)
 			elif match := re.match(REGEX_LABS, headers[i]):
 				info['idx']['labs'].append(i)
 				info['pts']['labs'].append(float(match.group(2)))
+				cls._AddSectionActivity(
+					info, match.group(1), 'labs', i, float(match.group(2))
+				)
 
 		# print(info)
 
@@ -238,126 +348,250 @@ class Assignment(object):
 		if sum(info['pts']['labs']) != info['pts']['labsTotal']:
 			raise RuntimeError('Lab total mismatch')
 
+		for secInfo in info['secs'].values():
+			secInfo['pts']['partTotal'] = sum(secInfo['pts']['part'])
+			secInfo['pts']['chalTotal'] = sum(secInfo['pts']['chal'])
+			secInfo['pts']['labsTotal'] = sum(secInfo['pts']['labs'])
+
 		return info
 
-	def _CourseExportReportByDate(
+	@classmethod
+	def _AddSectionActivity(
+		cls,
+		info: dict,
+		secNum: str,
+		kind: str,
+		idx: int,
+		pts: float,
+	) -> None:
+		if secNum not in info['secs']:
+			info['secs'][secNum] = {
+				'idx': {
+					'part': [],
+					'chal': [],
+					'labs': [],
+				},
+				'pts': {
+					'part': [],
+					'chal': [],
+					'labs': [],
+				},
+			}
+		info['secs'][secNum]['idx'][kind].append(idx)
+		info['secs'][secNum]['pts'][kind].append(pts)
+
+	@classmethod
+	def _SelectSectionsColumns(
+		cls,
+		secs: List[Section],
+		headers: List[str],
+	) -> Tuple[dict, List[int], dict]:
+		'''
+		Select the columns of a single-section report that are needed by
+		the given `Section` objects of that section, which may come from
+		different assignments:
+		names, emails, and the category totals included by any of them.
+		'''
+		colInfo = cls.ParseReportHeader(headers)
+
+		categories = set()
+		for sec in secs:
+			# validate the total points
+			sec.AssertTotalsPtsWithColInfo(colInfo)
+			categories.update(sec.GetCategories())
+
+		pctCols = [
+			colInfo['idx'][f'{kind}Total']
+			for kind in [ 'part', 'chal', 'labs' ]
+			if kind in categories
+		]
+		usecols = [
+			colInfo['idx']['lname'],
+			colInfo['idx']['fname'],
+			colInfo['idx']['priEmail'],
+			colInfo['idx']['schEmail'],
+		] + pctCols
+		dtype = { headers[i]: 'float64' for i in pctCols }
+
+		return colInfo, usecols, dtype
+
+	def _SelectSectionColumns(
 		self,
-		date: Datetime.Datetime,
-		secIds: List[int],
-		includeTimeSpent: bool=False,
-	) -> Tuple[str, pandas.DataFrame]:
-		return self.course.ExportReportByDate(
-			date=date,
-			secIds=secIds,
-			includeTimeSpent=includeTimeSpent,
+		sec: Section,
+		headers: List[str],
+	) -> Tuple[dict, List[int], dict]:
+		'''
+		Select the columns of a single-section report that are needed:
+		names, emails, and the category totals included by the section.
+		'''
+		return self._SelectSectionsColumns([ sec ], headers)
+
+	def _ProcessSectionReport(
+		self,
+		sec: Section,
+		df: pandas.DataFrame,
+		projection: 'ReportProjection',
+	) -> pandas.DataFrame:
+		'''
+		Convert the projected report of a single section into points per
+		category and in total, indexed by primary email.
+		'''
+		secId = sec.id
+		colInfo = projection.colInfo
+		categories = sec.GetCategories()
+
+		# points = percent x category total points / 100, for all categories
+		# at once
+		percents = projection.GetValues(
+			df,
+			[ colInfo['idx'][f'{kind}Total'] for kind in categories ],
 		)
+		totals = numpy.array(
+			[ colInfo['pts'][f'{kind}Total'] for kind in categories ],
+			dtype=float,
+		)
+		pts = (percents * totals) / 100
 
-	def ExportReportByDate(
+		data = {
+			'last_name': projection.GetColumn(df, colInfo['idx']['lname']),
+			'first_name': projection.GetColumn(df, colInfo['idx']['fname']),
+			'school_email': projection.GetColumn(df, colInfo['idx']['schEmail']),
+			f'{secId}': pts.sum(axis=1),
+		}
+		for i, kind in enumerate(categories):
+			data[f'{secId}.{kind}'] = pts[:, i]
+
+		index = pandas.Index(
+			projection.GetColumn(df, colInfo['idx']['priEmail']),
+			name='primary_email',
+		)
+
+		return pandas.DataFrame(data, index=index)
+
+	def _SelectBatchedColumns(
 		self,
-		date: Datetime.Datetime,
-		includeTimeSpent: bool=False,
-	) -> Tuple[str, pandas.DataFrame]:
-		dfs = {}
+		headers: List[str],
+	) -> Tuple[dict, List[int], dict]:
+		'''
+		Select the columns of a report of all sections that are needed:
+		names, emails, and the activities of the categories included by each
+		section.
+		'''
+		colInfo = self.ParseReportHeader(headers)
+
+		pctCols = []
 		for sec in self.sections.sections:
-			secId = sec.id
+			secNum = sec.GetNumber()
+			if secNum not in colInfo['secs']:
+				raise RuntimeError(f'No columns found for section {secNum}')
+			secInfo = colInfo['secs'][secNum]
 
-			filename, df = self._CourseExportReportByDate(
-				date=date,
-				secIds=[secId],
-				includeTimeSpent=includeTimeSpent,
-			)
+			# validate the total points
+			sec.AssertTotalsPtsWithColInfo(secInfo)
 
-			# rename columns and drop unwanted columns
-			unwantedCols = []
-			colInfo = self.ParseReportHeader(list(df.columns))
-			for i in range(len(df.columns)):
-				# names, emails
-				if i == colInfo['idx']['lname']:
-					df.columns.values[i] = 'last_name'
-				elif i == colInfo['idx']['fname']:
-					df.columns.values[i] = 'first_name'
-				elif i == colInfo['idx']['priEmail']:
-					df.columns.values[i] = 'primary_email'
-				elif i == colInfo['idx']['schEmail']:
-					df.columns.values[i] = 'school_email'
-
-				# total points
-				elif i == colInfo['idx']['total']:
-					df.columns.values[i] = f'{secId}'
-				elif (i == colInfo['idx']['partTotal']) and sec.incPart:
-					df.columns.values[i] = f'{secId}.part'
-				elif (i == colInfo['idx']['chalTotal']) and sec.incChal:
-					df.columns.values[i] = f'{secId}.chal'
-				elif (i == colInfo['idx']['labsTotal']) and sec.incLabs:
-					df.columns.values[i] = f'{secId}.labs'
-				else:
-					# give unwanted columns a unique name
-					df.columns.values[i] = f'unwanted_{i}'
-					unwantedCols.append(i)
-
-			df.drop(columns=df.columns[unwantedCols], inplace=True)
-
-			# fillna with 0.0
-			df[f'{secId}'] = df[f'{secId}'].fillna(0.0)
-			if sec.incPart:
-				df[f'{secId}.part'] = df[f'{secId}.part'].fillna(0.0)
-			if sec.incChal:
-				df[f'{secId}.chal'] = df[f'{secId}.chal'].fillna(0.0)
-			if sec.incLabs:
-				df[f'{secId}.labs'] = df[f'{secId}.labs'].fillna(0.0)
-
-			# make primary_email as the key column
-			df.set_index('primary_email', inplace=True)
+			for kind in sec.GetCategories():
+				pctCols += secInfo['idx'][kind]
 
-			# validate the total points
-			sec.AssertTotalsPtsWithColInfo(colInfo)
+		usecols = [
+			colInfo['idx']['lname'],
+			colInfo['idx']['fname'],
+			colInfo['idx']['priEmail'],
+			colInfo['idx']['schEmail'],
+		] + pctCols
+		dtype = { headers[i]: 'float64' for i in pctCols }
 
-			# calculate points by col_values(i.e., percent) x total points
-			df[f'{secId}'] = 0.0
-			if sec.incPart:
-				df[f'{secId}.part'] *= colInfo['pts']['partTotal']
-				df[f'{secId}.part'] /= 100
-				# add to total
-				df[f'{secId}'] += df[f'{secId}.part']
-			if sec.incChal:
-				df[f'{secId}.chal'] *= colInfo['pts']['chalTotal']
-				df[f'{secId}.chal'] /= 100
-				# add to total
-				df[f'{secId}'] += df[f'{secId}.chal']
-			if sec.incLabs:
-				df[f'{secId}.labs'] *= colInfo['pts']['labsTotal']
-				df[f'{secId}.labs'] /= 100
+		return colInfo, usecols, dtype
+
+	def _SplitBatchedReport(
+		self,
+		df: pandas.DataFrame,
+		projection: 'ReportProjection',
+	) -> Dict[int, pandas.DataFrame]:
+		'''
+		Split a projected report of all sections into per-section
+		dataframes, which have the same layout as the ones returned by
+		`_ExportSectionReport`.
+		The points of a section are calculated from its own activity columns,
+		i.e., sum(activity percent x activity points) / 100.
+		'''
+		colInfo = projection.colInfo
+
+		# names, emails
+		idData = {
+			'last_name': projection.GetColumn(df, colInfo['idx']['lname']),
+			'first_name': projection.GetColumn(df, colInfo['idx']['fname']),
+			'school_email': projection.GetColumn(df, colInfo['idx']['schEmail']),
+		}
+		index = pandas.Index(
+			projection.GetColumn(df, colInfo['idx']['priEmail']),
+			name='primary_email',
+		)
+
+		dfs = {}
+		for sec in self.sections.sections:
+			secId = sec.id
+			secInfo = colInfo['secs'][sec.GetNumber()]
+
+			data = dict(idData)
+			data[f'{secId}'] = numpy.zeros(len(df))
+			for kind in sec.GetCategories():
+				percents = projection.GetValues(df, secInfo['idx'][kind])
+				pts = numpy.array(secInfo['pts'][kind], dtype=float)
+				data[f'{secId}.{kind}'] = (percents @ pts) / 100
 				# add to total
-				df[f'{secId}'] += df[f'{secId}.labs']
+				data[f'{secId}'] = data[f'{secId}'] + data[f'{secId}.{kind}']
 
-			# save the dataframe
-			dfs[secId] = df
+			dfs[secId] = pandas.DataFrame(data, index=index)
 
+		return dfs
+
+	def _MergeSectionReports(
+		self,
+		dfs: Dict[int, pandas.DataFrame],
+	) -> pandas.DataFrame:
+		'''
+		Merge the per-section dataframes into one, aligned on the
+		primary_email index.
+		The names and school emails are taken from the first section only,
+		and every student of the first section must be present in all other
+		sections.
+		'''
 		# merge the dataframes
 		if len(dfs) == 0:
 			raise RuntimeError('No dataframes')
 
 		dfsecIds = list(dfs.keys())
-		df = dfs[dfsecIds[0]]
-		dfRowCnt = len(df)
-
-		for i in range(1, len(dfsecIds)):
-			df = pandas.merge(
-				df, dfs[dfsecIds[i]],
-				how='inner',
-				on='primary_email',
-				suffixes=('', f'_{dfsecIds[i]}'),
-			)
+		dfFirst = dfs[dfsecIds[0]]
+		index = dfFirst.index
 
-			# make sure merged dataframe doesn't lost any rows
-			if len(df) < dfRowCnt:
-				raise RuntimeError('Merged dataframe lost rows')
-			dfRowCnt = len(df)
+		for secId in dfsecIds:
+			dups = dfs[secId].index.duplicated()
+			if dups.any():
+				dupEmails = list(dfs[secId].index[dups])
+				raise RuntimeError(
+					f'Duplicate emails in the report of section {secId}: {dupEmails}'
+				)
+
+		# make sure merged dataframe doesn't lost any rows
+		missing = {}
+		for secId in dfsecIds[1:]:
+			missingEmails = index.difference(dfs[secId].index, sort=False)
+			if len(missingEmails) > 0:
+				missing[secId] = list(missingEmails)
+		if len(missing) > 0:
+			raise RuntimeError(
+				f'Merged dataframe lost rows; missing emails by section: {missing}'
+			)
 
-			# remove duplicate columns
-			df.drop(columns=[f'last_name_{dfsecIds[i]}'], inplace=True)
-			df.drop(columns=[f'first_name_{dfsecIds[i]}'], inplace=True)
-			df.drop(columns=[f'school_email_{dfsecIds[i]}'], inplace=True)
+		# take the section columns of the other sections, in the order of the
+		# first one, and join them all at once
+		idCols = [ 'last_name', 'first_name', 'school_email' ]
+		dfParts = [ dfFirst ]
+		for secId in dfsecIds[1:]:
+			dfSec = dfs[secId]
+			secCols = [ c for c in dfSec.columns if c not in idCols ]
+			dfParts.append(dfSec.reindex(index=index, columns=secCols))
+		df = pandas.concat(dfParts, axis=1)
 
 		# create total column
 		df['total'] = 0.0
@@ -369,18 +603,14 @@ class Assignment(object):
 
 		df['total_percent'] += (df['total'] * 100) / asgTotal
 
-		return filename, df
+		return df
 
-	def ExportReportWithDue(
-		self,
+	@classmethod
+	def _ApplyDue(
+		cls,
 		due: Due.Due,
-		includeTimeSpent: bool=False,
-	) -> Tuple[str, pandas.DataFrame]:
-		filename, df = self.ExportReportByDate(
-			date=due.dueDate,
-			includeTimeSpent=includeTimeSpent
-		)
-
+		df: pandas.DataFrame,
+	) -> pandas.DataFrame:
 		due.Apply2Pd(
 			df=df,
 			totalColName='total',
@@ -393,36 +623,380 @@ class Assignment(object):
 			destColName='total_percent_due',
 		)
 
+		return df
+
+	@classmethod
+	def _GroupDuesByDate(
+		cls,
+		dues: List[Due.Due],
+		shareExports: bool,
+	) -> Tuple[
+		List[List[Tuple[Any, Union[List[str], None]]]],
+		Dict[Any, Datetime.Datetime]
+	]:
+		'''
+		Returns the due date groups of each due, as (report key, emails),
+		and the date to be exported for each report key.
+		If `shareExports` is True, groups with the same due date share the
+		same report key, across all dues.
+		'''
+		dueGroups = []
+		exportDates = {}
+		for i, due in enumerate(dues):
+			groups = []
+			for j, (date, emails) in enumerate(due.GetDueDateGroups()):
+				key = date.GetReportKey() if shareExports else (i, j)
+				groups.append((key, emails))
+				exportDates.setdefault(key, date)
+			dueGroups.append(groups)
+		return dueGroups, exportDates
+
+	def _GetReportColumns(self) -> List[str]:
+		'''
+		The points of every section and category, and the totals.
+		'''
+		cols = []
+		for sec in self.sections.sections:
+			cols.append(f'{sec.id}')
+			cols += [ f'{sec.id}.{kind}' for kind in sec.GetCategories() ]
+		cols += [ 'total', 'total_percent' ]
+		return cols
+
+	def _GetDueMergeColumns(self) -> List[str]:
+		'''
+		The columns that are merged across dues: the points of every section
+		and category, and the totals before and after applying the due.
+		'''
+		return self._GetReportColumns() + [ 'total_due', 'total_percent_due' ]
+
+	def _StitchStudentRows(
+		self,
+		df: pandas.DataFrame,
+		dfExt: pandas.DataFrame,
+		emails: List[str],
+	) -> pandas.DataFrame:
+		'''
+		Replace the points of the given students in `df` with the ones in
+		`dfExt`, i.e., the report at their own due date.
+		The emails can be either primary or school emails.
+		'''
+		emails = pandas.Index(emails)
+		isPrimary = emails.isin(df.index)
+		schEmailMap = pandas.Series(
+			df.index,
+			index=df['school_email'].astype(object),
+		)
+		schEmailMap = schEmailMap[
+			schEmailMap.index.notna() & ~schEmailMap.index.duplicated()
+		]
+		isSchool = (~isPrimary) & emails.isin(schEmailMap.index)
+
+		unknown = list(emails[(~isPrimary) & (~isSchool)])
+		if len(unknown) > 0:
+			raise ValueError(f'Students with extensions not found in the report: {unknown}')
+
+		priEmails = emails[isPrimary].append(
+			pandas.Index(schEmailMap[emails[isSchool]].to_numpy())
+		)
+
+		missing = list(priEmails.difference(dfExt.index, sort=False))
+		if len(missing) > 0:
+			raise RuntimeError(f'Students missing from the extension report: {missing}')
+
+		cols = self._GetReportColumns()
+		df.loc[priEmails, cols] = dfExt.loc[priEmails, cols].to_numpy()
+
+		return df
+
+	def _MergeDueReports(
+		self,
+		dfs: List[pandas.DataFrame],
+		mergeOps: Callable,
+	) -> pandas.DataFrame:
+		'''
+		Merge the reports of multiple dues into the first one.
+		The rows of the other reports are aligned to the first one by email.
+		If `mergeOps` is a numpy ufunc, all reports are reduced at once with
+		`mergeOps.reduce`; otherwise, `mergeOps` is applied pairwise to each
+		merged column, as `mergeOps(series, nextSeries)`.
+		'''
+		df = dfs[0]
+		if len(dfs) == 1:
+			return df
+
+		cols = self._GetDueMergeColumns()
+		index = df.index
+		dfsCols = [ df[cols] ] + [ dfNext.reindex(index=index, columns=cols) for dfNext in dfs[1:] ]
+
+		if isinstance(mergeOps, numpy.ufunc):
+			stacked = numpy.stack(
+				[ dfCols.to_numpy(dtype=float) for dfCols in dfsCols ]
+			)
+			df[cols] = mergeOps.reduce(stacked, axis=0)
+		else:
+			for col in cols:
+				df[col] = functools.reduce(
+					mergeOps,
+					[ dfCols[col] for dfCols in dfsCols ],
+				)
+
+		return df
+
+	def _ApplyDues(
+		self,
+		dues: List[Due.Due],
+		dueGroups: List[List[Tuple[Any, Union[List[str], None]]]],
+		reports: Dict[Any, Tuple[str, pandas.DataFrame]],
+		mergeOps: Union[Callable, None]=None,
+	) -> Tuple[str, pandas.DataFrame]:
+		'''
+		Apply each due to the report of its due date, with the rows of
+		students with other due dates taken from the reports of those dates,
+		and merge the results with `mergeOps` (`numpy.maximum` if None).
+		'''
+		if mergeOps is None:
+			mergeOps = numpy.maximum
+
+		instrumentation = self.host.instrumentation
+		filename = None
+		dfs = []
+		usedKeys = set()
+		for due, groups in zip(dues, dueGroups):
+			key, _ = groups[0]
+			dueFilename, df = reports[key]
+			if filename is None:
+				filename = dueFilename
+			if (key in usedKeys) or (len(groups) > 1):
+				# the report is shared with a previous due,
+				# or some rows will be replaced
+				df = df.copy()
+			usedKeys.add(key)
+
+			for extKey, emails in groups[1:]:
+				_, dfExt = reports[extKey]
+				df = self._StitchStudentRows(df=df, dfExt=dfExt, emails=emails)
+
+			with instrumentation.Span('due.apply', due=type(due).__name__):
+				dfs.append(self._ApplyDue(due=due, df=df))
+
+		with instrumentation.Span('due.merge', dues=len(dfs)):
+			df = self._MergeDueReports(dfs=dfs, mergeOps=mergeOps)
+
+		return filename, df
+
+
+class Assignment(AssignmentBase):
+
+	def __str__(self) -> str:
+		return f'Assignment(id={self.id}, title={self.title}, visible={self.visible})'
+
+	def _CourseExportReportByDate(
+		self,
+		date: Datetime.Datetime,
+		secIds: List[int],
+		includeTimeSpent: bool=False,
+		columnSelector: Union[
+			Callable[[List[str]], Tuple[List[int], dict]],
+			None
+		]=None,
+	) -> Tuple[str, pandas.DataFrame]:
+		return self.course.ExportReportByDate(
+			date=date,
+			secIds=secIds,
+			includeTimeSpent=includeTimeSpent,
+			columnSelector=columnSelector,
+		)
+
+	def _ExportSectionReport(
+		self,
+		sec: Section,
+		date: Datetime.Datetime,
+		includeTimeSpent: bool=False,
+	) -> Tuple[str, pandas.DataFrame]:
+		projection = ReportProjection(
+			lambda headers: self._SelectSectionColumns(sec, headers),
+			instrumentation=self.host.instrumentation,
+		)
+
+		filename, df = self._CourseExportReportByDate(
+			date=date,
+			secIds=[sec.id],
+			includeTimeSpent=includeTimeSpent,
+			columnSelector=projection,
+		)
+
+		return filename, self._ProcessSectionReport(
+			sec=sec,
+			df=df,
+			projection=projection,
+		)
+
+	def _ExportSectionReports(
+		self,
+		date: Datetime.Datetime,
+		includeTimeSpent: bool=False,
+		maxWorkers: int=1,
+	) -> Tuple[str, Dict[int, pandas.DataFrame]]:
+		'''
+		Export the report of every section, with at most `maxWorkers`
+		section exports in flight at the same time.
+		The returned dict is always ordered as `self.sections.sections`,
+		regardless of the order in which the exports finish.
+		'''
+		if maxWorkers < 1:
+			raise ValueError('maxWorkers must be at least 1')
+
+		results = {}
+		if maxWorkers == 1:
+			for sec in self.sections.sections:
+				results[sec.id] = self._ExportSectionReport(
+					sec=sec,
+					date=date,
+					includeTimeSpent=includeTimeSpent,
+				)
+		else:
+			with concurrent.futures.ThreadPoolExecutor(
+				max_workers=maxWorkers
+			) as executor:
+				# each export runs in a copy of the context, so its spans
+				# are children of the open span
+				futures = {
+					executor.submit(
+						contextvars.copy_context().run,
+						self._ExportSectionReport,
+						sec=sec,
+						date=date,
+						includeTimeSpent=includeTimeSpent,
+					): sec
+					for sec in self.sections.sections
+				}
+				try:
+					for future in concurrent.futures.as_completed(futures):
+						sec = futures[future]
+						results[sec.id] = future.result()
+				except BaseException:
+					# don't start exports that are still queued
+					for future in futures:
+						future.cancel()
+					raise
+
+		filename = None
+		dfs = {}
+		for sec in self.sections.sections:
+			filename, dfs[sec.id] = results[sec.id]
+
+		return filename, dfs
+
+	def _ExportBatchedSectionReports(
+		self,
+		date: Datetime.Datetime,
+		includeTimeSpent: bool=False,
+	) -> Tuple[str, Dict[int, pandas.DataFrame]]:
+		'''
+		Export the report of all sections with a single export,
+		and split it into per-section dataframes on the client side.
+		'''
+		projection = ReportProjection(
+			self._SelectBatchedColumns,
+			instrumentation=self.host.instrumentation,
+		)
+
+		filename, df = self._CourseExportReportByDate(
+			date=date,
+			secIds=self.sections.GetIdList(),
+			includeTimeSpent=includeTimeSpent,
+			columnSelector=projection,
+		)
+
+		return filename, self._SplitBatchedReport(df, projection)
+
+	def ExportReportByDate(
+		self,
+		date: Datetime.Datetime,
+		includeTimeSpent: bool=False,
+		maxWorkers: int=1,
+		batchSections: bool=False,
+	) -> Tuple[str, pandas.DataFrame]:
+		'''
+		Export the report of this assignment at the given date.
+
+		By default, each section is exported separately,
+		with up to `maxWorkers` exports in flight.
+		If `batchSections` is True, all sections are exported in one report,
+		which is then split into sections on the client side.
+		'''
+		instrumentation = self.host.instrumentation
+		with instrumentation.Span(
+			'assignment.export_report',
+			assignment=self.id,
+			sections=len(self.sections.sections),
+		):
+			if batchSections:
+				filename, dfs = self._ExportBatchedSectionReports(
+					date=date,
+					includeTimeSpent=includeTimeSpent,
+				)
+			else:
+				filename, dfs = self._ExportSectionReports(
+					date=date,
+					includeTimeSpent=includeTimeSpent,
+					maxWorkers=maxWorkers,
+				)
+
+			with instrumentation.Span('report.merge'):
+				df = self._MergeSectionReports(dfs)
+
 		return filename, df
 
+	def ExportReportWithDue(
+		self,
+		due: Due.Due,
+		includeTimeSpent: bool=False,
+		maxWorkers: int=1,
+		batchSections: bool=False,
+	) -> Tuple[str, pandas.DataFrame]:
+		return self.ExportReportWithDues(
+			dues=[ due ],
+			includeTimeSpent=includeTimeSpent,
+			maxWorkers=maxWorkers,
+			batchSections=batchSections,
+		)
+
 	def ExportReportWithDues(
 		self,
 		dues: List[Due.Due],
 		includeTimeSpent: bool=False,
-		mergeOps: Callable = numpy.maximum,
+		mergeOps: Union[Callable, None]=None,
+		maxWorkers: int=1,
+		batchSections: bool=False,
+		shareExports: bool=True,
 	) -> Tuple[str, pandas.DataFrame]:
+		'''
+		Export the report with each due applied, and merge them with
+		`mergeOps` (`numpy.maximum` if None), which is called with two
+		`pandas.Series` of a column, unless it's a numpy ufunc.
+		If `shareExports` is True, dues with the same due date share a single
+		export, so each distinct due date is only exported once;
+		this includes the due dates of students with extensions
+		(see `DueWithExtensions`).
+		'''
 		if len(dues) == 0:
 			raise ValueError('No dues specified')
 
-		filename, df = self.ExportReportWithDue(
-			due=dues[0],
-			includeTimeSpent=includeTimeSpent,
-		)
+		dueGroups, exportDates = self._GroupDuesByDate(dues, shareExports)
 
-		for dIdx in range(1, len(dues)):
-			_, dfNext = self.ExportReportWithDue(
-				due=dues[dIdx],
+		reports = {}
+		for key, date in exportDates.items():
+			reports[key] = self.ExportReportByDate(
+				date=date,
 				includeTimeSpent=includeTimeSpent,
+				maxWorkers=maxWorkers,
+				batchSections=batchSections,
 			)
-			for i in range(len(df.columns)):
-				colName = df.columns.values[i]
-				for sec in self.sections.sections:
-					if f'{sec.id}' in colName:
-						df[colName] = mergeOps(df[colName], dfNext[colName])
-
-				if 'total' in colName:
-					df[colName] = mergeOps(df[colName], dfNext[colName])
-					#print(df[colName].keys())
-
-		return filename, df
 
+		return self._ApplyDues(
+			dues=dues,
+			dueGroups=dueGroups,
+			reports=reports,
+			mergeOps=mergeOps,
+		)
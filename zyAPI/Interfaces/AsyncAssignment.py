@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+from __future__ import annotations
+
+import asyncio
+
+from typing import Callable, Dict, List, Tuple, Union
+from ..Due import Due
+from ..Due import Datetime
+from .Assignment import AssignmentBase, ReportProjection, Section
+from .._LazyModule import LazyModule
+
+
+pandas = LazyModule('pandas')
+
+
+class AsyncAssignment(AssignmentBase):
+	'''
+	The asyncio counterpart of `Assignment`, to be used with an `AsyncCourse`.
+	The report processing is shared with `Assignment` (see
+	`AssignmentBase`); only the exports are awaited.
+	'''
+
+	def __str__(self) -> str:
+		return f'AsyncAssignment(id={self.id}, title={self.title}, visible={self.visible})'
+
+	async def _CourseExportReportByDate(
+		self,
+		date: Datetime.Datetime,
+		secIds: List[int],
+		includeTimeSpent: bool=False,
+		columnSelector: Union[
+			Callable[[List[str]], Tuple[List[int], dict]],
+			None
+		]=None,
+	) -> Tuple[str, pandas.DataFrame]:
+		return await self.course.ExportReportByDate(
+			date=date,
+			secIds=secIds,
+			includeTimeSpent=includeTimeSpent,
+			columnSelector=columnSelector,
+		)
+
+	async def _ExportSectionReport(
+		self,
+		sec: Section,
+		date: Datetime.Datetime,
+		includeTimeSpent: bool=False,
+	) -> Tuple[str, pandas.DataFrame]:
+		projection = ReportProjection(
+			lambda headers: self._SelectSectionColumns(sec, headers),
+			instrumentation=self.host.instrumentation,
+		)
+
+		filename, df = await self._CourseExportReportByDate(
+			date=date,
+			secIds=[sec.id],
+			includeTimeSpent=includeTimeSpent,
+			columnSelector=projection,
+		)
+
+		return filename, self._ProcessSectionReport(
+			sec=sec,
+			df=df,
+			projection=projection,
+		)
+
+	async def _ExportSectionReports(
+		self,
+		date: Datetime.Datetime,
+		includeTimeSpent: bool=False,
+		maxWorkers: Union[int, None]=None,
+	) -> Tuple[str, Dict[int, pandas.DataFrame]]:
+		'''
+		Export the report of every section concurrently, with at most
+		`maxWorkers` exports in flight (no limit if None).
+		The returned dict is always ordered as `self.sections.sections`.
+		'''
+		if (maxWorkers is not None) and (maxWorkers < 1):
+			raise ValueError('maxWorkers must be at least 1')
+
+		numSecs = len(self.sections.sections)
+		semaphore = asyncio.Semaphore(
+			numSecs if maxWorkers is None else maxWorkers
+		)
+
+		async def _Export(sec: Section) -> Tuple[str, pandas.DataFrame]:
+			async with semaphore:
+				return await self._ExportSectionReport(
+					sec=sec,
+					date=date,
+					includeTimeSpent=includeTimeSpent,
+				)
+
+		results = await asyncio.gather(
+			*[ _Export(sec) for sec in self.sections.sections ]
+		)
+
+		filename = None
+		dfs = {}
+		for sec, (filename, df) in zip(self.sections.sections, results):
+			dfs[sec.id] = df
+
+		return filename, dfs
+
+	async def _ExportBatchedSectionReports(
+		self,
+		date: Datetime.Datetime,
+		includeTimeSpent: bool=False,
+	) -> Tuple[str, Dict[int, pandas.DataFrame]]:
+		projection = ReportProjection(
+			self._SelectBatchedColumns,
+			instrumentation=self.host.instrumentation,
+		)
+
+		filename, df = await self._CourseExportReportByDate(
+			date=date,
+			secIds=self.sections.GetIdList(),
+			includeTimeSpent=includeTimeSpent,
+			columnSelector=projection,
+		)
+
+		return filename, self._SplitBatchedReport(df, projection)
+
+	async def ExportReportByDate(
+		self,
+		date: Datetime.Datetime,
+		includeTimeSpent: bool=False,
+		maxWorkers: Union[int, None]=None,
+		batchSections: bool=False,
+	) -> Tuple[str, pandas.DataFrame]:
+		if batchSections:
+			filename, dfs = await self._ExportBatchedSectionReports(
+				date=date,
+				includeTimeSpent=includeTimeSpent,
+			)
+		else:
+			filename, dfs = await self._ExportSectionReports(
+				date=date,
+				includeTimeSpent=includeTimeSpent,
+				maxWorkers=maxWorkers,
+			)
+
+		with self.host.instrumentation.Span('report.merge'):
+			df = self._MergeSectionReports(dfs)
+
+		return filename, df
+
+	async def ExportReportWithDue(
+		self,
+		due: Due.Due,
+		includeTimeSpent: bool=False,
+		maxWorkers: Union[int, None]=None,
+		batchSections: bool=False,
+	) -> Tuple[str, pandas.DataFrame]:
+		return await self.ExportReportWithDues(
+			dues=[ due ],
+			includeTimeSpent=includeTimeSpent,
+			maxWorkers=maxWorkers,
+			batchSections=batchSections,
+		)
+
+	async def ExportReportWithDues(
+		self,
+		dues: List[Due.Due],
+		includeTimeSpent: bool=False,
+		mergeOps: Union[Callable, None]=None,
+		maxWorkers: Union[int, None]=None,
+		batchSections: bool=False,
+		shareExports: bool=True,
+	) -> Tuple[str, pandas.DataFrame]:
+		if len(dues) == 0:
+			raise ValueError('No dues specified')
+
+		dueGroups, exportDates = self._GroupDuesByDate(dues, shareExports)
+
+		# the distinct due dates are exported concurrently
+		results = await asyncio.gather(
+			*[
+				self.ExportReportByDate(
+					date=date,
+					includeTimeSpent=includeTimeSpent,
+					maxWorkers=maxWorkers,
+					batchSections=batchSections,
+				)
+				for date in exportDates.values()
+			]
+		)
+		reports = dict(zip(exportDates.keys(), results))
+
+		return self._ApplyDues(
+			dues=dues,
+			dueGroups=dueGroups,
+			reports=reports,
+			mergeOps=mergeOps,
+		)
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import os
+import shutil
+import tempfile
+
+from typing import Any, Callable, Dict, List, Tuple, Union
+from ..Due import Datetime
+from ..Due import Due
+from .Assignment import AssignmentBase, ReportProjection, Section
+from .AsyncAssignment import AsyncAssignment
+from .Course import CourseBase
+from .._LazyModule import LazyModule
+
+
+pandas = LazyModule('pandas')
+
+
+class AsyncCourse(CourseBase):
+	'''
+	The asyncio counterpart of `Course`, to be used with an `AsyncHost`;
+	all its requests are awaited.
+	'''
+
+	def __str__(self) -> str:
+		return f'AsyncCourse(id={self.id}, code={self.code}, title={self.title})'
+
+	async def GetRoster(
+		self,
+		roles: List[str]=['Instructor','TA','Student','Temporary','Dropped']
+	) -> dict:
+		path = f'/v1/zybook/{self.code}/roster'
+		url = f'{self.host.GetBaseUrl()}{path}'
+
+		params = {
+			'zybook_roles': json.dumps(roles,separators=(',', ':')),
+		}
+		headers = {}
+
+		self.auth.AddAuth(headers)
+
+		respJson = await self.host.GetJson(
+			url,
+			headers=headers,
+			params=params,
+			cacheEndpoint='roster',
+		)
+
+		return self.host.CheckRespJsonSuccess(respJson)
+
+	async def GetAssignments(self) -> dict:
+		path = f'/v1/zybook/{self.code}/assignments'
+		url = f'{self.host.GetBaseUrl()}{path}'
+
+		headers = {}
+
+		self.auth.AddAuth(headers)
+
+		respJson = await self.host.GetJson(
+			url,
+			headers=headers,
+			cacheEndpoint='assignments',
+		)
+
+		return self.host.CheckRespJsonSuccess(respJson)
+
+	async def OpenAssignment(
+		self,
+		assignmentID: Union[int, None]=None,
+		titleKeyword: Union[str, None]=None,
+	) -> AsyncAssignment:
+		assignmentList = await self.GetAssignments()
+
+		payload = self._FindAssignmentPayload(
+			assignmentList=assignmentList,
+			assignmentID=assignmentID,
+			titleKeyword=titleKeyword,
+		)
+
+		return AsyncAssignment(
+			host=self.host,
+			auth=self.auth,
+			course=self,
+			payload=payload
+		)
+
+	async def OpenAssignments(
+		self,
+		assignmentIDs: Union[List[int], None]=None,
+	) -> List[AsyncAssignment]:
+		assignmentList = await self.GetAssignments()
+
+		if assignmentIDs is None:
+			payloads = assignmentList['assignments']
+		else:
+			payloads = [
+				self._FindAssignmentPayload(
+					assignmentList=assignmentList,
+					assignmentID=assignmentID,
+				)
+				for assignmentID in assignmentIDs
+			]
+
+		return [
+			AsyncAssignment(
+				host=self.host,
+				auth=self.auth,
+				course=self,
+				payload=payload
+			)
+			for payload in payloads
+		]
+
+	async def ExportReportByDate(
+		self,
+		date: Datetime.Datetime,
+		secIds: List[int],
+		includeTimeSpent: bool=False,
+		refresh: bool=False,
+		dtype: Union[dict, None]=None,
+		engine: Union[str, None]=None,
+		columnSelector: Union[
+			Callable[[List[str]], Tuple[List[int], dict]],
+			None
+		]=None,
+	) -> Tuple[str, pandas.DataFrame]:
+		'''
+		See `Course.ExportReportByDate`; the cache, journal and file I/O,
+		and the parsing, run off the event loop.
+		'''
+		with self.host.instrumentation.Span(
+			'course.export_report',
+			course=self.code,
+			sections=len(secIds),
+		) as span:
+			cacheKey = self._GetReportCacheKey(
+				date=date,
+				secIds=secIds,
+				includeTimeSpent=includeTimeSpent,
+			)
+			journalKey = self._GetJournalKey(
+				date=date,
+				secIds=secIds,
+				includeTimeSpent=includeTimeSpent,
+			)
+			if not refresh:
+				stored = await asyncio.to_thread(
+					self._GetStoredReport,
+					cacheKey,
+					journalKey,
+					dtype=dtype,
+					engine=engine,
+					columnSelector=columnSelector,
+				)
+				if stored is not None:
+					source, report = stored
+					span.SetAttribute('source', source)
+					return report
+
+			headers = {}
+			self.auth.AddAuth(headers)
+
+			csvUrl = None
+			if not refresh:
+				# reattach to an export submitted by a previous run
+				location = await asyncio.to_thread(
+					self._GetPendingLocation,
+					journalKey,
+				)
+				if location is not None:
+					try:
+						with self.host.instrumentation.Span(
+							'export.wait',
+							reattached=True,
+						):
+							csvUrl = await self.host.ExportWait(
+								auth=self.auth,
+								exportDict={ 'success': True, 'location': location },
+							)
+					except Exception as e:
+						self.logger.warning(
+							f'Unable to reattach to the journaled export, ' +
+							f'exporting again: {e}'
+						)
+
+			if csvUrl is None:
+				path = f'/v1/zybook/{self.code}/activities/export'
+				url = f'{self.host.GetBaseUrl()}{path}'
+
+				# pull the report
+				params = self._BuildExportParams(
+					date=date,
+					secIds=secIds,
+					includeTimeSpent=includeTimeSpent,
+				)
+				with self.host.instrumentation.Span('export.submit'):
+					# a retried submission could queue a duplicate export
+					respJson = await self.host.GetJson(
+						url,
+						headers=headers,
+						params=params,
+						idempotent=False,
+					)
+					respJson = self.host.CheckRespJsonSuccess(respJson)
+
+				await asyncio.to_thread(
+					self._RecordSubmitted,
+					journalKey,
+					date,
+					secIds,
+					respJson['location'],
+				)
+
+				# wait for the report to be ready
+				with self.host.instrumentation.Span('export.wait'):
+					csvUrl = await self.host.ExportWait(auth=self.auth, exportDict=respJson)
+
+			span.SetAttribute('source', 'export')
+			filename = self._GetReportFilename(date=date, csvUrl=csvUrl)
+
+			tmpDir = tempfile.mkdtemp()
+			try:
+				csvPath = os.path.join(tmpDir, filename)
+
+				# download the report
+				with self.host.instrumentation.Span('report.download') as downloadSpan:
+					await self.host.DownloadToFile(csvUrl, headers=headers, path=csvPath)
+					downloadSpan.SetAttribute('bytes', os.path.getsize(csvPath))
+
+				csvPath = await asyncio.to_thread(
+					self._StoreDownloadedReport,
+					cacheKey=cacheKey,
+					journalKey=journalKey,
+					filename=filename,
+					csvPath=csvPath,
+				)
+
+				# parse it off the event loop
+				with self.host.instrumentation.Span('report.read'):
+					df = await asyncio.to_thread(
+						self._ReadReport,
+						csvPath,
+						dtype=dtype,
+						engine=engine,
+						columnSelector=columnSelector,
+					)
+			finally:
+				await asyncio.to_thread(shutil.rmtree, tmpDir, ignore_errors=True)
+
+			return filename, df
+
+	async def _ExportGradebookSection(
+		self,
+		secId: int,
+		date: Datetime.Datetime,
+		secs: List[Section],
+		includeTimeSpent: bool=False,
+	) -> Tuple[str, pandas.DataFrame, ReportProjection]:
+		projection = ReportProjection(
+			functools.partial(AssignmentBase._SelectSectionsColumns, secs),
+			instrumentation=self.host.instrumentation,
+		)
+
+		filename, df = await self.ExportReportByDate(
+			date=date,
+			secIds=[ secId ],
+			includeTimeSpent=includeTimeSpent,
+			columnSelector=projection,
+		)
+
+		return filename, df, projection
+
+	async def ExportGradebook(
+		self,
+		assignmentDues: List[Tuple[AsyncAssignment, Due.Due]],
+		includeTimeSpent: bool=False,
+		maxWorkers: Union[int, None]=None,
+	) -> Tuple[Dict[int, pandas.DataFrame], pandas.DataFrame]:
+		'''
+		Export the reports of many assignments concurrently, with at most
+		`maxWorkers` section exports in flight (no limit if None);
+		see `Course.ExportGradebook`.
+		'''
+		if (maxWorkers is not None) and (maxWorkers < 1):
+			raise ValueError('maxWorkers must be at least 1')
+
+		plan, exports = self._PlanGradebook(assignmentDues)
+
+		semaphore = asyncio.Semaphore(
+			max(len(exports), 1) if maxWorkers is None else maxWorkers
+		)
+
+		async def _Export(
+			exportKey: Tuple[int, Any],
+			date: Datetime.Datetime,
+			secs: List[Section],
+		) -> Tuple[str, pandas.DataFrame, ReportProjection]:
+			async with semaphore:
+				return await self._ExportGradebookSection(
+					secId=exportKey[0],
+					date=date,
+					secs=secs,
+					includeTimeSpent=includeTimeSpent,
+				)
+
+		exportKeys = list(exports.keys())
+		results = await asyncio.gather(
+			*[
+				_Export(exportKey, *exports[exportKey])
+				for exportKey in exportKeys
+			]
+		)
+
+		return self._BuildGradebook(plan, dict(zip(exportKeys, results)))
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import asyncio
+import time
+
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Tuple, Union
+from .AsyncCourse import AsyncCourse
+from .Dashboard import DashboardBase
+
+
+class AsyncDashboard(DashboardBase):
+	'''
+	The asyncio counterpart of `Dashboard`, to be used with an `AsyncHost`.
+	'''
+
+	def __str__(self) -> str:
+		return f'AsyncDashboard(uid={self.uid})'
+
+	async def GetUserInfo(self) -> dict:
+		path = f'/v1/user/{self.uid}'
+		url = f'{self.host.GetBaseUrl()}{path}'
+
+		headers = {}
+
+		self.auth.AddAuth(headers)
+
+		return await self.host.GetJson(
+			url,
+			headers=headers,
+			cacheEndpoint='userInfo',
+		)
+
+	async def GetCourseList(self) -> dict:
+		path = f'/v1/user/{self.uid}/items'
+		url = f'{self.host.GetBaseUrl()}{path}'
+
+		headers = {}
+
+		self.auth.AddAuth(headers)
+
+		return await self.host.GetJson(
+			url,
+			headers=headers,
+			cacheEndpoint='courseList',
+		)
+
+	async def OpenCourse(
+		self,
+		courseID: Union[int, None]=None,
+		courseCode: Union[str, None]=None,
+		titleKeyword: Union[str, None]=None,
+	) -> AsyncCourse:
+		courseList = self.host.CheckRespJsonSuccess(await self.GetCourseList())
+
+		payload = self._FindCoursePayload(
+			courseList=courseList,
+			courseID=courseID,
+			courseCode=courseCode,
+			titleKeyword=titleKeyword,
+		)
+
+		return AsyncCourse(
+			host=self.host,
+			auth=self.auth,
+			dashboard=self,
+			payload=payload
+		)
+
+	async def OpenCourses(
+		self,
+		courseIDs: Union[List[int], None]=None,
+		courseCodes: Union[List[str], None]=None,
+		titlePattern: Union[str, None]=None,
+	) -> List[AsyncCourse]:
+		courseList = self.host.CheckRespJsonSuccess(await self.GetCourseList())
+
+		payloads = self._FindCoursePayloads(
+			courseList=courseList,
+			courseIDs=courseIDs,
+			courseCodes=courseCodes,
+			titlePattern=titlePattern,
+		)
+
+		return [
+			AsyncCourse(
+				host=self.host,
+				auth=self.auth,
+				dashboard=self,
+				payload=payload
+			)
+			for payload in payloads
+		]
+
+	def ExportCourses(
+		self,
+		courses: List[AsyncCourse],
+		export: Callable[[AsyncCourse], Awaitable[Any]],
+		maxWorkers: Union[int, None]=None,
+		startsPerSecond: Union[float, None]=None,
+	) -> AsyncIterator[Tuple[AsyncCourse, asyncio.Task]]:
+		'''
+		Await `export` on every course, with at most `maxWorkers` courses in
+		progress (no limit if None) and at most `startsPerSecond` courses
+		started per second (no limit if None).
+		Yields (course, task) as each course finishes;
+		see `Dashboard.ExportCourses`.
+		'''
+		# check the arguments here, rather than at the first iteration
+		if (maxWorkers is not None) and (maxWorkers < 1):
+			raise ValueError('maxWorkers must be at least 1')
+		if (startsPerSecond is not None) and (startsPerSecond <= 0.0):
+			raise ValueError('startsPerSecond must be positive')
+
+		return self._ExportCourses(courses, export, maxWorkers, startsPerSecond)
+
+	async def _ExportCourses(
+		self,
+		courses: List[AsyncCourse],
+		export: Callable[[AsyncCourse], Awaitable[Any]],
+		maxWorkers: Union[int, None],
+		startsPerSecond: Union[float, None],
+	) -> AsyncIterator[Tuple[AsyncCourse, asyncio.Task]]:
+		semaphore = asyncio.Semaphore(
+			max(len(courses), 1) if maxWorkers is None else maxWorkers
+		)
+		nextStart = [ time.monotonic() ]
+
+		async def _Export(course: AsyncCourse) -> Any:
+			async with semaphore:
+				if startsPerSecond is not None:
+					startTime = max(nextStart[0], time.monotonic())
+					nextStart[0] = startTime + (1.0 / startsPerSecond)
+					await asyncio.sleep(max(startTime - time.monotonic(), 0.0))
+				return await export(course)
+
+		tasks = {
+			asyncio.ensure_future(_Export(course)): course
+			for course in courses
+		}
+		try:
+			pending = set(tasks.keys())
+			while len(pending) > 0:
+				done, pending = await asyncio.wait(
+					pending,
+					return_when=asyncio.FIRST_COMPLETED,
+				)
+				for task in done:
+					yield tasks[task], task
+		finally:
+			for task in tasks:
+				task.cancel()
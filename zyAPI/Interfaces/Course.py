@@ -8,19 +8,60 @@
 ###
 
 
+from __future__ import annotations
+
+import concurrent.futures
+import contextvars
+import functools
 import io
 import json
 import logging
-import pandas
 import os
+import shutil
+import tempfile
+import weakref
 
-from typing import List, Tuple, Union
+from typing import Any, Callable, Dict, List, Tuple, Union
 from ..Auth.Auth import Auth
 from ..Due import Datetime
+from ..Due import Due
 from ..Host import Host
-from .Assignment import Assignment
+from ..ReportCache import ReportCache
+from .Assignment import Assignment, AssignmentBase, ReportProjection, Section
+from .._LazyModule import LazyModule
+
+
+numpy = LazyModule('numpy')
+pandas = LazyModule('pandas')
+
+
+class _ExportedReport(object):
+	'''
+	The CSV of an export, shared by the callers of the same export in
+	flight; its temporary directory is removed once no caller refers to it
+	anymore.
+	'''
 
-class Course(object):
+	def __init__(self, filename: str, csvPath: str, tmpDir: str) -> None:
+		super(_ExportedReport, self).__init__()
+
+		self.filename = filename
+		self.csvPath = csvPath
+		self.tmpDir = tmpDir
+		self._finalizer = weakref.finalize(
+			self,
+			shutil.rmtree,
+			tmpDir,
+			ignore_errors=True,
+		)
+
+
+class CourseBase(object):
+	'''
+	The parts of a course shared by `Course` and `AsyncCourse`: the search
+	of its assignments, and the report cache and journal bookkeeping of its
+	exports, which don't depend on how the requests are sent.
+	'''
 
 	def __init__(
 		self,
@@ -29,7 +70,7 @@ class Course(object):
 		dashboard: 'Dashboard',
 		payload: dict
 	) -> None:
-		super(Course, self).__init__()
+		super(CourseBase, self).__init__()
 
 		self.logger = logging.getLogger(f'{__name__}.{self.__class__.__name__}')
 
@@ -42,6 +83,427 @@ class Course(object):
 		self.code = self.payload['zybook_code']
 		self.title = self.payload['title']
 
+		# (assignment list, index) of the last assignment list searched
+		self.assignmentIndex = (None, None)
+
+	def _GetAssignmentIndex(self, assignmentList: dict) -> dict:
+		# a cached assignment list is the same object until it expires,
+		# so its index only needs to be built once
+		indexedList, index = self.assignmentIndex
+		if indexedList is not assignmentList:
+			index = {}
+			for assignment in assignmentList['assignments']:
+				index.setdefault(
+					assignment['assignment_id'], []
+				).append(assignment)
+			self.assignmentIndex = (assignmentList, index)
+		return index
+
+	def _FindAssignmentPayload(
+		self,
+		assignmentList: dict,
+		assignmentID: Union[int, None]=None,
+		titleKeyword: Union[str, None]=None,
+	) -> dict:
+		if (
+			assignmentID is not None and
+			titleKeyword is not None
+		):
+			raise ValueError(
+				'Only one of the search parameters can be specified'
+			)
+
+		payload = None
+		if assignmentID is not None:
+			index = self._GetAssignmentIndex(assignmentList)
+			matches = index.get(assignmentID, [])
+			if len(matches) > 1:
+				raise ValueError('Assignment ID not unique')
+			payload = matches[0] if len(matches) > 0 else None
+
+		elif titleKeyword is not None:
+			for assignment in assignmentList['assignments']:
+				if titleKeyword in assignment['title']:
+					if payload is not None:
+						raise ValueError('Title keyword not unique')
+					payload = assignment
+
+		if payload is None:
+			raise ValueError('Assignment not found')
+
+		return payload
+
+	@classmethod
+	def _BuildExportParams(
+		cls,
+		date: Datetime.Datetime,
+		secIds: List[int],
+		includeTimeSpent: bool=False,
+	) -> dict:
+		return {
+			'time_zone_abbreviation': date.GetTimezoneAbbr(),
+			'time_zone_offset': date.GetZyTimezoneOffsetMin(),
+			'end_date': date.GetUtcTimestampStr(),
+			'sections': json.dumps(secIds,separators=(',', ':')),
+			'include_time_spent': includeTimeSpent,
+			'combine_activities': False,
+			'assignment_id': '',
+		}
+
+	def _GetReportFilename(
+		self,
+		date: Datetime.Datetime,
+		csvUrl: str,
+	) -> str:
+		filename = os.path.basename(csvUrl)
+
+		self.logger.debug(f'Exported report: {filename}')
+		expectedTimeSuffix = date.GetReportNameSuffix()
+		if expectedTimeSuffix not in filename:
+			raise ValueError(f'Expected time suffix not found in filename: {expectedTimeSuffix}')
+
+		return filename
+
+	@classmethod
+	def _ReadReport(
+		cls,
+		csvFile: Union[str, io.IOBase],
+		dtype: Union[dict, None]=None,
+		engine: Union[str, None]=None,
+		columnSelector: Union[
+			Callable[[List[str]], Tuple[List[int], dict]],
+			None
+		]=None,
+	) -> pandas.DataFrame:
+		kwargs = {}
+		if dtype is not None:
+			kwargs['dtype'] = dtype
+		if engine is not None:
+			kwargs['engine'] = engine
+		if columnSelector is not None:
+			# read the header only, and let the selector pick the columns
+			headers = list(pandas.read_csv(csvFile, nrows=0).columns)
+			if not isinstance(csvFile, str):
+				csvFile.seek(0)
+			usecols, colDtype = columnSelector(headers)
+			kwargs['usecols'] = usecols
+			kwargs['dtype'] = { **kwargs.get('dtype', {}), **colDtype }
+		if (
+			isinstance(csvFile, str) and
+			(not csvFile.endswith('.gz')) and
+			(engine in (None, 'c'))
+		):
+			# parse straight from the page cache instead of a read buffer
+			kwargs['memory_map'] = True
+
+		return pandas.read_csv(csvFile, **kwargs)
+
+	def _StoreAndReadReport(
+		self,
+		cacheKey: Union[str, None],
+		filename: str,
+		csvPath: str,
+		dtype: Union[dict, None]=None,
+		engine: Union[str, None]=None,
+		columnSelector: Union[
+			Callable[[List[str]], Tuple[List[int], dict]],
+			None
+		]=None,
+	) -> pandas.DataFrame:
+		if cacheKey is not None:
+			with open(csvPath, 'rb') as csvFile:
+				self.host.reportCache.Put(cacheKey, filename, csvFile)
+
+		with self.host.instrumentation.Span('report.read'):
+			return self._ReadReport(
+				csvPath,
+				dtype=dtype,
+				engine=engine,
+				columnSelector=columnSelector,
+			)
+
+	def _GetReportCacheKey(
+		self,
+		date: Datetime.Datetime,
+		secIds: List[int],
+		includeTimeSpent: bool=False,
+	) -> Union[str, None]:
+		'''
+		Only reports of past dates can be cached, since a report of a future
+		date changes as students keep working on the activities.
+		Returns None if the report shouldn't be cached.
+		'''
+		if (self.host.reportCache is None) or (not date.IsPast()):
+			return None
+
+		return ReportCache.MakeKey(
+			courseCode=self.code,
+			secIds=secIds,
+			date=date,
+			includeTimeSpent=includeTimeSpent,
+		)
+
+	def _GetCachedReport(
+		self,
+		cacheKey: Union[str, None],
+		dtype: Union[dict, None]=None,
+		engine: Union[str, None]=None,
+		columnSelector: Union[
+			Callable[[List[str]], Tuple[List[int], dict]],
+			None
+		]=None,
+	) -> Union[Tuple[str, pandas.DataFrame], None]:
+		'''
+		Returns the cached report, or None if it's not in the cache.
+		'''
+		if cacheKey is None:
+			return None
+
+		cached = self.host.reportCache.Get(cacheKey)
+		if cached is None:
+			return None
+
+		filename, csvPath = cached
+		try:
+			with self.host.instrumentation.Span('report.read', cached=True):
+				df = self._ReadReport(
+					csvPath,
+					dtype=dtype,
+					engine=engine,
+					columnSelector=columnSelector,
+				)
+		except FileNotFoundError:
+			# evicted or replaced by another thread since the lookup
+			self.logger.debug(f'Cached report is gone, exporting: {filename}')
+			return None
+		return filename, df
+
+	def _GetJournalKey(
+		self,
+		date: Datetime.Datetime,
+		secIds: List[int],
+		includeTimeSpent: bool=False,
+	) -> Union[str, None]:
+		'''
+		Returns None if the host has no journal.
+		'''
+		if self.host.journal is None:
+			return None
+
+		return ReportCache.MakeKey(
+			courseCode=self.code,
+			secIds=secIds,
+			date=date,
+			includeTimeSpent=includeTimeSpent,
+		)
+
+	def _GetJournalDescription(
+		self,
+		date: Datetime.Datetime,
+		secIds: List[int],
+	) -> str:
+		return f'{self.code} sections {secIds} at {date}'
+
+	def _GetJournaledReport(
+		self,
+		journalKey: Union[str, None],
+		cacheKey: Union[str, None],
+		dtype: Union[dict, None]=None,
+		engine: Union[str, None]=None,
+		columnSelector: Union[
+			Callable[[List[str]], Tuple[List[int], dict]],
+			None
+		]=None,
+	) -> Union[Tuple[str, pandas.DataFrame], None]:
+		'''
+		Returns the report downloaded by a previous run, or None.
+		'''
+		if journalKey is None:
+			return None
+
+		entry = self.host.journal.GetDownloaded(journalKey)
+		if entry is None:
+			return None
+
+		self.logger.debug(f'Report found in the journal: {entry["filename"]}')
+		df = self._StoreAndReadReport(
+			cacheKey=cacheKey,
+			filename=entry['filename'],
+			csvPath=entry['csv_path'],
+			dtype=dtype,
+			engine=engine,
+			columnSelector=columnSelector,
+		)
+		return entry['filename'], df
+
+	def _GetStoredReport(
+		self,
+		cacheKey: Union[str, None],
+		journalKey: Union[str, None],
+		dtype: Union[dict, None]=None,
+		engine: Union[str, None]=None,
+		columnSelector: Union[
+			Callable[[List[str]], Tuple[List[int], dict]],
+			None
+		]=None,
+	) -> Union[Tuple[str, Tuple[str, pandas.DataFrame]], None]:
+		'''
+		Returns where the report was found (`cache` or `journal`) and the
+		report, or None if it has to be exported.
+		'''
+		readKwargs = {
+			'dtype': dtype,
+			'engine': engine,
+			'columnSelector': columnSelector,
+		}
+
+		cached = self._GetCachedReport(cacheKey, **readKwargs)
+		if cached is not None:
+			return 'cache', cached
+
+		journaled = self._GetJournaledReport(journalKey, cacheKey, **readKwargs)
+		if journaled is not None:
+			return 'journal', journaled
+
+		return None
+
+	def _GetPendingLocation(
+		self,
+		journalKey: Union[str, None],
+	) -> Union[str, None]:
+		'''
+		Returns the location of an export submitted by a previous run and
+		not downloaded yet, or None.
+		'''
+		if journalKey is None:
+			return None
+
+		return self.host.journal.GetPendingLocation(journalKey)
+
+	def _RecordSubmitted(
+		self,
+		journalKey: Union[str, None],
+		date: Datetime.Datetime,
+		secIds: List[int],
+		location: str,
+	) -> None:
+		if journalKey is not None:
+			self.host.journal.RecordSubmitted(
+				journalKey,
+				self._GetJournalDescription(date, secIds),
+				location,
+			)
+
+	def _StoreDownloadedReport(
+		self,
+		cacheKey: Union[str, None],
+		journalKey: Union[str, None],
+		filename: str,
+		csvPath: str,
+	) -> str:
+		'''
+		Store the downloaded CSV in the journal and the report cache, if
+		any, and return where the CSV is now.
+		'''
+		if journalKey is not None:
+			# keep the CSV for restarted runs
+			journalPath = self.host.journal.GetCsvPath(journalKey)
+			shutil.move(csvPath, journalPath)
+			csvPath = journalPath
+			self.host.journal.RecordDownloaded(journalKey, filename, csvPath)
+
+		if cacheKey is not None:
+			with open(csvPath, 'rb') as csvFile:
+				self.host.reportCache.Put(cacheKey, filename, csvFile)
+
+		return csvPath
+
+	@classmethod
+	def _PlanGradebook(
+		cls,
+		assignmentDues: List[Tuple[AssignmentBase, Due.Due]],
+	) -> Tuple[list, Dict[Tuple[int, Any], Tuple[Datetime.Datetime, List[Section]]]]:
+		'''
+		Returns the due date groups of each (assignment, due) pair,
+		and the distinct (section ID, report key) exports they need,
+		each with its date and the `Section` objects that use it.
+		'''
+		asgIds = [ assignment.id for assignment, _ in assignmentDues ]
+		if len(set(asgIds)) != len(asgIds):
+			raise ValueError('Each assignment can only be listed once')
+
+		plan = []
+		exports = {}
+		for assignment, due in assignmentDues:
+			dueGroups, exportDates = assignment._GroupDuesByDate(
+				[ due ],
+				shareExports=True,
+			)
+			plan.append((assignment, due, dueGroups, list(exportDates.keys())))
+
+			for dateKey, date in exportDates.items():
+				for sec in assignment.sections.sections:
+					exports.setdefault(
+						(sec.id, dateKey), (date, [])
+					)[1].append(sec)
+
+		return plan, exports
+
+	@classmethod
+	def _BuildGradebook(
+		cls,
+		plan: list,
+		results: Dict[Tuple[int, Any], Tuple[str, pandas.DataFrame, ReportProjection]],
+	) -> Tuple[Dict[int, pandas.DataFrame], pandas.DataFrame]:
+		'''
+		Build the report of each assignment with its due applied, from the
+		shared section exports, and join them into one gradebook.
+		'''
+		frames = {}
+		for assignment, due, dueGroups, dateKeys in plan:
+			reports = {}
+			for dateKey in dateKeys:
+				filename = None
+				dfs = {}
+				for sec in assignment.sections.sections:
+					filename, df, projection = results[(sec.id, dateKey)]
+					dfs[sec.id] = assignment._ProcessSectionReport(
+						sec=sec,
+						df=df,
+						projection=projection,
+					)
+				with assignment.host.instrumentation.Span('report.merge'):
+					reports[dateKey] = (
+						filename,
+						assignment._MergeSectionReports(dfs)
+					)
+
+			_, frames[assignment.id] = assignment._ApplyDues(
+				dues=[ due ],
+				dueGroups=dueGroups,
+				reports=reports,
+				mergeOps=numpy.maximum,
+			)
+
+		# names and school emails of every student in any assignment, then
+		# the totals of each assignment as `<assignment ID>.<total column>`
+		idCols = [ 'last_name', 'first_name', 'school_email' ]
+		totalCols = [ 'total', 'total_percent', 'total_due', 'total_percent_due' ]
+		dfIds = pandas.concat([ df[idCols] for df in frames.values() ])
+		dfIds = dfIds[~dfIds.index.duplicated()]
+
+		dfParts = [ dfIds ]
+		for asgId, df in frames.items():
+			dfParts.append(
+				df[totalCols].rename(columns=lambda c: f'{asgId}.{c}')
+			)
+		gradebook = pandas.concat(dfParts, axis=1)
+
+		return frames, gradebook
+
+
+class Course(CourseBase):
+
 	def __str__(self) -> str:
 		return f'Course(id={self.id}, code={self.code}, title={self.title})'
 
@@ -50,7 +512,7 @@ class Course(object):
 		roles: List[str]=['Instructor','TA','Student','Temporary','Dropped']
 	) -> dict:
 		path = f'/v1/zybook/{self.code}/roster'
-		url = f'https://{self.host.GetHost()}{path}'
+		url = f'{self.host.GetBaseUrl()}{path}'
 
 		params = {
 			'zybook_roles': json.dumps(roles,separators=(',', ':')),
@@ -59,101 +521,339 @@ class Course(object):
 
 		self.auth.AddAuth(headers)
 
-		response = self.host.session.get(url, headers=headers, params=params)
+		respJson = self.host.GetJson(
+			url,
+			headers=headers,
+			params=params,
+			cacheEndpoint='roster',
+		)
 
-		return self.host.CheckRespJsonSuccess(response.json())
+		return self.host.CheckRespJsonSuccess(respJson)
 
 	def GetAssignments(self) -> dict:
 		path = f'/v1/zybook/{self.code}/assignments'
-		url = f'https://{self.host.GetHost()}{path}'
+		url = f'{self.host.GetBaseUrl()}{path}'
 
 		headers = {}
 
 		self.auth.AddAuth(headers)
 
-		response = self.host.session.get(url, headers=headers)
+		respJson = self.host.GetJson(
+			url,
+			headers=headers,
+			cacheEndpoint='assignments',
+		)
 
-		return self.host.CheckRespJsonSuccess(response.json())
+		return self.host.CheckRespJsonSuccess(respJson)
 
 	def OpenAssignment(
 		self,
 		assignmentID: Union[int, None]=None,
 		titleKeyword: Union[str, None]=None,
 	) -> Assignment:
-		if (
-			assignmentID is not None and
-			titleKeyword is not None
-		):
-			raise ValueError(
-				'Only one of the search parameters can be specified'
-			)
-
 		assignmentList = self.GetAssignments()
 
-		payload = None
-		for assignment in assignmentList['assignments']:
-			if assignmentID is not None:
-				if assignment['assignment_id'] == assignmentID:
-					if payload is not None:
-						raise ValueError('Assignment ID not unique')
-					payload = assignment
+		payload = self._FindAssignmentPayload(
+			assignmentList=assignmentList,
+			assignmentID=assignmentID,
+			titleKeyword=titleKeyword,
+		)
 
-			elif titleKeyword is not None:
-				if titleKeyword in assignment['title']:
-					if payload is not None:
-						raise ValueError('Title keyword not unique')
-					payload = assignment
+		return Assignment(
+			host=self.host,
+			auth=self.auth,
+			course=self,
+			payload=payload
+		)
 
-		if payload is None:
-			raise ValueError('Assignment not found')
+	def OpenAssignments(
+		self,
+		assignmentIDs: Union[List[int], None]=None,
+	) -> List[Assignment]:
+		'''
+		Open the given assignments, or all of them if assignmentIDs is None,
+		with a single fetch of the assignment list.
+		'''
+		assignmentList = self.GetAssignments()
+
+		if assignmentIDs is None:
+			payloads = assignmentList['assignments']
 		else:
-			return Assignment(
+			payloads = [
+				self._FindAssignmentPayload(
+					assignmentList=assignmentList,
+					assignmentID=assignmentID,
+				)
+				for assignmentID in assignmentIDs
+			]
+
+		return [
+			Assignment(
 				host=self.host,
 				auth=self.auth,
 				course=self,
 				payload=payload
 			)
+			for payload in payloads
+		]
 
-	def ExportReportByDate(
+	def _ExportReportCsv(
 		self,
 		date: Datetime.Datetime,
 		secIds: List[int],
-		includeTimeSpent: bool=False,
-	) -> Tuple[str, pandas.DataFrame]:
-		path = f'/v1/zybook/{self.code}/activities/export'
-		url = f'https://{self.host.GetHost()}{path}'
-
+		includeTimeSpent: bool,
+		refresh: bool,
+		cacheKey: Union[str, None],
+		journalKey: Union[str, None],
+	) -> _ExportedReport:
+		'''
+		Export and download the report, and store it in the journal and the
+		report cache, if any.
+		'''
 		headers = {}
 		self.auth.AddAuth(headers)
 
-		# pull the report
-		params = {
-			'time_zone_abbreviation': date.GetTimezoneAbbr(),
-			'time_zone_offset': date.GetZyTimezoneOffsetMin(),
-			'end_date': date.GetUtcTimestampStr(),
-			'sections': json.dumps(secIds,separators=(',', ':')),
-			'include_time_spent': includeTimeSpent,
-			'combine_activities': False,
-			'assignment_id': '',
-		}
-		resp = self.host.session.get(url, params=params, headers=headers)
-		respJson = self.host.CheckRespJsonSuccess(resp.json())
-
-		# wait for the report to be ready
-		csvUrl = self.host.ExportWait(auth=self.auth, exportDict=respJson)
-
-		# download the report
-		csvResp = self.host.session.get(csvUrl, headers=headers)
+		csvUrl = None
+		if not refresh:
+			# reattach to an export submitted by a previous run
+			location = self._GetPendingLocation(journalKey)
+			if location is not None:
+				try:
+					with self.host.instrumentation.Span(
+						'export.wait',
+						reattached=True,
+					):
+						csvUrl = self.host.ExportWait(
+							auth=self.auth,
+							exportDict={ 'success': True, 'location': location },
+						)
+				except Exception as e:
+					self.logger.warning(
+						f'Unable to reattach to the journaled export, ' +
+						f'exporting again: {e}'
+					)
+
+		if csvUrl is None:
+			path = f'/v1/zybook/{self.code}/activities/export'
+			url = f'{self.host.GetBaseUrl()}{path}'
+
+			# pull the report
+			params = self._BuildExportParams(
+				date=date,
+				secIds=secIds,
+				includeTimeSpent=includeTimeSpent,
+			)
+			with self.host.instrumentation.Span('export.submit'):
+				resp = self.host.Request(
+					'api',
+					'GET',
+					url,
+					session=self.host.submitSession,
+					params=params,
+					headers=headers,
+				)
+				respJson = self.host.CheckRespJsonSuccess(resp.json())
+
+			self._RecordSubmitted(journalKey, date, secIds, respJson['location'])
+
+			# wait for the report to be ready
+			with self.host.instrumentation.Span('export.wait'):
+				csvUrl = self.host.ExportWait(auth=self.auth, exportDict=respJson)
+
+		filename = self._GetReportFilename(date=date, csvUrl=csvUrl)
+
+		tmpDir = tempfile.mkdtemp()
+		try:
+			csvPath = os.path.join(tmpDir, filename)
+
+			# download the report
+			with self.host.instrumentation.Span('report.download') as downloadSpan:
+				numBytes = 0
+				with self.host.Request(
+					'download',
+					'GET',
+					csvUrl,
+					headers=headers,
+					stream=True,
+				) as csvResp:
+					csvResp.raise_for_status()
+					with open(csvPath, 'wb') as csvFile:
+						for chunk in csvResp.iter_content(chunk_size=64 * 1024):
+							csvFile.write(chunk)
+							numBytes += len(chunk)
+				downloadSpan.SetAttribute('bytes', numBytes)
+			self.host.instrumentation.Count('http.bytes', numBytes, kind='download')
+
+			csvPath = self._StoreDownloadedReport(
+				cacheKey=cacheKey,
+				journalKey=journalKey,
+				filename=filename,
+				csvPath=csvPath,
+			)
+		except BaseException:
+			shutil.rmtree(tmpDir, ignore_errors=True)
+			raise
 
-		csvStr = csvResp.text
-		filename = os.path.basename(csvUrl)
+		return _ExportedReport(filename=filename, csvPath=csvPath, tmpDir=tmpDir)
 
-		self.logger.debug(f'Exported report: {filename}')
-		expectedTimeSuffix = date.GetReportNameSuffix()
-		if expectedTimeSuffix not in filename:
-			raise ValueError(f'Expected time suffix not found in filename: {expectedTimeSuffix}')
+	def ExportReportByDate(
+		self,
+		date: Datetime.Datetime,
+		secIds: List[int],
+		includeTimeSpent: bool=False,
+		refresh: bool=False,
+		dtype: Union[dict, None]=None,
+		engine: Union[str, None]=None,
+		columnSelector: Union[
+			Callable[[List[str]], Tuple[List[int], dict]],
+			None
+		]=None,
+	) -> Tuple[str, pandas.DataFrame]:
+		'''
+		Export the report of the given sections at the given date.
+		If the host has a report cache and the date is in the past, the
+		report is served from the cache when possible; `refresh` forces a
+		new export, which then replaces the cached one.
+
+		The report is streamed to a temporary file and parsed from there,
+		so the whole CSV is never held in memory next to the dataframe;
+		`dtype` and `engine` (e.g., 'pyarrow') are passed to
+		`pandas.read_csv`.
+		If `columnSelector` is given, it is called with the header of the
+		report before the rest is parsed, and returns the indices of the
+		columns to read and the dtypes of those columns.
+
+		If the host has a journal, the export is recorded when it's submitted
+		and when its CSV is downloaded; a restarted run reuses the downloaded
+		CSV, or polls the submitted export again instead of re-submitting it.
+		'''
+		with self.host.instrumentation.Span(
+			'course.export_report',
+			course=self.code,
+			sections=len(secIds),
+		) as span:
+			cacheKey = self._GetReportCacheKey(
+				date=date,
+				secIds=secIds,
+				includeTimeSpent=includeTimeSpent,
+			)
+			journalKey = self._GetJournalKey(
+				date=date,
+				secIds=secIds,
+				includeTimeSpent=includeTimeSpent,
+			)
+			if not refresh:
+				stored = self._GetStoredReport(
+					cacheKey,
+					journalKey,
+					dtype=dtype,
+					engine=engine,
+					columnSelector=columnSelector,
+				)
+				if stored is not None:
+					source, report = stored
+					span.SetAttribute('source', source)
+					return report
+
+			# identical exports in flight share one export and download,
+			# and each caller parses its own dataframe from the CSV;
+			# a refresh never joins an export that may reuse the journal
+			flightKey = (
+				self.code,
+				tuple(secIds),
+				date.GetReportKey(),
+				includeTimeSpent,
+				refresh,
+			)
+			exported, shared = self.host.exportFlights.Do(
+				flightKey,
+				self._ExportReportCsv,
+				date=date,
+				secIds=secIds,
+				includeTimeSpent=includeTimeSpent,
+				refresh=refresh,
+				cacheKey=cacheKey,
+				journalKey=journalKey,
+			)
+			span.SetAttribute('source', 'shared' if shared else 'export')
 
-		df = pandas.read_csv(io.StringIO(csvStr))
+			with self.host.instrumentation.Span('report.read'):
+				df = self._ReadReport(
+					exported.csvPath,
+					dtype=dtype,
+					engine=engine,
+					columnSelector=columnSelector,
+				)
 
-		return filename, df
+			return exported.filename, df
 
+	def _ExportGradebookSection(
+		self,
+		secId: int,
+		date: Datetime.Datetime,
+		secs: List[Section],
+		includeTimeSpent: bool=False,
+	) -> Tuple[str, pandas.DataFrame, ReportProjection]:
+		projection = ReportProjection(
+			functools.partial(Assignment._SelectSectionsColumns, secs),
+			instrumentation=self.host.instrumentation,
+		)
+
+		filename, df = self.ExportReportByDate(
+			date=date,
+			secIds=[ secId ],
+			includeTimeSpent=includeTimeSpent,
+			columnSelector=projection,
+		)
+
+		return filename, df, projection
+
+	def ExportGradebook(
+		self,
+		assignmentDues: List[Tuple[Assignment, Due.Due]],
+		includeTimeSpent: bool=False,
+		maxWorkers: int=1,
+	) -> Tuple[Dict[int, pandas.DataFrame], pandas.DataFrame]:
+		'''
+		Export the reports of many assignments, each with its due applied.
+		Sections shared by the assignments are only exported once per
+		distinct due date, with up to `maxWorkers` exports in flight.
+
+		Returns the report of each assignment by assignment ID, as returned
+		by `Assignment.ExportReportWithDue`, and a gradebook with one row per
+		student and the totals of every assignment.
+		'''
+		if maxWorkers < 1:
+			raise ValueError('maxWorkers must be at least 1')
+
+		plan, exports = self._PlanGradebook(assignmentDues)
+		self.logger.debug(
+			f'Exporting {len(exports)} section reports for ' +
+			f'{len(plan)} assignments'
+		)
+
+		results = {}
+		with concurrent.futures.ThreadPoolExecutor(
+			max_workers=maxWorkers
+		) as executor:
+			futures = {
+				executor.submit(
+					contextvars.copy_context().run,
+					self._ExportGradebookSection,
+					secId=exportKey[0],
+					date=date,
+					secs=secs,
+					includeTimeSpent=includeTimeSpent,
+				): exportKey
+				for exportKey, (date, secs) in exports.items()
+			}
+			try:
+				for future in concurrent.futures.as_completed(futures):
+					results[futures[future]] = future.result()
+			except BaseException:
+				# don't start exports that are still queued
+				for future in futures:
+					future.cancel()
+				raise
+
+		return self._BuildGradebook(plan, results)
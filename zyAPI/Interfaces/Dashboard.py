@@ -8,47 +8,164 @@
 ###
 
 
-from typing import Union
+import concurrent.futures
+import contextvars
+import re
+import threading
+import time
+
+from typing import Any, Callable, Iterator, List, Tuple, Union
 from ..Auth.Auth import Auth
 from ..Host import Host
 from .Course import Course
 
 
-class Dashboard(object):
+class DashboardBase(object):
+	'''
+	The parts of a dashboard shared by `Dashboard` and `AsyncDashboard`:
+	the search of its courses.
+	'''
 
 	def __init__(self, host:Host, auth: Auth, uid: int) -> None:
-		super(Dashboard, self).__init__()
+		super(DashboardBase, self).__init__()
 
 		self.host = host
 		self.auth = auth
 		self.uid = uid
 
+		# (course list, index) of the last course list searched
+		self.courseIndex = (None, None)
+
+	@classmethod
+	def _BuildCourseIndex(cls, courseList: dict) -> dict:
+		index = {
+			'id': {},
+			'code': {},
+		}
+		for course in courseList['items']['zybooks']:
+			index['id'].setdefault(course['zybook_id'], []).append(course)
+			index['code'].setdefault(course['zybook_code'], []).append(course)
+		return index
+
+	def _GetCourseIndex(self, courseList: dict) -> dict:
+		# a cached course list is the same object until it expires,
+		# so its index only needs to be built once
+		indexedList, index = self.courseIndex
+		if indexedList is not courseList:
+			index = self._BuildCourseIndex(courseList)
+			self.courseIndex = (courseList, index)
+		return index
+
+	def _FindCoursePayload(
+		self,
+		courseList: dict,
+		courseID: Union[int, None]=None,
+		courseCode: Union[str, None]=None,
+		titleKeyword: Union[str, None]=None,
+	) -> dict:
+		if (
+			courseID is not None and
+			courseCode is not None and
+			titleKeyword is not None
+		):
+			raise ValueError(
+				'Only one of the search parameters can be specified'
+			)
+
+		payload = None
+		if courseID is not None:
+			matches = self._GetCourseIndex(courseList)['id'].get(courseID, [])
+			if len(matches) > 1:
+				raise ValueError('Course ID not unique')
+			payload = matches[0] if len(matches) > 0 else None
+
+		elif courseCode is not None:
+			matches = self._GetCourseIndex(courseList)['code'].get(courseCode, [])
+			if len(matches) > 1:
+				raise ValueError('Course code not unique')
+			payload = matches[0] if len(matches) > 0 else None
+
+		elif titleKeyword is not None:
+			for course in courseList['items']['zybooks']:
+				if titleKeyword in course['title']:
+					if payload is not None:
+						raise ValueError('Title keyword not unique')
+					payload = course
+
+		if payload is None:
+			raise ValueError('Course not found')
+
+		return payload
+
+	def _FindCoursePayloads(
+		self,
+		courseList: dict,
+		courseIDs: Union[List[int], None]=None,
+		courseCodes: Union[List[str], None]=None,
+		titlePattern: Union[str, None]=None,
+	) -> List[dict]:
+		numParams = sum(
+			param is not None
+			for param in (courseIDs, courseCodes, titlePattern)
+		)
+		if numParams != 1:
+			raise ValueError(
+				'Exactly one of the search parameters must be specified'
+			)
+
+		payloads = []
+		if titlePattern is not None:
+			pattern = re.compile(titlePattern)
+			for course in courseList['items']['zybooks']:
+				if pattern.search(course['title']) is not None:
+					payloads.append(course)
+			return payloads
+
+		if courseIDs is not None:
+			index = self._GetCourseIndex(courseList)['id']
+			keys = courseIDs
+		else:
+			index = self._GetCourseIndex(courseList)['code']
+			keys = courseCodes
+
+		missing = [ key for key in keys if key not in index ]
+		if len(missing) > 0:
+			raise ValueError(f'Courses not found: {missing}')
+		notUnique = [ key for key in keys if len(index[key]) > 1 ]
+		if len(notUnique) > 0:
+			raise ValueError(f'Courses not unique: {notUnique}')
+
+		return [ index[key][0] for key in keys ]
+
+
+class Dashboard(DashboardBase):
+
 	def __str__(self) -> str:
 		return f'Dashboard(uid={self.uid})'
 
 	def GetUserInfo(self) -> dict:
 		path = f'/v1/user/{self.uid}'
-		url = f'https://{self.host.GetHost()}{path}'
+		url = f'{self.host.GetBaseUrl()}{path}'
 
 		headers = {}
 
 		self.auth.AddAuth(headers)
 
-		response = self.host.session.get(url, headers=headers)
-
-		return response.json()
+		return self.host.GetJson(url, headers=headers, cacheEndpoint='userInfo')
 
 	def GetCourseList(self) -> dict:
 		path = f'/v1/user/{self.uid}/items'
-		url = f'https://{self.host.GetHost()}{path}'
+		url = f'{self.host.GetBaseUrl()}{path}'
 
 		headers = {}
 
 		self.auth.AddAuth(headers)
 
-		response = self.host.session.get(url, headers=headers)
-
-		return response.json()
+		return self.host.GetJson(
+			url,
+			headers=headers,
+			cacheEndpoint='courseList',
+		)
 
 	def OpenCourse(
 		self,
@@ -56,43 +173,101 @@ class Dashboard(object):
 		courseCode: Union[str, None]=None,
 		titleKeyword: Union[str, None]=None,
 	) -> Course:
-		if (
-			courseID is not None and
-			courseCode is not None and
-			titleKeyword is not None
-		):
-			raise ValueError(
-				'Only one of the search parameters can be specified'
-			)
-
 		courseList = self.host.CheckRespJsonSuccess(self.GetCourseList())
 
-		payload = None
-		for course in courseList['items']['zybooks']:
-			if courseID is not None:
-				if course['zybook_id'] == courseID:
-					if payload is not None:
-						raise ValueError('Course ID not unique')
-					payload = course
+		payload = self._FindCoursePayload(
+			courseList=courseList,
+			courseID=courseID,
+			courseCode=courseCode,
+			titleKeyword=titleKeyword,
+		)
 
-			elif courseCode is not None:
-				if course['zybook_code'] == courseCode:
-					if payload is not None:
-						raise ValueError('Course code not unique')
-					payload = course
+		return Course(
+			host=self.host,
+			auth=self.auth,
+			dashboard=self,
+			payload=payload
+		)
 
-			elif titleKeyword is not None:
-				if titleKeyword in course['title']:
-					if payload is not None:
-						raise ValueError('Title keyword not unique')
-					payload = course
+	def OpenCourses(
+		self,
+		courseIDs: Union[List[int], None]=None,
+		courseCodes: Union[List[str], None]=None,
+		titlePattern: Union[str, None]=None,
+	) -> List[Course]:
+		'''
+		Open many courses, by a list of IDs, a list of codes, or a regular
+		expression searched in the titles, with a single fetch of the
+		course list.
+		'''
+		courseList = self.host.CheckRespJsonSuccess(self.GetCourseList())
 
-		if payload is None:
-			raise ValueError('Course not found')
-		else:
-			return Course(
+		payloads = self._FindCoursePayloads(
+			courseList=courseList,
+			courseIDs=courseIDs,
+			courseCodes=courseCodes,
+			titlePattern=titlePattern,
+		)
+
+		return [
+			Course(
 				host=self.host,
 				auth=self.auth,
 				dashboard=self,
 				payload=payload
 			)
+			for payload in payloads
+		]
+
+	def ExportCourses(
+		self,
+		courses: List[Course],
+		export: Callable[[Course], Any],
+		maxWorkers: int=4,
+		startsPerSecond: Union[float, None]=None,
+	) -> Iterator[Tuple[Course, concurrent.futures.Future]]:
+		'''
+		Run `export` (e.g., a function calling `Course.ExportGradebook`) on
+		every course, with at most `maxWorkers` courses in progress and at
+		most `startsPerSecond` courses started per second (no limit if None).
+		Yields (course, future) as each course finishes, so the result, or
+		the error, of one course doesn't wait for the others.
+		Courses that haven't started are cancelled if the iteration stops
+		early.
+		'''
+		# check the arguments here, rather than at the first iteration
+		if maxWorkers < 1:
+			raise ValueError('maxWorkers must be at least 1')
+		if (startsPerSecond is not None) and (startsPerSecond <= 0.0):
+			raise ValueError('startsPerSecond must be positive')
+
+		return self._ExportCourses(courses, export, maxWorkers, startsPerSecond)
+
+	def _ExportCourses(
+		self,
+		courses: List[Course],
+		export: Callable[[Course], Any],
+		maxWorkers: int,
+		startsPerSecond: Union[float, None],
+	) -> Iterator[Tuple[Course, concurrent.futures.Future]]:
+		startLock = threading.Lock()
+		nextStart = [ time.monotonic() ]
+
+		def _Export(course: Course) -> Any:
+			if startsPerSecond is not None:
+				with startLock:
+					startTime = max(nextStart[0], time.monotonic())
+					nextStart[0] = startTime + (1.0 / startsPerSecond)
+				time.sleep(max(startTime - time.monotonic(), 0.0))
+			return export(course)
+
+		executor = concurrent.futures.ThreadPoolExecutor(max_workers=maxWorkers)
+		try:
+			futures = {
+				executor.submit(contextvars.copy_context().run, _Export, course): course
+				for course in courses
+			}
+			for future in concurrent.futures.as_completed(futures):
+				yield futures[future], future
+		finally:
+			executor.shutdown(wait=True, cancel_futures=True)
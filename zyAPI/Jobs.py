@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+from __future__ import annotations
+
+import concurrent.futures
+import datetime
+import importlib.util
+import json
+import logging
+import os
+import time
+
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+try:
+	import yaml
+except ImportError:
+	yaml = None
+
+try:
+	import zoneinfo
+except ImportError:
+	from backports import zoneinfo
+
+from .Auth.Token import Token
+from .Due.Datetime import Datetime
+from .Due.Due import Due
+from .Due.DueWithExtensions import DueWithExtensions
+from .Due.DueWithVectorPolicy import DueWithVectorPolicy
+from .ExportPoller import PollPolicy
+from .Host import Host
+from .Instrumentation import Instrumentation, MetricsCollector
+from .Interfaces.Assignment import Assignment
+from .Interfaces.Course import Course
+from .Interfaces.Dashboard import Dashboard
+from .Journal import Journal
+from .MetadataCache import MetadataCache
+from .RateLimiter import RateLimiter
+from .ReportCache import ReportCache
+from ._LazyModule import LazyModule
+
+
+pandas = LazyModule('pandas')
+
+
+OUTPUT_FORMATS = ('csv', 'parquet')
+
+
+def ParseDatetime(
+	value: Union[str, datetime.date, datetime.datetime],
+	tz: str,
+) -> Datetime:
+	'''
+	Parse an ISO 8601 date and time, e.g., `2024-03-08 23:59:59`, in the
+	time zone `tz` unless the value has its own offset.
+	The value may also be a `datetime` or a `date` (at midnight), e.g., an
+	unquoted date in a YAML job file.
+	'''
+	if isinstance(value, datetime.datetime):
+		dt = value
+	elif isinstance(value, datetime.date):
+		dt = datetime.datetime.combine(value, datetime.time())
+	else:
+		try:
+			dt = datetime.datetime.fromisoformat(value)
+		except (TypeError, ValueError):
+			raise ValueError(f'Invalid date and time: {value!r}')
+	if dt.tzinfo is None:
+		dt = dt.replace(tzinfo=zoneinfo.ZoneInfo(tz))
+	return Datetime(datetime=dt)
+
+
+def BuildPolicyDue(date: Datetime, policy: Union[dict, None]) -> Due:
+	'''
+	A `DueWithVectorPolicy` from the `policy` of a job, whose keys are the
+	parameters of `DueWithVectorPolicy`, e.g.,
+	`{"multiplier": 0.5, "cap": 90}`.
+	'''
+	policy = {} if policy is None else dict(policy)
+	known = ('multiplier', 'piecewise', 'steps', 'floor', 'cap')
+	unknown = sorted(set(policy.keys()) - set(known))
+	if len(unknown) > 0:
+		raise ValueError(f'Unknown policy parameters: {unknown}')
+	for key in ('piecewise', 'steps'):
+		if policy.get(key) is not None:
+			policy[key] = tuple(policy[key])
+	return DueWithVectorPolicy(dueDate=date, **policy)
+
+
+def _CheckOutputFormat(outputFormat: str) -> None:
+	if outputFormat not in OUTPUT_FORMATS:
+		raise ValueError(f'Unsupported output format: {outputFormat}')
+	if (
+		(outputFormat == 'parquet') and
+		(importlib.util.find_spec('pyarrow') is None) and
+		(importlib.util.find_spec('fastparquet') is None)
+	):
+		raise RuntimeError(
+			'Writing parquet requires pyarrow or fastparquet to be installed'
+		)
+
+
+class Job(object):
+	'''
+	The export of one assignment, with its dues applied, to one output file.
+	In a job file, a job looks like:
+	```
+	{
+		"name": "lab1",
+		"course": "UCSCCSE101Spring2024",
+		"assignment": 1001,
+		"due": "2024-03-08 23:59:59",
+		"policy": {"cap": 100},
+		"extensions": {"student@ucsc.edu": "2024-03-10 23:59:59"},
+		"lateDues": [
+			{"due": "2024-03-10 23:59:59", "policy": {"multiplier": 0.5}}
+		]
+	}
+	```
+	The course is either a course code (`course`) or ID (`courseId`).
+	Keys missing from a job are taken from the `defaults` of the job file.
+	'''
+
+	def __init__(
+		self,
+		name: str,
+		assignmentId: int,
+		dues: List[Due],
+		courseCode: Union[str, None]=None,
+		courseId: Union[int, None]=None,
+		includeTimeSpent: bool=False,
+		output: Union[str, None]=None,
+		outputFormat: str='csv',
+	) -> None:
+		super(Job, self).__init__()
+
+		if (courseCode is None) == (courseId is None):
+			raise ValueError(
+				f'Job {name}: exactly one of course and courseId must be specified'
+			)
+		if len(dues) == 0:
+			raise ValueError(f'Job {name}: no dues specified')
+		_CheckOutputFormat(outputFormat)
+
+		self.name = name
+		self.assignmentId = assignmentId
+		self.dues = dues
+		self.courseCode = courseCode
+		self.courseId = courseId
+		self.includeTimeSpent = includeTimeSpent
+		self.output = f'{name}.{outputFormat}' if output is None else output
+		self.outputFormat = outputFormat
+
+	def __str__(self) -> str:
+		course = self.courseCode if self.courseId is None else self.courseId
+		return (
+			f'{self.__class__.__name__}' +
+			f'(name={self.name}, course={course}, ' +
+			f'assignment={self.assignmentId}, numDues={len(self.dues)})'
+		)
+
+	def GetCourseKey(self) -> Tuple[str, Union[str, int]]:
+		if self.courseId is None:
+			return ('code', self.courseCode)
+		return ('id', self.courseId)
+
+	@classmethod
+	def FromDict(cls, spec: dict, defaults: dict, index: int) -> 'Job':
+		spec = { **defaults, **spec }
+		name = str(spec.get('name', f'job{index}'))
+
+		known = (
+			'name', 'course', 'courseId', 'assignment', 'due', 'timezone',
+			'policy', 'extensions', 'lateDues', 'includeTimeSpent', 'output',
+			'format',
+		)
+		unknown = sorted(set(spec.keys()) - set(known))
+		if len(unknown) > 0:
+			raise ValueError(f'Job {name}: unknown keys {unknown}')
+		for key in ('assignment', 'due'):
+			if key not in spec:
+				raise ValueError(f'Job {name}: {key} is required')
+
+		try:
+			tz = spec.get('timezone', 'UTC')
+			dueDate = ParseDatetime(spec['due'], tz)
+			due = BuildPolicyDue(dueDate, spec.get('policy'))
+			extensions = spec.get('extensions') or {}
+			if len(extensions) > 0:
+				due = DueWithExtensions(
+					base=due,
+					extensions={
+						email: ParseDatetime(date, tz)
+						for email, date in extensions.items()
+					},
+				)
+			dues = [ due ]
+			for lateDue in spec.get('lateDues') or []:
+				if (not isinstance(lateDue, dict)) or ('due' not in lateDue):
+					raise ValueError('each of lateDues must have a due')
+				dues.append(
+					BuildPolicyDue(
+						ParseDatetime(lateDue['due'], tz),
+						lateDue.get('policy'),
+					)
+				)
+
+			return cls(
+				name=name,
+				assignmentId=int(spec['assignment']),
+				dues=dues,
+				courseCode=spec.get('course'),
+				courseId=spec.get('courseId'),
+				includeTimeSpent=bool(spec.get('includeTimeSpent', False)),
+				output=spec.get('output'),
+				outputFormat=spec.get('format', 'csv'),
+			)
+		except (KeyError, TypeError, AttributeError) as e:
+			# e.g., a policy parameter of the wrong type, or a time zone
+			# that doesn't exist, reported as an error of the job file
+			raise ValueError(f'Job {name}: invalid job: {e!r}') from e
+		except ValueError as e:
+			if str(e).startswith(f'Job {name}:'):
+				raise
+			raise ValueError(f'Job {name}: {e}') from e
+
+
+class JobResult(object):
+
+	def __init__(
+		self,
+		job: Job,
+		path: Union[str, None],
+		numRows: int,
+		duration: float,
+		error: Union[BaseException, None]=None,
+	) -> None:
+		super(JobResult, self).__init__()
+
+		self.job = job
+		self.path = path
+		self.numRows = numRows
+		self.duration = duration
+		self.error = error
+
+	def __str__(self) -> str:
+		if self.error is not None:
+			return f'{self.job.name}: FAILED after {self.duration:.2f}s: {self.error}'
+		return (
+			f'{self.job.name}: {self.numRows} rows in {self.duration:.2f}s ' +
+			f'-> {self.path}'
+		)
+
+	def IsSuccess(self) -> bool:
+		return self.error is None
+
+	def ToDict(self) -> dict:
+		return {
+			'name': self.job.name,
+			'path': self.path,
+			'numRows': self.numRows,
+			'duration': self.duration,
+			'error': None if self.error is None else str(self.error),
+		}
+
+
+class JobFile(object):
+	'''
+	A declarative job file, in JSON, or in YAML if PyYAML is installed.
+	Besides `jobs` (see `Job`), it may contain:
+
+	- `host`, `scheme`: the zyBooks API server;
+	- `token` or `tokenFile`, and `uid`: the credentials of the user;
+	- `reportCache`, `metadataCache`, `journal`: the paths of the caches
+	  and the journal of `Host`, all optional;
+	- `rateLimiter`: the parameters of the `RateLimiter` of `Host`, e.g.,
+	  `{"lockDir": "ratelimits"}` (relative to the job file), or `{}` for
+	  the defaults; requests are not rate limited if it's missing;
+	- `maxWorkers`: the number of jobs exported concurrently;
+	- `sectionWorkers`: the number of sections exported concurrently
+	  within each job;
+	- `outputDir`: where the outputs are written, relative to the job file;
+	- `defaults`: the default keys of every job, e.g., `timezone`.
+
+	If `requireJobs` is False, `jobs` may be empty, e.g., in the
+	configuration of `Service.ExportService`.
+	'''
+
+	def __init__(
+		self,
+		spec: dict,
+		baseDir: str='.',
+		requireJobs: bool=True,
+	) -> None:
+		super(JobFile, self).__init__()
+
+		self.spec = spec
+		self.baseDir = os.path.abspath(baseDir)
+
+		if ('token' not in spec) and ('tokenFile' not in spec):
+			raise ValueError('Either token or tokenFile must be specified')
+		if 'uid' not in spec:
+			raise ValueError('uid is required')
+
+		self.host = spec.get('host', 'zyserver.zybooks.com')
+		self.scheme = spec.get('scheme', 'https')
+		self.uid = int(spec['uid'])
+		self.maxWorkers = int(spec.get('maxWorkers', 4))
+		self.sectionWorkers = int(spec.get('sectionWorkers', 1))
+		self.outputDir = self.ResolvePath(spec.get('outputDir', '.'))
+
+		self.rateLimiter = None
+		if spec.get('rateLimiter') is not None:
+			params = dict(spec['rateLimiter'])
+			if params.get('lockDir') is not None:
+				params['lockDir'] = self.ResolvePath(params['lockDir'])
+			try:
+				self.rateLimiter = RateLimiter(**params)
+			except TypeError as e:
+				raise ValueError(f'Invalid rateLimiter: {e}') from e
+
+		self.pollPolicy = None
+		if spec.get('pollPolicy') is not None:
+			try:
+				self.pollPolicy = PollPolicy(**spec['pollPolicy'])
+			except TypeError as e:
+				raise ValueError(f'Invalid pollPolicy: {e}') from e
+
+		self.defaults = spec.get('defaults') or {}
+		self.jobs = [
+			Job.FromDict(jobSpec, self.defaults, i)
+			for i, jobSpec in enumerate(spec.get('jobs') or [])
+		]
+		if requireJobs and (len(self.jobs) == 0):
+			raise ValueError('No jobs specified')
+		names = [ job.name for job in self.jobs ]
+		duplicates = sorted(set(n for n in names if names.count(n) > 1))
+		if len(duplicates) > 0:
+			raise ValueError(f'Duplicate job names: {duplicates}')
+
+	def __str__(self) -> str:
+		return (
+			f'{self.__class__.__name__}' +
+			f'(host={self.host}, numJobs={len(self.jobs)})'
+		)
+
+	@classmethod
+	def FromFile(cls, path: str, requireJobs: bool=True) -> 'JobFile':
+		with open(path, 'r') as f:
+			if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+				if yaml is None:
+					raise RuntimeError(
+						'Reading YAML job files requires PyYAML to be installed'
+					)
+				spec = yaml.safe_load(f)
+			else:
+				spec = json.load(f)
+		if not isinstance(spec, dict):
+			raise ValueError(f'Invalid job file: {path}')
+		return cls(
+			spec,
+			baseDir=os.path.dirname(os.path.abspath(path)),
+			requireJobs=requireJobs,
+		)
+
+	def ResolvePath(self, path: str) -> str:
+		return os.path.join(self.baseDir, os.path.expanduser(path))
+
+	def CreateHost(
+		self,
+		instrumentation: Union[Instrumentation, None]=None,
+	) -> Host:
+		reportCache = None
+		if self.spec.get('reportCache') is not None:
+			reportCache = ReportCache(self.ResolvePath(self.spec['reportCache']))
+		metadataCache = None
+		if self.spec.get('metadataCache') is not None:
+			metadataCache = MetadataCache(
+				persistPath=self.ResolvePath(self.spec['metadataCache'])
+			)
+		journal = None
+		if self.spec.get('journal') is not None:
+			journal = Journal(self.ResolvePath(self.spec['journal']))
+		return Host(
+			self.host,
+			scheme=self.scheme,
+			pollPolicy=self.pollPolicy,
+			reportCache=reportCache,
+			metadataCache=metadataCache,
+			rateLimiter=self.rateLimiter,
+			journal=journal,
+			instrumentation=instrumentation,
+		)
+
+	def CreateDashboard(self, host: Host) -> Dashboard:
+		if self.spec.get('tokenFile') is not None:
+			auth = Token.FromFile(self.ResolvePath(self.spec['tokenFile']))
+		else:
+			auth = Token(self.spec['token'])
+		return Dashboard(host=host, auth=auth, uid=self.uid)
+
+
+class JobRunner(object):
+	'''
+	Run the jobs of a job file in one process, with up to `maxWorkers` jobs
+	in progress, all sharing one `Host` (hence its sessions, caches and
+	rate limiter), and each course and assignment opened once.
+	'''
+
+	# the sessions of `Host.GetStats`
+	SESSIONS = ('session', 'exportSession', 'submitSession')
+
+	def __init__(
+		self,
+		jobFile: JobFile,
+		maxWorkers: Union[int, None]=None,
+		instrumentation: Union[Instrumentation, None]=None,
+		onResult: Union[Callable[[JobResult, int, int], None], None]=None,
+	) -> None:
+		super(JobRunner, self).__init__()
+
+		self.logger = logging.getLogger(f'{__name__}.{self.__class__.__name__}')
+
+		self.jobFile = jobFile
+		self.maxWorkers = jobFile.maxWorkers if maxWorkers is None else maxWorkers
+		if self.maxWorkers < 1:
+			raise ValueError('maxWorkers must be at least 1')
+		self.onResult = onResult
+
+		self.host = jobFile.CreateHost(instrumentation=instrumentation)
+		self.dashboard = jobFile.CreateDashboard(self.host)
+
+		# (course key, assignment ID) -> assignment
+		self.assignments: Dict[Tuple[Tuple[str, Any], int], Assignment] = {}
+
+	def _OpenCourses(self) -> Dict[Tuple[str, Any], Course]:
+		jobs = self.jobFile.jobs
+		courseCodes = sorted(set(
+			job.courseCode for job in jobs if job.courseCode is not None
+		))
+		courseIds = sorted(set(
+			job.courseId for job in jobs if job.courseId is not None
+		))
+
+		courses = {}
+		if len(courseCodes) > 0:
+			opened = self.dashboard.OpenCourses(courseCodes=courseCodes)
+			courses.update(zip([ ('code', c) for c in courseCodes ], opened))
+		if len(courseIds) > 0:
+			opened = self.dashboard.OpenCourses(courseIDs=courseIds)
+			courses.update(zip([ ('id', c) for c in courseIds ], opened))
+		return courses
+
+	def OpenAssignments(self) -> None:
+		'''
+		Open every course and assignment of the jobs, with one fetch of the
+		course list, and one fetch of the assignment list per course.
+		'''
+		courses = self._OpenCourses()
+
+		asgIds = {}
+		for job in self.jobFile.jobs:
+			asgIds.setdefault(job.GetCourseKey(), set()).add(job.assignmentId)
+		for courseKey, ids in asgIds.items():
+			ids = sorted(ids)
+			opened = courses[courseKey].OpenAssignments(assignmentIDs=ids)
+			for asgId, assignment in zip(ids, opened):
+				self.assignments[(courseKey, asgId)] = assignment
+
+	def _WriteOutput(self, job: Job, df: pandas.DataFrame) -> str:
+		path = os.path.join(self.jobFile.outputDir, job.output)
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		tmpPath = path + '.tmp'
+		# the index (primary_email) is what identifies each student
+		df = df.reset_index()
+		if job.outputFormat == 'parquet':
+			df.to_parquet(tmpPath, index=False)
+		else:
+			df.to_csv(tmpPath, index=False)
+		# readers never see a partially written output
+		os.replace(tmpPath, path)
+		return path
+
+	def RunJob(self, job: Job) -> JobResult:
+		start = time.perf_counter()
+		try:
+			assignment = self.assignments[(job.GetCourseKey(), job.assignmentId)]
+			with self.host.instrumentation.Span('job.run', job=job.name):
+				_, df = assignment.ExportReportWithDues(
+					dues=job.dues,
+					includeTimeSpent=job.includeTimeSpent,
+					maxWorkers=self.jobFile.sectionWorkers,
+				)
+				path = self._WriteOutput(job, df)
+		except Exception as e:
+			self.logger.exception(f'Job {job.name} failed')
+			return JobResult(
+				job=job,
+				path=None,
+				numRows=0,
+				duration=time.perf_counter() - start,
+				error=e,
+			)
+		return JobResult(
+			job=job,
+			path=path,
+			numRows=len(df),
+			duration=time.perf_counter() - start,
+		)
+
+	def Run(self) -> List[JobResult]:
+		'''
+		Run every job, and return their results in the order of the job
+		file; a failed job doesn't stop the others.
+		'''
+		self.OpenAssignments()
+
+		jobs = self.jobFile.jobs
+		results: List[Union[JobResult, None]] = [ None ] * len(jobs)
+		numDone = 0
+		with concurrent.futures.ThreadPoolExecutor(
+			max_workers=self.maxWorkers
+		) as executor:
+			futures = {
+				executor.submit(self.RunJob, job): i
+				for i, job in enumerate(jobs)
+			}
+			for future in concurrent.futures.as_completed(futures):
+				result = future.result()
+				results[futures[future]] = result
+				numDone += 1
+				if self.onResult is not None:
+					self.onResult(result, numDone, len(jobs))
+
+		return results
+
+	def GetSummary(self, results: List[JobResult], wallTime: float) -> dict:
+		numOk = sum(result.IsSuccess() for result in results)
+		numRows = sum(result.numRows for result in results)
+		stats = self.host.GetStats()
+		return {
+			'jobs': len(results),
+			'succeeded': numOk,
+			'failed': len(results) - numOk,
+			'rows': numRows,
+			'wallTime': wallTime,
+			'jobsPerSecond': len(results) / wallTime if wallTime > 0 else 0.0,
+			'rowsPerSecond': numRows / wallTime if wallTime > 0 else 0.0,
+			'requests': sum(
+				stats[session]['requests'] for session in self.SESSIONS
+			),
+			'retries': sum(
+				stats[session]['retries'] for session in self.SESSIONS
+			),
+			'results': [ result.ToDict() for result in results ],
+		}
+
+	@classmethod
+	def FormatSummary(cls, summary: dict) -> str:
+		return (
+			f'{summary["succeeded"]}/{summary["jobs"]} jobs succeeded, ' +
+			f'{summary["rows"]} rows in {summary["wallTime"]:.2f}s ' +
+			f'({summary["jobsPerSecond"]:.2f} jobs/s, ' +
+			f'{summary["rowsPerSecond"]:.1f} rows/s), ' +
+			f'{summary["requests"]} HTTP requests, ' +
+			f'{summary["retries"]} retries'
+		)
+
+
+def RunJobFile(
+	path: str,
+	maxWorkers: Union[int, None]=None,
+	outputDir: Union[str, None]=None,
+	outputFormat: Union[str, None]=None,
+	metrics: Union[MetricsCollector, None]=None,
+	onResult: Union[Callable[[JobResult, int, int], None], None]=None,
+) -> Tuple[List[JobResult], dict]:
+	'''
+	Load and run a job file; `outputDir` and `outputFormat`, if given,
+	override those of the job file.
+	Returns the result of each job, and the summary of the run.
+	'''
+	jobFile = JobFile.FromFile(path)
+	if outputDir is not None:
+		jobFile.outputDir = os.path.abspath(outputDir)
+	if outputFormat is not None:
+		_CheckOutputFormat(outputFormat)
+		for job in jobFile.jobs:
+			if job.outputFormat != outputFormat:
+				job.output = os.path.splitext(job.output)[0] + f'.{outputFormat}'
+				job.outputFormat = outputFormat
+
+	instrumentation = Instrumentation([ metrics ] if metrics is not None else [])
+	runner = JobRunner(
+		jobFile,
+		maxWorkers=maxWorkers,
+		instrumentation=instrumentation,
+		onResult=onResult,
+	)
+
+	start = time.perf_counter()
+	results = runner.Run()
+	wallTime = time.perf_counter() - start
+
+	return results, runner.GetSummary(results, wallTime)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from typing import List, Union
+
+
+class Journal(object):
+	'''
+	A SQLite journal of the report exports of a grading run, so that a run
+	restarted after a crash can pick up where it left off.
+	Each export is recorded when it is submitted, with its status
+	`location`, and again once its CSV is downloaded into `csvDir`.
+	On restart, submitted exports are polled again instead of being
+	re-submitted, and downloaded CSVs are read from disk.
+
+	A journal belongs to a single run; reports of dates in the future keep
+	changing, so the journal of an old run shouldn't be reused.
+	'''
+
+	SUBMITTED = 'SUBMITTED'
+	DOWNLOADED = 'DOWNLOADED'
+
+	def __init__(
+		self,
+		path: str,
+		csvDir: Union[str, None]=None,
+	) -> None:
+		super(Journal, self).__init__()
+
+		self.logger = logging.getLogger(f'{__name__}.{self.__class__.__name__}')
+
+		self.path = os.path.abspath(path)
+		if csvDir is None:
+			csvDir = os.path.splitext(self.path)[0] + '_csv'
+		self.csvDir = os.path.abspath(csvDir)
+		os.makedirs(self.csvDir, exist_ok=True)
+
+		self.lock = threading.Lock()
+		self.conn = sqlite3.connect(
+			self.path,
+			check_same_thread=False,
+			# autocommit; each statement is its own transaction
+			isolation_level=None,
+		)
+		self.conn.row_factory = sqlite3.Row
+		with self.lock:
+			self.conn.execute('PRAGMA journal_mode=WAL')
+			self.conn.execute(
+				'CREATE TABLE IF NOT EXISTS exports (' +
+				'key TEXT PRIMARY KEY, ' +
+				'description TEXT NOT NULL, ' +
+				'state TEXT NOT NULL, ' +
+				'location TEXT, ' +
+				'filename TEXT, ' +
+				'csv_path TEXT, ' +
+				'created REAL NOT NULL, ' +
+				'updated REAL NOT NULL' +
+				')'
+			)
+
+	def __str__(self) -> str:
+		return f'{self.__class__.__name__}(path={self.path}, csvDir={self.csvDir})'
+
+	def Close(self) -> None:
+		with self.lock:
+			self.conn.close()
+
+	def GetCsvPath(self, key: str) -> str:
+		return os.path.join(self.csvDir, f'{key}.csv')
+
+	def GetEntry(self, key: str) -> Union[dict, None]:
+		with self.lock:
+			row = self.conn.execute(
+				'SELECT * FROM exports WHERE key = ?',
+				(key, ),
+			).fetchone()
+		return None if row is None else dict(row)
+
+	def GetDownloaded(self, key: str) -> Union[dict, None]:
+		'''
+		Returns the entry of an export whose CSV has been downloaded and is
+		still on disk, or None.
+		'''
+		entry = self.GetEntry(key)
+		if (
+			(entry is None) or
+			(entry['state'] != self.DOWNLOADED) or
+			(not os.path.isfile(entry['csv_path']))
+		):
+			return None
+		return entry
+
+	def GetPendingLocation(self, key: str) -> Union[str, None]:
+		'''
+		Returns the status location of an export that was submitted but not
+		downloaded, or None.
+		'''
+		entry = self.GetEntry(key)
+		if (entry is None) or (entry['state'] != self.SUBMITTED):
+			return None
+		return entry['location']
+
+	def RecordSubmitted(self, key: str, description: str, location: str) -> None:
+		now = time.time()
+		with self.lock:
+			self.conn.execute(
+				'INSERT OR REPLACE INTO exports ' +
+				'(key, description, state, location, created, updated) ' +
+				'VALUES (?, ?, ?, ?, ?, ?)',
+				(key, description, self.SUBMITTED, location, now, now),
+			)
+
+	def RecordDownloaded(self, key: str, filename: str, csvPath: str) -> None:
+		with self.lock:
+			self.conn.execute(
+				'UPDATE exports ' +
+				'SET state = ?, filename = ?, csv_path = ?, updated = ? ' +
+				'WHERE key = ?',
+				(self.DOWNLOADED, filename, csvPath, time.time(), key),
+			)
+
+	def Forget(self, key: str) -> None:
+		entry = self.GetEntry(key)
+		with self.lock:
+			self.conn.execute('DELETE FROM exports WHERE key = ?', (key, ))
+		if (entry is not None) and (entry['csv_path'] is not None):
+			try:
+				os.remove(entry['csv_path'])
+			except FileNotFoundError:
+				pass
+
+	def ListEntries(self, state: Union[str, None]=None) -> List[dict]:
+		with self.lock:
+			if state is None:
+				rows = self.conn.execute(
+					'SELECT * FROM exports ORDER BY created'
+				).fetchall()
+			else:
+				rows = self.conn.execute(
+					'SELECT * FROM exports WHERE state = ? ORDER BY created',
+					(state, ),
+				).fetchall()
+		return [ dict(row) for row in rows ]
+
+	def GetStats(self) -> dict:
+		with self.lock:
+			rows = self.conn.execute(
+				'SELECT state, COUNT(*) FROM exports GROUP BY state'
+			).fetchall()
+		return { state: count for state, count in rows }
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from typing import Mapping, Union
+
+
+class MetadataCache(object):
+	'''
+	An in-memory cache of metadata API responses (user info, course lists,
+	assignments and rosters), with a TTL per endpoint.
+	Expired entries are kept, so they can be revalidated with
+	`If-None-Match`/`If-Modified-Since` when the server sent an `ETag` or a
+	`Last-Modified` header.
+	If `persistPath` is given, the cache is loaded from and saved to that
+	JSON file; changes are saved at most once per `saveDelay` seconds (on
+	every change if it's 0), and on `Flush` or exit.
+	'''
+
+	DEFAULT_TTLS = {
+		'userInfo': 3600.0,
+		'courseList': 600.0,
+		'assignments': 300.0,
+		'roster': 300.0,
+	}
+
+	def __init__(
+		self,
+		ttls: Union[Mapping[str, float], None]=None,
+		persistPath: Union[str, None]=None,
+		saveDelay: float=1.0,
+	) -> None:
+		super(MetadataCache, self).__init__()
+
+		self.logger = logging.getLogger(f'{__name__}.{self.__class__.__name__}')
+
+		self.ttls = dict(self.DEFAULT_TTLS)
+		if ttls is not None:
+			self.ttls.update(ttls)
+		self.persistPath = persistPath
+		self.saveDelay = saveDelay
+
+		self.lock = threading.Lock()
+		# serializes the writes of the file, which happen outside self.lock
+		self.saveLock = threading.Lock()
+		self.saveTimer = None
+		self.isDirty = False
+		# key -> {
+		#   'endpoint': str, 'value': dict, 'expires': float,
+		#   'etag': str|None, 'lastModified': str|None
+		# }
+		self.entries = {}
+
+		if self.persistPath is not None:
+			self._Load()
+			atexit.register(self.Flush)
+
+	def __str__(self) -> str:
+		return f'MetadataCache(ttls={self.ttls}, persistPath={self.persistPath})'
+
+	@classmethod
+	def MakeKey(
+		cls,
+		endpoint: str,
+		url: str,
+		headers: dict,
+		params: Union[dict, None]=None,
+	) -> str:
+		# responses depend on who is asking, but the credential itself should
+		# never end up in a persisted cache
+		authStr = headers.get('Authorization', '')
+		authDigest = hashlib.sha256(authStr.encode('utf-8')).hexdigest()
+		return json.dumps(
+			[endpoint, url, params, authDigest],
+			sort_keys=True,
+			separators=(',', ':'),
+		)
+
+	def GetTtl(self, endpoint: str) -> float:
+		return self.ttls.get(endpoint, 0.0)
+
+	def GetFresh(self, key: str) -> Union[dict, None]:
+		with self.lock:
+			entry = self.entries.get(key, None)
+			if (entry is None) or (entry['expires'] <= time.time()):
+				return None
+			return entry['value']
+
+	def GetRevalidationHeaders(self, key: str) -> dict:
+		headers = {}
+		with self.lock:
+			entry = self.entries.get(key, None)
+			if entry is None:
+				return headers
+			if entry['etag'] is not None:
+				headers['If-None-Match'] = entry['etag']
+			if entry['lastModified'] is not None:
+				headers['If-Modified-Since'] = entry['lastModified']
+		return headers
+
+	def Revalidated(self, key: str) -> Union[dict, None]:
+		'''
+		Called when the server answered 304 Not Modified;
+		renews the entry and returns the cached value, or None if the entry
+		has been invalidated in the meantime, i.e., it has to be fetched
+		again.
+		'''
+		with self.lock:
+			entry = self.entries.get(key, None)
+			if entry is None:
+				return None
+			entry['expires'] = time.time() + self.GetTtl(entry['endpoint'])
+			value = entry['value']
+			self.isDirty = True
+		self._ScheduleSave()
+		return value
+
+	def Store(
+		self,
+		endpoint: str,
+		key: str,
+		value: dict,
+		respHeaders: Mapping[str, str],
+	) -> None:
+		ttl = self.GetTtl(endpoint)
+		etag = respHeaders.get('ETag', None)
+		lastModified = respHeaders.get('Last-Modified', None)
+		if (ttl <= 0.0) and (etag is None) and (lastModified is None):
+			# nothing to gain from keeping it
+			return
+
+		with self.lock:
+			self.entries[key] = {
+				'endpoint': endpoint,
+				'value': value,
+				'expires': time.time() + ttl,
+				'etag': etag,
+				'lastModified': lastModified,
+			}
+			self.isDirty = True
+		self._ScheduleSave()
+
+	def Invalidate(self, endpoint: Union[str, None]=None) -> None:
+		'''
+		Drop all entries of the given endpoint, or all entries if endpoint
+		is None.
+		'''
+		with self.lock:
+			if endpoint is None:
+				self.entries.clear()
+			else:
+				self.entries = {
+					k: v for k, v in self.entries.items()
+					if v['endpoint'] != endpoint
+				}
+			self.isDirty = True
+		self._ScheduleSave()
+
+	def Flush(self) -> None:
+		'''
+		Save the pending changes to `persistPath` now.
+		'''
+		if self.persistPath is None:
+			return
+
+		with self.saveLock:
+			with self.lock:
+				if self.saveTimer is not None:
+					self.saveTimer.cancel()
+					self.saveTimer = None
+				if not self.isDirty:
+					return
+				self.isDirty = False
+				data = json.dumps(self.entries)
+			self._Save(data)
+
+	def _ScheduleSave(self) -> None:
+		if self.persistPath is None:
+			return
+
+		if self.saveDelay <= 0.0:
+			self.Flush()
+			return
+
+		with self.lock:
+			if self.saveTimer is not None:
+				# the changes are saved along with the pending ones
+				return
+			self.saveTimer = threading.Timer(self.saveDelay, self.Flush)
+			self.saveTimer.daemon = True
+			self.saveTimer.start()
+
+	def _Load(self) -> None:
+		try:
+			with open(self.persistPath, 'r') as f:
+				self.entries = json.load(f)
+		except FileNotFoundError:
+			self.entries = {}
+		except json.JSONDecodeError:
+			self.logger.warning(
+				f'Ignoring corrupted metadata cache file: {self.persistPath}'
+			)
+			self.entries = {}
+
+	def _Save(self, data: str) -> None:
+		dirPath = os.path.dirname(os.path.abspath(self.persistPath))
+		fd, tmpPath = tempfile.mkstemp(dir=dirPath, suffix='.tmp')
+		try:
+			with os.fdopen(fd, 'w') as f:
+				f.write(data)
+			os.replace(tmpPath, self.persistPath)
+		except BaseException:
+			os.remove(tmpPath)
+			raise
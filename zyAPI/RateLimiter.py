@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import email.utils
+import json
+import logging
+import os
+import threading
+import time
+
+from typing import Callable, Mapping, Union
+
+try:
+	import fcntl
+except ImportError:
+	fcntl = None
+
+
+class TokenBucket(object):
+	'''
+	A token bucket refilled at `rate` tokens per second, holding at most
+	`burst` tokens.
+	The rate adapts to throttling (AIMD), to find the highest rate the
+	server accepts: starting at `rate`, it grows by `increaseStep` per
+	successful request, up to `maxRate` if given, and is multiplied by
+	`decreaseFactor` (down to `minRate`) each time the server throttles a
+	request.
+	If `statePath` is given, the state of the bucket lives in that file,
+	guarded by an exclusive file lock, so that all processes using the same
+	file share the same budget; successes are only folded into the shared
+	rate on the next reservation, so they don't rewrite the file.
+	'''
+
+	def __init__(
+		self,
+		name: str,
+		rate: float,
+		burst: float,
+		minRate: float=0.1,
+		decreaseFactor: float=0.5,
+		increaseStep: float=0.05,
+		statePath: Union[str, None]=None,
+		maxRate: Union[float, None]=None,
+	) -> None:
+		super(TokenBucket, self).__init__()
+
+		if rate <= 0.0:
+			raise ValueError('rate must be positive')
+		if (maxRate is not None) and (maxRate < rate):
+			raise ValueError('maxRate must not be less than rate')
+		if burst < 1.0:
+			raise ValueError('burst must be at least 1.0')
+		if not (0.0 < decreaseFactor < 1.0):
+			raise ValueError('decreaseFactor must be in (0.0, 1.0)')
+		if (statePath is not None) and (fcntl is None):
+			raise RuntimeError('File locks are not supported on this platform')
+
+		self.logger = logging.getLogger(f'{__name__}.{self.__class__.__name__}')
+
+		self.name = name
+		self.initialRate = rate
+		self.maxRate = maxRate
+		self.burst = burst
+		self.minRate = min(minRate, rate)
+		self.decreaseFactor = decreaseFactor
+		self.increaseStep = increaseStep
+		self.statePath = statePath
+
+		self.lock = threading.Lock()
+		self.state = self._InitState()
+		# rate increase of the successes not yet applied to the state
+		self.pendingIncrease = 0.0
+
+		self.numAcquired = 0
+		self.numThrottled = 0
+		self.totalWait = 0.0
+
+	def __str__(self) -> str:
+		return (
+			f'{self.__class__.__name__}' +
+			f'(name={self.name}, rate={self.initialRate}, ' +
+			f'maxRate={self.maxRate}, burst={self.burst})'
+		)
+
+	def _Now(self) -> float:
+		# monotonic time isn't comparable across processes
+		return time.monotonic() if self.statePath is None else time.time()
+
+	def _InitState(self) -> dict:
+		return {
+			'tokens': self.burst,
+			'last': self._Now(),
+			'rate': self.initialRate,
+			'blockedUntil': 0.0,
+		}
+
+	def _Update(self, update: Callable[[dict, float], float]) -> float:
+		'''
+		Run `update(state, now)` atomically, and return its result.
+		The state file is only rewritten if the state has changed.
+		'''
+		with self.lock:
+			if self.statePath is None:
+				return update(self.state, self._Now())
+
+			with open(self.statePath + '.lock', 'a') as lockFile:
+				fcntl.flock(lockFile.fileno(), fcntl.LOCK_EX)
+				try:
+					try:
+						with open(self.statePath, 'r') as f:
+							self.state = json.load(f)
+					except (FileNotFoundError, json.JSONDecodeError):
+						self.state = self._InitState()
+
+					oldState = dict(self.state)
+					res = update(self.state, self._Now())
+
+					if self.state != oldState:
+						tmpPath = f'{self.statePath}.{os.getpid()}.tmp'
+						with open(tmpPath, 'w') as f:
+							json.dump(self.state, f)
+						os.replace(tmpPath, self.statePath)
+				finally:
+					fcntl.flock(lockFile.fileno(), fcntl.LOCK_UN)
+			return res
+
+	def Reserve(self, tokens: float=1.0) -> float:
+		'''
+		Take `tokens` from the bucket, and return how long (in seconds) the
+		caller has to wait before sending the request.
+		Reservations are served in order; the bucket may go into debt,
+		which later reservations have to wait for.
+		'''
+		def _Reserve(state: dict, now: float) -> float:
+			# called with self.lock held
+			if self.pendingIncrease > 0.0:
+				state['rate'] = self._CapRate(
+					state['rate'] + self.pendingIncrease
+				)
+				self.pendingIncrease = 0.0
+
+			rate = state['rate']
+			elapsed = max(now - state['last'], 0.0)
+			state['tokens'] = min(self.burst, state['tokens'] + elapsed * rate)
+			state['last'] = now
+			state['tokens'] -= tokens
+
+			wait = 0.0
+			if state['tokens'] < 0.0:
+				wait = -state['tokens'] / rate
+			return max(wait, state['blockedUntil'] - now)
+
+		wait = self._Update(_Reserve)
+
+		with self.lock:
+			self.numAcquired += 1
+			self.totalWait += wait
+
+		return wait
+
+	def Acquire(self, tokens: float=1.0) -> float:
+		'''
+		Block until `tokens` are available; returns the time waited.
+		'''
+		wait = self.Reserve(tokens)
+		if wait > 0.0:
+			time.sleep(wait)
+		return wait
+
+	def _CapRate(self, rate: float) -> float:
+		return rate if self.maxRate is None else min(self.maxRate, rate)
+
+	def OnSuccess(self) -> None:
+		'''
+		The server accepted a request; the rate grows by `increaseStep`,
+		from the next reservation on.
+		'''
+		with self.lock:
+			self.pendingIncrease += self.increaseStep
+
+	def OnThrottled(self, retryAfter: Union[float, None]=None) -> None:
+		'''
+		The server throttled a request; slow down, and hold all requests for
+		`retryAfter` seconds if given.
+		'''
+		def _Decrease(state: dict, now: float) -> float:
+			# the successes before the throttling don't count
+			self.pendingIncrease = 0.0
+			state['rate'] = max(self.minRate, state['rate'] * self.decreaseFactor)
+			# start over with no burst
+			state['tokens'] = min(state['tokens'], 0.0)
+			if retryAfter is not None:
+				state['blockedUntil'] = max(
+					state['blockedUntil'],
+					now + retryAfter
+				)
+			return state['rate']
+
+		rate = self._Update(_Decrease)
+
+		with self.lock:
+			self.numThrottled += 1
+
+		self.logger.warning(
+			f'Requests of {self.name} throttled; rate lowered to {rate:.2f}/s'
+		)
+
+	def GetRate(self) -> float:
+		# including the successes not yet applied
+		return self._Update(
+			lambda state, now: self._CapRate(state['rate'] + self.pendingIncrease)
+		)
+
+	def GetStats(self) -> dict:
+		rate = self.GetRate()
+		with self.lock:
+			return {
+				'rate': rate,
+				'acquired': self.numAcquired,
+				'throttled': self.numThrottled,
+				'totalWait': self.totalWait,
+			}
+
+
+class RateLimiter(object):
+	'''
+	Client-side rate limits of the requests sent to zyBooks, with separate
+	token buckets for API calls (`api`), export status polls (`poll`) and
+	report downloads (`download`).
+	A single limiter can be shared by many `Host` and `AsyncHost` objects,
+	and by many threads.
+	If `lockDir` is given, the buckets are also shared with every process
+	using the same directory.
+
+	`rates` are the starting rates of the buckets, from which they adapt
+	(see `TokenBucket`); they grow without a ceiling, unless `maxRates`
+	gives one.
+	'''
+
+	DEFAULT_RATES = {
+		'api': 10.0,
+		'poll': 5.0,
+		'download': 4.0,
+	}
+
+	DEFAULT_BURSTS = {
+		'api': 10.0,
+		'poll': 5.0,
+		'download': 4.0,
+	}
+
+	THROTTLE_STATUSES = (429, 503)
+
+	def __init__(
+		self,
+		rates: Union[Mapping[str, float], None]=None,
+		bursts: Union[Mapping[str, float], None]=None,
+		lockDir: Union[str, None]=None,
+		minRate: float=0.1,
+		decreaseFactor: float=0.5,
+		increaseStep: float=0.05,
+		maxRates: Union[Mapping[str, float], None]=None,
+	) -> None:
+		super(RateLimiter, self).__init__()
+
+		self.rates = dict(self.DEFAULT_RATES)
+		if rates is not None:
+			self.rates.update(rates)
+		self.bursts = dict(self.DEFAULT_BURSTS)
+		if bursts is not None:
+			self.bursts.update(bursts)
+		self.maxRates = {} if maxRates is None else dict(maxRates)
+		self.lockDir = lockDir
+
+		if self.lockDir is not None:
+			os.makedirs(self.lockDir, exist_ok=True)
+
+		self.buckets = {}
+		for kind, rate in self.rates.items():
+			self.buckets[kind] = TokenBucket(
+				name=kind,
+				rate=rate,
+				burst=self.bursts.get(kind, max(rate, 1.0)),
+				minRate=minRate,
+				decreaseFactor=decreaseFactor,
+				increaseStep=increaseStep,
+				maxRate=self.maxRates.get(kind, None),
+				statePath=(
+					None if self.lockDir is None else
+					os.path.join(self.lockDir, f'{kind}.json')
+				),
+			)
+
+	def __str__(self) -> str:
+		return f'{self.__class__.__name__}(rates={self.rates}, lockDir={self.lockDir})'
+
+	def GetBucket(self, kind: str) -> TokenBucket:
+		if kind not in self.buckets:
+			raise ValueError(f'Unknown request kind: {kind}')
+		return self.buckets[kind]
+
+	def Reserve(self, kind: str) -> float:
+		return self.GetBucket(kind).Reserve()
+
+	def Acquire(self, kind: str) -> float:
+		return self.GetBucket(kind).Acquire()
+
+	@classmethod
+	def ParseRetryAfter(cls, value: Union[str, None]) -> Union[float, None]:
+		'''
+		Parse a `Retry-After` header, given either in seconds or as a date.
+		'''
+		if value is None:
+			return None
+		try:
+			return max(float(value), 0.0)
+		except ValueError:
+			pass
+		try:
+			date = email.utils.parsedate_to_datetime(value)
+		except (TypeError, ValueError):
+			return None
+		return max(date.timestamp() - time.time(), 0.0)
+
+	def OnResponse(
+		self,
+		kind: str,
+		status: int,
+		headers: Union[Mapping[str, str], None]=None,
+	) -> None:
+		'''
+		Feed the status of a response back into the rate of its bucket.
+		'''
+		bucket = self.GetBucket(kind)
+		if status in self.THROTTLE_STATUSES:
+			retryAfter = None
+			if headers is not None:
+				retryAfter = self.ParseRetryAfter(headers.get('Retry-After', None))
+			bucket.OnThrottled(retryAfter)
+		elif status < 400:
+			bucket.OnSuccess()
+
+	def GetStats(self) -> dict:
+		return {
+			kind: bucket.GetStats()
+			for kind, bucket in self.buckets.items()
+		}
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+from typing import BinaryIO, Callable, List, Tuple, Union
+from .Due.Datetime import Datetime
+
+
+class ReportCache(object):
+	'''
+	An on-disk cache of exported report CSVs.
+	Each entry is addressed by the hash of the export parameters, and is
+	stored as a gzip-compressed CSV (`<key>.csv.gz`) plus a small JSON file
+	(`<key>.json`) with the original report filename.
+	Once the total size of the compressed CSVs exceeds `maxBytes`,
+	the least recently used entries are evicted.
+	'''
+
+	def __init__(
+		self,
+		cacheDir: str,
+		maxBytes: int=1024 * 1024 * 1024,
+	) -> None:
+		super(ReportCache, self).__init__()
+
+		self.logger = logging.getLogger(f'{__name__}.{self.__class__.__name__}')
+
+		self.cacheDir = os.path.abspath(cacheDir)
+		self.maxBytes = maxBytes
+		self.lock = threading.Lock()
+
+		os.makedirs(self.cacheDir, exist_ok=True)
+
+	def __str__(self) -> str:
+		return f'ReportCache(cacheDir={self.cacheDir}, maxBytes={self.maxBytes})'
+
+	@classmethod
+	def MakeKey(
+		cls,
+		courseCode: str,
+		secIds: List[int],
+		date: Datetime,
+		includeTimeSpent: bool,
+	) -> str:
+		keyStr = json.dumps(
+			[
+				courseCode,
+				list(secIds),
+				date.GetUtcTimestampStr(),
+				date.GetTimezoneAbbr(),
+				date.GetZyTimezoneOffsetMin(),
+				bool(includeTimeSpent),
+			],
+			separators=(',', ':'),
+		)
+		return hashlib.sha256(keyStr.encode('utf-8')).hexdigest()
+
+	def _GetCsvPath(self, key: str) -> str:
+		return os.path.join(self.cacheDir, f'{key}.csv.gz')
+
+	def _GetMetaPath(self, key: str) -> str:
+		return os.path.join(self.cacheDir, f'{key}.json')
+
+	def Get(self, key: str) -> Union[Tuple[str, str], None]:
+		'''
+		Returns the report filename and the path to the compressed CSV,
+		or None if the entry is not in the cache.
+		The entry isn't held, so a concurrent `Put` or eviction may remove
+		the CSV before it's read, i.e., readers must handle
+		`FileNotFoundError`.
+		'''
+		csvPath = self._GetCsvPath(key)
+		metaPath = self._GetMetaPath(key)
+
+		with self.lock:
+			try:
+				with open(metaPath, 'r') as f:
+					meta = json.load(f)
+				# refresh the access time for LRU eviction
+				os.utime(csvPath)
+			except FileNotFoundError:
+				return None
+
+		self.logger.debug(f'Report cache hit: {meta["filename"]}')
+		return meta['filename'], csvPath
+
+	def Put(self, key: str, filename: str, csvFile: BinaryIO) -> None:
+		'''
+		Store the CSV read from the binary file `csvFile`, which is
+		compressed chunk by chunk rather than loaded into memory at once.
+		'''
+		csvPath = self._GetCsvPath(key)
+		metaPath = self._GetMetaPath(key)
+
+		# write to temporary files first, so a partially written entry is
+		# never visible to readers
+		csvTmpPath = self._WriteTemp(lambda f: self._Compress(csvFile, f))
+		try:
+			metaTmpPath = self._WriteTemp(
+				lambda f: f.write(
+					json.dumps({ 'filename': filename }).encode('utf-8')
+				)
+			)
+		except BaseException:
+			os.remove(csvTmpPath)
+			raise
+
+		with self.lock:
+			os.replace(csvTmpPath, csvPath)
+			os.replace(metaTmpPath, metaPath)
+
+			self._Evict()
+
+	def Invalidate(self, key: str) -> None:
+		with self.lock:
+			self._Remove(key)
+
+	def GetSize(self) -> int:
+		with self.lock:
+			return sum(size for _, size, _ in self._ListEntries())
+
+	@classmethod
+	def _Compress(cls, src: BinaryIO, dest: BinaryIO) -> None:
+		with gzip.GzipFile(fileobj=dest, mode='wb') as gzFile:
+			shutil.copyfileobj(src, gzFile)
+
+	def _WriteTemp(self, writer: Callable[[BinaryIO], None]) -> str:
+		fd, tmpPath = tempfile.mkstemp(dir=self.cacheDir, suffix='.tmp')
+		try:
+			with os.fdopen(fd, 'wb') as f:
+				writer(f)
+		except BaseException:
+			os.remove(tmpPath)
+			raise
+		return tmpPath
+
+	def _Remove(self, key: str) -> None:
+		for path in (self._GetMetaPath(key), self._GetCsvPath(key)):
+			try:
+				os.remove(path)
+			except FileNotFoundError:
+				pass
+
+	def _ListEntries(self) -> List[Tuple[float, int, str]]:
+		'''
+		Returns (access time, size, key) of all entries in the cache.
+		'''
+		entries = []
+		for name in os.listdir(self.cacheDir):
+			if not name.endswith('.csv.gz'):
+				continue
+			try:
+				stat = os.stat(os.path.join(self.cacheDir, name))
+			except FileNotFoundError:
+				continue
+			key = name[:-len('.csv.gz')]
+			entries.append((stat.st_mtime, stat.st_size, key))
+		return entries
+
+	def _Evict(self) -> None:
+		entries = self._ListEntries()
+		totalSize = sum(size for _, size, _ in entries)
+
+		# least recently used first
+		for _, size, key in sorted(entries):
+			if totalSize <= self.maxBytes:
+				break
+			self.logger.debug(f'Evicting report cache entry: {key}')
+			self._Remove(key)
+			totalSize -= size
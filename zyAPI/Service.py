@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import http.server
+import json
+import logging
+import threading
+import urllib.parse
+
+from typing import Any, BinaryIO, Dict, Tuple, Union
+
+from .Instrumentation import Instrumentation
+from .Interfaces.Assignment import Assignment
+from .Interfaces.Course import Course
+from .Jobs import Job, JobFile, ParseDatetime
+from .SingleFlight import SingleFlight
+from ._LazyModule import LazyModule
+
+
+pandas = LazyModule('pandas')
+
+
+class ExportService(object):
+	'''
+	A long-running export service, which keeps one `Host` (hence its
+	sessions, caches and rate limiter) and the opened courses and
+	assignments warm across requests.
+	Identical requests in flight at the same time share a single export.
+
+	It's configured by a job file (see `Jobs.JobFile`), whose `jobs`, if
+	any, are the assignments opened by `Warm`, and whose `defaults` apply
+	to every request.
+	'''
+
+	def __init__(
+		self,
+		jobFile: JobFile,
+		instrumentation: Union[Instrumentation, None]=None,
+	) -> None:
+		super(ExportService, self).__init__()
+
+		self.logger = logging.getLogger(f'{__name__}.{self.__class__.__name__}')
+
+		self.jobFile = jobFile
+		self.host = jobFile.CreateHost(instrumentation=instrumentation)
+		self.dashboard = jobFile.CreateDashboard(self.host)
+
+		self.lock = threading.Lock()
+		# course key -> course
+		self.courses: Dict[Tuple[str, Any], Course] = {}
+		# (course key, assignment ID) -> assignment
+		self.assignments: Dict[Tuple[Tuple[str, Any], int], Assignment] = {}
+		self.opens = SingleFlight()
+		self.exports = SingleFlight()
+
+	def __str__(self) -> str:
+		return f'{self.__class__.__name__}(host={self.host})'
+
+	@classmethod
+	def _GetCourseKey(cls, spec: dict) -> Tuple[str, Any]:
+		if ('course' in spec) == ('courseId' in spec):
+			raise ValueError('Exactly one of course and courseId must be specified')
+		if 'courseId' in spec:
+			return ('id', int(spec['courseId']))
+		return ('code', str(spec['course']))
+
+	def _OpenCourse(self, courseKey: Tuple[str, Any]) -> Course:
+		kind, value = courseKey
+		if kind == 'id':
+			course = self.dashboard.OpenCourse(courseID=value)
+		else:
+			course = self.dashboard.OpenCourse(courseCode=value)
+		with self.lock:
+			self.courses[courseKey] = course
+		return course
+
+	def GetCourse(self, courseKey: Tuple[str, Any]) -> Course:
+		with self.lock:
+			course = self.courses.get(courseKey)
+		if course is None:
+			course, _ = self.opens.Do(
+				('course', courseKey),
+				self._OpenCourse,
+				courseKey,
+			)
+		return course
+
+	def _OpenAssignment(
+		self,
+		courseKey: Tuple[str, Any],
+		assignmentId: int,
+	) -> Assignment:
+		course = self.GetCourse(courseKey)
+		assignment = course.OpenAssignment(assignmentID=assignmentId)
+		with self.lock:
+			self.assignments[(courseKey, assignmentId)] = assignment
+		return assignment
+
+	def GetAssignment(
+		self,
+		courseKey: Tuple[str, Any],
+		assignmentId: int,
+	) -> Assignment:
+		with self.lock:
+			assignment = self.assignments.get((courseKey, assignmentId))
+		if assignment is None:
+			assignment, _ = self.opens.Do(
+				('assignment', courseKey, assignmentId),
+				self._OpenAssignment,
+				courseKey,
+				assignmentId,
+			)
+		return assignment
+
+	def Warm(self) -> None:
+		'''
+		Open the courses and assignments of the jobs of the job file.
+		'''
+		for job in self.jobFile.jobs:
+			self.GetAssignment(job.GetCourseKey(), job.assignmentId)
+
+	def Refresh(self) -> None:
+		'''
+		Forget the opened courses and assignments, and the cached metadata,
+		e.g., after sections are added to an assignment.
+		'''
+		with self.lock:
+			self.courses.clear()
+			self.assignments.clear()
+		self.host.InvalidateMetadata()
+
+	def ExportReport(self, spec: dict) -> Tuple[str, pandas.DataFrame, bool]:
+		'''
+		Export the report of some sections of a course at a date, e.g.,
+		```
+		{
+			"course": "UCSCCSE101Spring2024",
+			"assignment": 1001,
+			"date": "2024-03-08 23:59:59",
+			"timezone": "America/Los_Angeles"
+		}
+		```
+		The sections are either listed in `sections`, or are those of
+		`assignment`.
+		Returns the report filename and dataframe, as returned by
+		`Course.ExportReportByDate`, and whether the export was shared with
+		another request.
+		'''
+		spec = { **self.jobFile.defaults, **spec }
+		courseKey = self._GetCourseKey(spec)
+		if 'date' not in spec:
+			raise ValueError('date is required')
+		date = ParseDatetime(spec['date'], spec.get('timezone', 'UTC'))
+		includeTimeSpent = bool(spec.get('includeTimeSpent', False))
+
+		if spec.get('sections') is not None:
+			secIds = [ int(secId) for secId in spec['sections'] ]
+			course = self.GetCourse(courseKey)
+		elif spec.get('assignment') is not None:
+			assignment = self.GetAssignment(courseKey, int(spec['assignment']))
+			secIds = assignment.sections.GetIdList()
+			course = assignment.course
+		else:
+			raise ValueError('Either sections or assignment must be specified')
+		# the same sections in any order are the same report, with the same
+		# columns, and the same entry in the report cache
+		secIds = sorted(set(secIds))
+
+		key = (
+			'report',
+			courseKey,
+			tuple(secIds),
+			date.GetReportKey(),
+			includeTimeSpent,
+		)
+		(filename, df), shared = self.exports.Do(
+			key,
+			course.ExportReportByDate,
+			date=date,
+			secIds=secIds,
+			includeTimeSpent=includeTimeSpent,
+		)
+		return filename, df, shared
+
+	def ExportJob(self, spec: dict) -> Tuple[str, pandas.DataFrame, bool]:
+		'''
+		Export the report of an assignment with its dues applied, where
+		`spec` is a job as in a job file (see `Jobs.Job`).
+		Returns the report filename and dataframe, as returned by
+		`Assignment.ExportReportWithDues`, and whether the export was shared
+		with another request.
+		'''
+		spec = { **self.jobFile.defaults, **spec }
+		job = Job.FromDict(spec, {}, 0)
+		assignment = self.GetAssignment(job.GetCourseKey(), job.assignmentId)
+
+		# the name and output of a job don't change its report;
+		# dates from YAML job files are keyed by their string form
+		key = (
+			'job',
+			json.dumps(
+				{
+					k: v for k, v in spec.items()
+					if k not in ('name', 'output', 'format')
+				},
+				sort_keys=True,
+				default=str,
+			),
+		)
+		(filename, df), shared = self.exports.Do(
+			key,
+			assignment.ExportReportWithDues,
+			dues=job.dues,
+			includeTimeSpent=job.includeTimeSpent,
+			maxWorkers=self.jobFile.sectionWorkers,
+		)
+		return filename, df, shared
+
+	def GetStats(self) -> dict:
+		with self.lock:
+			numCourses = len(self.courses)
+			numAssignments = len(self.assignments)
+		return {
+			'courses': numCourses,
+			'assignments': numAssignments,
+			'exports': self.exports.GetStats(),
+			'host': self.host.GetStats(),
+		}
+
+
+class ExportServer(object):
+	'''
+	An HTTP front end of an `ExportService`, on a `ThreadingHTTPServer`,
+	listening on localhost by default, since it has no authentication of
+	its own.
+
+	- `POST /v1/report`: see `ExportService.ExportReport`;
+	- `POST /v1/job`: see `ExportService.ExportJob`;
+	- `POST /v1/refresh`: see `ExportService.Refresh`;
+	- `GET /v1/stats`: the stats of the service.
+
+	Reports are returned as CSV, with the `X-ZyAPI-Filename` and
+	`X-ZyAPI-Shared` headers; errors as JSON `{"success": false, "error"}`.
+
+	Exports run on a pool of `maxJobs` threads (`maxWorkers` of the job
+	file by default), with up to `maxQueuedJobs` more waiting for a
+	thread; beyond that, requests are turned away with 503.
+	'''
+
+	def __init__(
+		self,
+		service: ExportService,
+		address: str='127.0.0.1',
+		port: int=8765,
+		maxJobs: Union[int, None]=None,
+		maxQueuedJobs: int=16,
+	) -> None:
+		super(ExportServer, self).__init__()
+
+		self.logger = logging.getLogger(f'{__name__}.{self.__class__.__name__}')
+
+		maxJobs = service.jobFile.maxWorkers if maxJobs is None else maxJobs
+		if maxJobs < 1:
+			raise ValueError('maxJobs must be at least 1')
+		if maxQueuedJobs < 0:
+			raise ValueError('maxQueuedJobs must not be negative')
+
+		self.service = service
+		self.statsLock = threading.Lock()
+		self.stats = collections.Counter()
+
+		self.maxJobs = maxJobs
+		self.maxQueuedJobs = maxQueuedJobs
+		# running and queued exports
+		self.jobSlots = threading.BoundedSemaphore(maxJobs + maxQueuedJobs)
+		self.executor = concurrent.futures.ThreadPoolExecutor(
+			max_workers=maxJobs,
+			thread_name_prefix=f'{self.__class__.__name__}Job',
+		)
+
+		self.server = http.server.ThreadingHTTPServer(
+			(address, port),
+			self._MakeHandler(),
+		)
+		self.server.daemon_threads = True
+		self.thread = None
+
+	def __enter__(self) -> 'ExportServer':
+		self.Start()
+		return self
+
+	def __exit__(self, excType, excValue, traceback) -> None:
+		self.Stop()
+
+	def GetHost(self) -> str:
+		address, port = self.server.server_address[:2]
+		return f'{address}:{port}'
+
+	def GetBaseUrl(self) -> str:
+		return f'http://{self.GetHost()}'
+
+	def Start(self) -> None:
+		self.thread = threading.Thread(
+			target=self.server.serve_forever,
+			name=f'{self.__class__.__name__}',
+			daemon=True,
+		)
+		self.thread.start()
+
+	def Stop(self) -> None:
+		self.server.shutdown()
+		self.server.server_close()
+		if self.thread is not None:
+			self.thread.join()
+			self.thread = None
+		self.executor.shutdown(wait=True, cancel_futures=True)
+
+	def GetStats(self) -> dict:
+		with self.statsLock:
+			requests = dict(self.stats)
+		return { 'requests': requests, **self.service.GetStats() }
+
+	def _Route(
+		self,
+		method: str,
+		path: str,
+		body: Union[dict, None],
+	) -> Tuple[int, dict, Union[bytes, dict]]:
+		'''
+		Returns the status, headers and body of the response.
+		'''
+		if (method, path) == ('GET', '/v1/stats'):
+			return 200, {}, { 'success': True, 'stats': self.GetStats() }
+		if (method, path) == ('POST', '/v1/refresh'):
+			self.service.Refresh()
+			return 200, {}, { 'success': True }
+
+		if (method, path) == ('POST', '/v1/report'):
+			export = self.service.ExportReport
+		elif (method, path) == ('POST', '/v1/job'):
+			export = self.service.ExportJob
+		else:
+			return 404, {}, { 'success': False, 'error': f'{method} {path}' }
+
+		if not isinstance(body, dict):
+			raise ValueError('The request body must be a JSON object')
+
+		if not self.jobSlots.acquire(blocking=False):
+			return 503, { 'Retry-After': '1' }, {
+				'success': False,
+				'error': 'Too many jobs, try again later',
+			}
+		def _Export() -> Tuple[str, pandas.DataFrame, bool]:
+			try:
+				return export(body)
+			finally:
+				self.jobSlots.release()
+
+		try:
+			future = self.executor.submit(_Export)
+		except BaseException:
+			self.jobSlots.release()
+			raise
+		filename, df, shared = future.result()
+		headers = {
+			'Content-Type': 'text/csv',
+			'X-ZyAPI-Filename': filename,
+			'X-ZyAPI-Shared': 'true' if shared else 'false',
+		}
+		# the index of the report of a job (primary_email) is what
+		# identifies each student; a raw report has a plain range index
+		csv = df.to_csv(index=(df.index.name is not None))
+		return 200, headers, csv.encode('utf-8')
+
+	@classmethod
+	def _ReadBody(cls, contentLength: Union[str, None], rfile: BinaryIO) -> bytes:
+		try:
+			length = int(contentLength or 0)
+		except ValueError:
+			raise ValueError(f'Invalid Content-Length: {contentLength}')
+		if length < 0:
+			raise ValueError(f'Invalid Content-Length: {contentLength}')
+		return rfile.read(length) if length > 0 else b''
+
+	def _Handle(
+		self,
+		method: str,
+		path: str,
+		contentLength: Union[str, None],
+		rfile: BinaryIO,
+	) -> Tuple[int, dict, bytes]:
+		try:
+			rawBody = self._ReadBody(contentLength, rfile)
+		except ValueError as e:
+			# the rest of the request can't be told from the next one
+			rawBody = None
+			status, headers = 400, { 'Connection': 'close' }
+			respBody = { 'success': False, 'error': str(e) }
+
+		try:
+			if rawBody is not None:
+				body = json.loads(rawBody) if len(rawBody) > 0 else None
+				status, headers, respBody = self._Route(method, path, body)
+		except (ValueError, KeyError, TypeError) as e:
+			status, headers = 400, {}
+			respBody = { 'success': False, 'error': str(e) }
+		except Exception as e:
+			self.logger.exception(f'{method} {path} failed')
+			status, headers = 500, {}
+			respBody = { 'success': False, 'error': str(e) }
+
+		with self.statsLock:
+			self.stats[f'{method} {path}'] += 1
+			self.stats[f'status.{status}'] += 1
+
+		if isinstance(respBody, dict):
+			respBody = json.dumps(respBody).encode('utf-8')
+			headers = { 'Content-Type': 'application/json', **headers }
+		return status, headers, respBody
+
+	def _MakeHandler(self) -> type:
+		server = self
+
+		class _Handler(http.server.BaseHTTPRequestHandler):
+
+			protocol_version = 'HTTP/1.1'
+
+			def log_message(self, format: str, *args) -> None:
+				server.logger.debug(format % args)
+
+			def _Respond(self, method: str) -> None:
+				path = urllib.parse.urlsplit(self.path).path
+
+				status, headers, body = server._Handle(
+					method,
+					path,
+					self.headers.get('Content-Length', None),
+					self.rfile,
+				)
+
+				self.send_response(status)
+				for name, value in headers.items():
+					self.send_header(name, value)
+				self.send_header('Content-Length', str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def do_GET(self) -> None:
+				self._Respond('GET')
+
+			def do_POST(self) -> None:
+				self._Respond('POST')
+
+		return _Handler
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import concurrent.futures
+import threading
+
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight(object):
+	'''
+	Coalesces concurrent calls with the same key: while a call of a key is
+	in flight, later calls of the same key wait for it, and get its result
+	(or its exception) instead of making their own.
+	Once a call finishes, the next call of its key starts a new one, i.e.,
+	results are not cached.
+	'''
+
+	def __init__(self) -> None:
+		super(SingleFlight, self).__init__()
+
+		self.lock = threading.Lock()
+		# key -> future of the call in flight
+		self.calls: Dict[Hashable, concurrent.futures.Future] = {}
+		self.numCalls = 0
+		self.numShared = 0
+
+	def __str__(self) -> str:
+		return f'{self.__class__.__name__}(inFlight={self.GetNumInFlight()})'
+
+	def GetNumInFlight(self) -> int:
+		with self.lock:
+			return len(self.calls)
+
+	def GetStats(self) -> dict:
+		with self.lock:
+			return {
+				'inFlight': len(self.calls),
+				'calls': self.numCalls,
+				'shared': self.numShared,
+			}
+
+	def Do(
+		self,
+		key: Hashable,
+		func: Callable[..., Any],
+		*args,
+		**kwargs,
+	) -> Tuple[Any, bool]:
+		'''
+		Returns the result of `func(*args, **kwargs)`, or of the call of
+		the same key in flight, and whether the result is shared with
+		another caller.
+		'''
+		with self.lock:
+			self.numCalls += 1
+			future = self.calls.get(key)
+			isLeader = future is None
+			if isLeader:
+				future = concurrent.futures.Future()
+				self.calls[key] = future
+			else:
+				self.numShared += 1
+
+		if not isLeader:
+			return future.result(), True
+
+		try:
+			result = func(*args, **kwargs)
+		except BaseException as e:
+			future.set_exception(e)
+			raise
+		else:
+			future.set_result(result)
+		finally:
+			with self.lock:
+				del self.calls[key]
+
+		return result, False
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+from __future__ import annotations
+
+import collections
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from typing import List, Tuple, Union
+from .Due.Datetime import Datetime
+from ._LazyModule import LazyModule
+
+
+numpy = LazyModule('numpy')
+pandas = LazyModule('pandas')
+
+
+class SnapshotStore(object):
+	'''
+	An on-disk store of the reports of assignments
+	(as returned by `Assignment.ExportReportByDate`) at many dates,
+	e.g., to plot the progress of a class over a term.
+
+	The snapshots of each assignment are kept in their own directory, as
+	compressed `.npz` files, plus an `index.json` listing them.
+	A snapshot is either a keyframe, which holds the whole report,
+	or a delta, which references the snapshot it is based on and only holds
+	the cells that changed since then.
+	A new keyframe is written once a chain of deltas reaches
+	`keyframeInterval` snapshots, or when the students or the columns change.
+	'''
+
+	ID_COLS = [ 'last_name', 'first_name', 'school_email' ]
+
+	def __init__(
+		self,
+		storeDir: str,
+		keyframeInterval: int=16,
+		maxDecoded: int=8,
+	) -> None:
+		super(SnapshotStore, self).__init__()
+
+		if keyframeInterval < 1:
+			raise ValueError('keyframeInterval must be at least 1')
+
+		self.logger = logging.getLogger(f'{__name__}.{self.__class__.__name__}')
+
+		self.storeDir = os.path.abspath(storeDir)
+		self.keyframeInterval = keyframeInterval
+		self.maxDecoded = maxDecoded
+
+		self.lock = threading.RLock()
+		# assignment directory -> index
+		self.indexes = {}
+		# (assignment directory, snapshot key) -> decoded snapshot,
+		# least recently used first
+		self.decoded = collections.OrderedDict()
+
+		os.makedirs(self.storeDir, exist_ok=True)
+
+	def __str__(self) -> str:
+		return (
+			f'{self.__class__.__name__}' +
+			f'(storeDir={self.storeDir}, ' +
+			f'keyframeInterval={self.keyframeInterval})'
+		)
+
+	@classmethod
+	def _GetSnapshotKey(cls, date: Datetime) -> str:
+		return json.dumps(date.GetReportKey(), separators=(',', ':'))
+
+	def _GetAsgDir(self, assignment: 'Assignment') -> str:
+		return os.path.join(
+			self.storeDir,
+			f'{assignment.course.code}_{assignment.id}'
+		)
+
+	def _GetIndex(self, asgDir: str) -> dict:
+		'''
+		Returns the index of the assignment,
+		i.e., snapshot key -> {
+			'utc': str, 'file': str, 'base': str|None, 'depth': int,
+			'filename': str
+		}
+		'''
+		if asgDir not in self.indexes:
+			try:
+				with open(os.path.join(asgDir, 'index.json'), 'r') as f:
+					self.indexes[asgDir] = json.load(f)
+			except FileNotFoundError:
+				self.indexes[asgDir] = {}
+		return self.indexes[asgDir]
+
+	def _SaveIndex(self, asgDir: str, index: dict) -> None:
+		fd, tmpPath = tempfile.mkstemp(dir=asgDir, suffix='.tmp')
+		try:
+			with os.fdopen(fd, 'w') as f:
+				json.dump(index, f, indent='\t')
+			os.replace(tmpPath, os.path.join(asgDir, 'index.json'))
+		except BaseException:
+			os.remove(tmpPath)
+			raise
+
+	@classmethod
+	def _GetSortedKeys(cls, index: dict) -> List[str]:
+		# UTC timestamps in the same format sort chronologically as strings
+		return sorted(index.keys(), key=lambda k: (index[k]['utc'], k))
+
+	@classmethod
+	def _FindKeyAt(cls, index: dict, date: Datetime) -> Union[str, None]:
+		'''
+		The key of the latest snapshot at or before the given date.
+		'''
+		utc = date.GetUtcTimestampStr()
+		found = None
+		for key in cls._GetSortedKeys(index):
+			if index[key]['utc'] > utc:
+				break
+			found = key
+		return found
+
+	def HasSnapshot(self, assignment: 'Assignment', date: Datetime) -> bool:
+		with self.lock:
+			index = self._GetIndex(self._GetAsgDir(assignment))
+			return self._GetSnapshotKey(date) in index
+
+	def ListSnapshots(self, assignment: 'Assignment') -> List[Tuple[str, str]]:
+		'''
+		Returns the (UTC timestamp, report filename) of every snapshot of the
+		assignment, in chronological order.
+		'''
+		with self.lock:
+			index = self._GetIndex(self._GetAsgDir(assignment))
+			return [
+				(index[key]['utc'], index[key]['filename'])
+				for key in self._GetSortedKeys(index)
+			]
+
+	def Update(
+		self,
+		assignment: 'Assignment',
+		dates: List[Datetime],
+		**exportKwargs,
+	) -> List[Datetime]:
+		'''
+		Export and store the reports of the dates that are not in the store
+		yet, in chronological order; `exportKwargs` are passed to
+		`assignment.ExportReportByDate`.
+		Returns the dates that were exported.
+		Reports of dates in the future may still change, so they are not
+		accepted.
+		'''
+		missing = {}
+		for date in dates:
+			if not self.HasSnapshot(assignment, date):
+				missing.setdefault(self._GetSnapshotKey(date), date)
+		missing = sorted(
+			missing.values(),
+			key=lambda d: d.GetUtcTimestampStr(),
+		)
+
+		for date in missing:
+			if not date.IsPast():
+				raise ValueError(f'Unable to store a snapshot of the future: {date}')
+
+		for date in missing:
+			filename, df = assignment.ExportReportByDate(
+				date=date,
+				**exportKwargs
+			)
+			self.Put(assignment, date, filename, df)
+
+		return missing
+
+	def Put(
+		self,
+		assignment: 'Assignment',
+		date: Datetime,
+		filename: str,
+		df: pandas.DataFrame,
+	) -> None:
+		snapshot = self._Encode(df)
+		asgDir = self._GetAsgDir(assignment)
+		key = self._GetSnapshotKey(date)
+		utc = date.GetUtcTimestampStr()
+
+		with self.lock:
+			os.makedirs(asgDir, exist_ok=True)
+			index = self._GetIndex(asgDir)
+
+			for entry in index.values():
+				if entry['base'] == key:
+					raise RuntimeError(
+						f'Unable to replace snapshot {filename}, which other snapshots are based on'
+					)
+
+			# base it on the previous snapshot in time
+			baseKey = None
+			for k in self._GetSortedKeys(index):
+				if (k != key) and (index[k]['utc'] <= utc):
+					baseKey = k
+
+			arrays = None
+			depth = 0
+			if (
+				(baseKey is not None) and
+				(index[baseKey]['depth'] + 1 < self.keyframeInterval)
+			):
+				base = self._Decode(asgDir, index, baseKey)
+				arrays = self._EncodeDelta(snapshot, base)
+				depth = index[baseKey]['depth'] + 1
+			if arrays is None:
+				baseKey = None
+				depth = 0
+				arrays = self._EncodeKeyframe(snapshot)
+
+			fileName = hashlib.sha256(key.encode('utf-8')).hexdigest()[:32] + '.npz'
+			self._WriteNpz(asgDir, fileName, arrays)
+
+			index[key] = {
+				'utc': utc,
+				'file': fileName,
+				'base': baseKey,
+				'depth': depth,
+				'filename': filename,
+			}
+			self._SaveIndex(asgDir, index)
+
+			self.decoded.pop((asgDir, key), None)
+			self._CacheDecoded((asgDir, key), snapshot)
+
+			self.logger.debug(
+				f'Stored {"delta" if baseKey else "keyframe"} snapshot {filename}'
+			)
+
+	def GetClassAt(
+		self,
+		assignment: 'Assignment',
+		date: Datetime,
+	) -> Union[pandas.DataFrame, None]:
+		'''
+		The report of the whole class as of the given date,
+		i.e., the latest snapshot at or before it,
+		or None if there is no such snapshot.
+		'''
+		with self.lock:
+			asgDir = self._GetAsgDir(assignment)
+			index = self._GetIndex(asgDir)
+			key = self._FindKeyAt(index, date)
+			if key is None:
+				return None
+			return self._ToDataFrame(self._Decode(asgDir, index, key))
+
+	def GetStudentAt(
+		self,
+		assignment: 'Assignment',
+		email: str,
+		date: Datetime,
+	) -> Union[pandas.Series, None]:
+		'''
+		The points of a student (by primary email) as of the given date,
+		or None if the student or the snapshot is not found.
+		'''
+		with self.lock:
+			asgDir = self._GetAsgDir(assignment)
+			index = self._GetIndex(asgDir)
+			key = self._FindKeyAt(index, date)
+			if key is None:
+				return None
+			snapshot = self._Decode(asgDir, index, key)
+
+		rows = numpy.flatnonzero(snapshot['emails'] == email)
+		if len(rows) == 0:
+			return None
+		return pandas.Series(
+			snapshot['values'][rows[0]],
+			index=snapshot['valueCols'],
+			name=email,
+		)
+
+	def GetStudentHistory(
+		self,
+		assignment: 'Assignment',
+		email: str,
+		column: str='total',
+	) -> pandas.Series:
+		'''
+		The value of a column of a student (by primary email) in every
+		snapshot, indexed by UTC timestamp; NaN where the student is absent.
+		'''
+		times = []
+		values = []
+		with self.lock:
+			asgDir = self._GetAsgDir(assignment)
+			index = self._GetIndex(asgDir)
+			# in chronological order, each delta is usually based on the
+			# previously decoded snapshot
+			for key in self._GetSortedKeys(index):
+				snapshot = self._Decode(asgDir, index, key)
+				value = numpy.nan
+				rows = numpy.flatnonzero(snapshot['emails'] == email)
+				cols = numpy.flatnonzero(snapshot['valueCols'] == column)
+				if (len(rows) > 0) and (len(cols) > 0):
+					value = snapshot['values'][rows[0], cols[0]]
+				times.append(index[key]['utc'])
+				values.append(value)
+
+		return pandas.Series(
+			values,
+			index=pandas.to_datetime(times, utc=True),
+			name=email,
+			dtype=float,
+		)
+
+	@classmethod
+	def _EncodeStrs(cls, values: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+		isNull = pandas.isna(values)
+		strs = numpy.where(isNull, '', values).astype(str)
+		return strs, isNull
+
+	@classmethod
+	def _DecodeStrs(cls, strs: numpy.ndarray, isNull: numpy.ndarray) -> numpy.ndarray:
+		return numpy.where(isNull, numpy.nan, strs.astype(object))
+
+	@classmethod
+	def _Encode(cls, df: pandas.DataFrame) -> dict:
+		valueCols = [ c for c in df.columns if c not in cls.ID_COLS ]
+		snapshot = {
+			'emails': df.index.to_numpy().astype(str),
+			'columns': numpy.array(df.columns, dtype=str),
+			'valueCols': numpy.array(valueCols, dtype=str),
+			'values': df[valueCols].to_numpy(dtype=float),
+		}
+		for col in cls.ID_COLS:
+			snapshot[col], snapshot[f'{col}_null'] = cls._EncodeStrs(
+				df[col].to_numpy()
+			)
+		return snapshot
+
+	@classmethod
+	def _EncodeKeyframe(cls, snapshot: dict) -> dict:
+		return dict(snapshot)
+
+	@classmethod
+	def _EncodeDelta(cls, snapshot: dict, base: dict) -> Union[dict, None]:
+		'''
+		The cells that changed since the base snapshot,
+		or None if a keyframe is needed.
+		'''
+		for name, arr in snapshot.items():
+			if name == 'values':
+				continue
+			if not numpy.array_equal(arr, base[name]):
+				return None
+
+		values = snapshot['values']
+		baseValues = base['values']
+		changed = ~(
+			(values == baseValues) |
+			(numpy.isnan(values) & numpy.isnan(baseValues))
+		)
+		rows, cols = numpy.nonzero(changed)
+		if len(rows) * 3 > values.size:
+			# barely smaller than the keyframe
+			return None
+
+		return {
+			'rows': rows.astype(numpy.int32),
+			'cols': cols.astype(numpy.int32),
+			'vals': values[rows, cols],
+		}
+
+	def _WriteNpz(self, asgDir: str, fileName: str, arrays: dict) -> None:
+		fd, tmpPath = tempfile.mkstemp(dir=asgDir, suffix='.tmp')
+		try:
+			with os.fdopen(fd, 'wb') as f:
+				numpy.savez_compressed(f, **arrays)
+			os.replace(tmpPath, os.path.join(asgDir, fileName))
+		except BaseException:
+			os.remove(tmpPath)
+			raise
+
+	def _CacheDecoded(self, cacheKey: Tuple[str, str], snapshot: dict) -> None:
+		self.decoded[cacheKey] = snapshot
+		self.decoded.move_to_end(cacheKey)
+		while len(self.decoded) > self.maxDecoded:
+			self.decoded.popitem(last=False)
+
+	def _Decode(self, asgDir: str, index: dict, key: str) -> dict:
+		cacheKey = (asgDir, key)
+		if cacheKey in self.decoded:
+			self.decoded.move_to_end(cacheKey)
+			return self.decoded[cacheKey]
+
+		# walk back to the nearest keyframe or decoded snapshot
+		chain = []
+		snapshot = None
+		k = key
+		while True:
+			if (asgDir, k) in self.decoded:
+				snapshot = self.decoded[(asgDir, k)]
+				break
+			entry = index[k]
+			with numpy.load(os.path.join(asgDir, entry['file'])) as npz:
+				arrays = { name: npz[name] for name in npz.files }
+			if entry['base'] is None:
+				snapshot = arrays
+				break
+			chain.append(arrays)
+			k = entry['base']
+
+		# apply the deltas, oldest first
+		for delta in reversed(chain):
+			values = snapshot['values'].copy()
+			values[delta['rows'], delta['cols']] = delta['vals']
+			snapshot = dict(snapshot)
+			snapshot['values'] = values
+
+		self._CacheDecoded(cacheKey, snapshot)
+		return snapshot
+
+	@classmethod
+	def _ToDataFrame(cls, snapshot: dict) -> pandas.DataFrame:
+		data = {}
+		for col in cls.ID_COLS:
+			data[col] = cls._DecodeStrs(snapshot[col], snapshot[f'{col}_null'])
+		for i, col in enumerate(snapshot['valueCols']):
+			data[str(col)] = snapshot['values'][:, i]
+
+		df = pandas.DataFrame(
+			data,
+			index=pandas.Index(
+				snapshot['emails'].astype(object),
+				name='primary_email',
+			),
+		)
+		return df[[ str(c) for c in snapshot['columns'] ]]
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import threading
+import requests
+
+from typing import Iterable, Tuple, Union
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class TransportConfig(object):
+	'''
+	Connection pooling, timeout and retry settings applied to the
+	`requests.Session` objects of a `Host`.
+	Only idempotent methods are retried, on connection errors and on the
+	statuses in `retryStatuses`; the delay between retries grows with
+	`backoffFactor`, unless the server asks for a longer one via
+	`Retry-After`.
+	Requests that aren't idempotent even though they are GETs, i.e., the
+	submission of an export, go through a session mounted with
+	`idempotent=False`, which only retries failed connections, since the
+	request never reached the server then.
+	'''
+
+	# the methods retried by default, and the longest delay between two
+	# retries, as in urllib3
+	RETRY_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+	MAX_BACKOFF = 120.0
+
+	def __init__(
+		self,
+		poolConnections: int=10,
+		poolMaxsize: int=10,
+		connectTimeout: Union[float, None]=10.0,
+		readTimeout: Union[float, None]=60.0,
+		retries: int=3,
+		backoffFactor: float=0.5,
+		retryStatuses: Iterable[int]=(429, 500, 502, 503, 504),
+	) -> None:
+		super(TransportConfig, self).__init__()
+
+		self.poolConnections = poolConnections
+		self.poolMaxsize = poolMaxsize
+		self.connectTimeout = connectTimeout
+		self.readTimeout = readTimeout
+		self.retries = retries
+		self.backoffFactor = backoffFactor
+		self.retryStatuses = tuple(retryStatuses)
+
+	def __str__(self) -> str:
+		return f'{self.__class__.__name__}({self.ToDict()})'
+
+	def ToDict(self) -> dict:
+		return {
+			'poolConnections': self.poolConnections,
+			'poolMaxsize': self.poolMaxsize,
+			'connectTimeout': self.connectTimeout,
+			'readTimeout': self.readTimeout,
+			'retries': self.retries,
+			'backoffFactor': self.backoffFactor,
+			'retryStatuses': list(self.retryStatuses),
+		}
+
+	def GetTimeout(self) -> Tuple[Union[float, None], Union[float, None]]:
+		return (self.connectTimeout, self.readTimeout)
+
+	def CreateRetry(self, idempotent: bool=True) -> Retry:
+		return Retry(
+			total=self.retries,
+			connect=self.retries,
+			read=self.retries if idempotent else 0,
+			status=self.retries if idempotent else 0,
+			other=None if idempotent else 0,
+			allowed_methods=self.RETRY_METHODS,
+			status_forcelist=self.retryStatuses if idempotent else (),
+			backoff_factor=self.backoffFactor,
+			respect_retry_after_header=True,
+			# hand the last response back to the caller once retries run out
+			raise_on_status=False,
+		)
+
+	def GetBackoff(self, numRetries: int) -> float:
+		'''
+		The delay before the `numRetries`-th retry, as in `CreateRetry`:
+		none before the first one, and `backoffFactor * 2 ** (numRetries - 1)`
+		after that.
+		'''
+		if numRetries <= 1:
+			return 0.0
+		return min(self.backoffFactor * (2 ** (numRetries - 1)), self.MAX_BACKOFF)
+
+	def CreateAdapter(self, idempotent: bool=True) -> 'TransportAdapter':
+		return TransportAdapter(
+			timeout=self.GetTimeout(),
+			pool_connections=self.poolConnections,
+			pool_maxsize=self.poolMaxsize,
+			max_retries=self.CreateRetry(idempotent=idempotent),
+		)
+
+	def Mount(
+		self,
+		session: requests.Session,
+		idempotent: bool=True,
+	) -> 'TransportAdapter':
+		adapter = self.CreateAdapter(idempotent=idempotent)
+		session.mount('https://', adapter)
+		session.mount('http://', adapter)
+		return adapter
+
+
+class TransportAdapter(HTTPAdapter):
+	'''
+	An `HTTPAdapter` that applies a default timeout to requests that don't
+	specify one, and counts requests, retries and errors.
+	'''
+
+	def __init__(
+		self,
+		timeout: Tuple[Union[float, None], Union[float, None]],
+		**kwargs,
+	) -> None:
+		super(TransportAdapter, self).__init__(**kwargs)
+
+		self.timeout = timeout
+
+		self.statsLock = threading.Lock()
+		self.numRequests = 0
+		self.numRetries = 0
+		self.numErrors = 0
+
+	def send(self, request, timeout=None, **kwargs) -> requests.Response:
+		if timeout is None:
+			timeout = self.timeout
+
+		with self.statsLock:
+			self.numRequests += 1
+
+		try:
+			resp = super(TransportAdapter, self).send(
+				request,
+				timeout=timeout,
+				**kwargs
+			)
+		except Exception:
+			with self.statsLock:
+				self.numErrors += 1
+			raise
+
+		retries = getattr(resp.raw, 'retries', None)
+		if (retries is not None) and (len(retries.history) > 0):
+			with self.statsLock:
+				self.numRetries += len(retries.history)
+
+		return resp
+
+	def GetStats(self) -> dict:
+		with self.statsLock:
+			return {
+				'requests': self.numRequests,
+				'retries': self.numRetries,
+				'errors': self.numErrors,
+			}
@@ -8,9 +8,16 @@
 ###
 
 
-import pandas
+from __future__ import annotations
+
 import re
 
+from ._LazyModule import LazyModule
+
+
+numpy = LazyModule('numpy')
+pandas = LazyModule('pandas')
+
 
 class Report(object):
 
@@ -27,23 +34,27 @@ class Report(object):
 		Merge primary_email and school_email columns into an email column, by
 		checking if the primary_email is preferredEmailFormat,
 		if not, check if the school_email is preferredEmailFormat,
-		otherwise, keep the primary_email.
+		otherwise, keep the primary_email (also when neither email is
+		preferredEmailFormat, whose email used to be left NaN).
 		'''
 
-		# iterate through the rows
-		for index, row in df.iterrows():
-			# check if the index(primary_email) is preferredEmailFormat
-			if re.search(preferredEmailFormat, index):
-				# if yes, keep index(primary_email) and continue
-				df.at[index, 'email'] = index
-			# check if the school_email is NaN
-			elif pandas.isna(row['school_email']):
-				# if school_email is NaN, keep index(primary_email) and continue
-				df.at[index, 'email'] = index
-			# check if the school_email is preferredEmailFormat
-			elif re.search(preferredEmailFormat, row['school_email']):
-				# if yes, replace index(primary_email) with school_email
-				df.at[index, 'email'] = row['school_email']
+		pattern = re.compile(preferredEmailFormat)
+
+		# check if the index(primary_email) is preferredEmailFormat
+		priMatch = df.index.str.contains(pattern, na=False)
+		# check if the school_email is preferredEmailFormat;
+		# NaN school_email never matches
+		# (cast to object so an all-NaN column still has the .str accessor)
+		schEmails = df['school_email'].astype(object)
+		schMatch = schEmails.str.contains(pattern, na=False).to_numpy(dtype=bool)
+
+		# only replace index(primary_email) with school_email if
+		# the school_email is preferredEmailFormat but the primary_email isn't
+		df['email'] = numpy.where(
+			(~priMatch) & schMatch,
+			schEmails.to_numpy(),
+			df.index.to_numpy(),
+		)
 
 		# drop school_email column
 		df.drop(columns=['school_email'], inplace=True)
@@ -58,7 +69,7 @@ class Report(object):
 		duplicateEmails = df.index.duplicated()
 		if True in duplicateEmails:
 			# get the duplicate emails
-			duplicateEmails = df.loc[duplicateEmails, 'email']
+			duplicateEmails = list(df.index[duplicateEmails])
 			# raise an error
 			raise ValueError(f'Duplicate email after merging the columns: {duplicateEmails}')
 
@@ -80,7 +91,7 @@ class Report(object):
 		duplicateEmails = df.index.duplicated()
 		if True in duplicateEmails:
 			# get the duplicate emails
-			duplicateEmails = df.loc[duplicateEmails, 'email']
+			duplicateEmails = list(df.index[duplicateEmails])
 			raise ValueError(f'Duplicate email after replacing emails by map: {duplicateEmails}')
 
 	@classmethod
@@ -92,13 +103,21 @@ class Report(object):
 		'''
 		Check if the emails in the dataframe match the emailFormat.
 		'''
-		invliadEmails = []
-		for index, row in df.iterrows():
-			if not re.search(emailFormat, index):
-				invliadEmails.append({
-					'email': index,
-					'name': f'{row["first_name"]} {row["last_name"]}'
-				})
+		pattern = re.compile(emailFormat)
+
+		invalid = ~df.index.str.contains(pattern, na=False)
+		invalidDf = df.loc[invalid, ['first_name', 'last_name']]
+		invliadEmails = [
+			{
+				'email': email,
+				'name': f'{fname} {lname}'
+			}
+			for email, fname, lname in zip(
+				invalidDf.index,
+				invalidDf['first_name'],
+				invalidDf['last_name'],
+			)
+		]
 
 		if len(invliadEmails) > 0:
 			raise ValueError(f'Invalid emails: {invliadEmails}')
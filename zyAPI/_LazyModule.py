@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+###
+# Copyright (c) 2024 Haofan Zheng
+# Use of this source code is governed by an MIT-style
+# license that can be found in the LICENSE file or at
+# https://opensource.org/licenses/MIT.
+###
+
+
+import importlib
+import threading
+import types
+
+from typing import Any, Callable, Iterable, List, Tuple
+
+
+class LazyModule(types.ModuleType):
+	'''
+	A stand-in for a heavy module (e.g., pandas), which is only imported on
+	first attribute access, e.g.,
+	```
+	pandas = LazyModule('pandas')
+	```
+	Once loaded, the attributes of the module are copied into the stand-in,
+	so later accesses don't go through `__getattr__`.
+	Modules using it should have `from __future__ import annotations`, so
+	that type annotations don't load the module at import time.
+	'''
+
+	def __init__(self, name: str) -> None:
+		super(LazyModule, self).__init__(name)
+
+		self.__dict__['_lazyLock'] = threading.Lock()
+		self.__dict__['_lazyModule'] = None
+
+	def _Load(self) -> types.ModuleType:
+		with self._lazyLock:
+			if self._lazyModule is None:
+				module = importlib.import_module(self.__name__)
+				self.__dict__.update(module.__dict__)
+				self.__dict__['_lazyModule'] = module
+			return self._lazyModule
+
+	def __getattr__(self, name: str) -> Any:
+		# only called for attributes not (yet) copied from the module,
+		# e.g., submodules imported after it was loaded
+		return getattr(self._Load(), name)
+
+	def __dir__(self) -> List[str]:
+		return dir(self._Load())
+
+
+def LazySubmodules(
+	packageName: str,
+	submodules: Iterable[str],
+) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+	'''
+	The module `__getattr__` and `__dir__` (PEP 562) of a package whose
+	submodules are imported on first access, e.g., `zyAPI.Host`.
+	'''
+	submodules = frozenset(submodules)
+
+	def __getattr__(name: str) -> Any:
+		if name in submodules:
+			return importlib.import_module(f'.{name}', packageName)
+		raise AttributeError(f'module {packageName!r} has no attribute {name!r}')
+
+	def __dir__() -> List[str]:
+		package = importlib.import_module(packageName)
+		return sorted(set(package.__dict__.keys()) | submodules)
+
+	return __getattr__, __dir__
@@ -8,3 +8,28 @@
 ###
 
 
+from ._Meta import __version__
+from ._LazyModule import LazySubmodules
+
+
+# submodules are only imported on first access (e.g., `zyAPI.Host`), so that
+# importing the package doesn't pull in pandas and numpy
+__getattr__, __dir__ = LazySubmodules(__name__, [
+	'AsyncHost',
+	'Auth',
+	'Due',
+	'ExportPoller',
+	'Host',
+	'Instrumentation',
+	'Interfaces',
+	'Jobs',
+	'Journal',
+	'MetadataCache',
+	'RateLimiter',
+	'ReportCache',
+	'SnapshotStore',
+	'Service',
+	'SingleFlight',
+	'Transport',
+	'Utils',
+])
@@ -9,11 +9,92 @@
 
 
 import argparse
+import json
+import logging
+import sys
 
 from ._Meta import __version__
 
 
-def main():
+def RunJobs(args: argparse.Namespace) -> int:
+	# imported here, so that, e.g., `--version` doesn't pay for requests
+	# and pandas
+	from .Instrumentation import MetricsCollector
+	from .Jobs import JobResult, JobRunner, RunJobFile
+
+	def _OnResult(result: JobResult, numDone: int, numJobs: int) -> None:
+		print(f'[{numDone}/{numJobs}] {result}', file=sys.stderr, flush=True)
+
+	metrics = MetricsCollector() if args.metrics else None
+	try:
+		results, summary = RunJobFile(
+			path=args.jobFile,
+			maxWorkers=args.max_workers,
+			outputDir=args.output_dir,
+			outputFormat=args.format,
+			metrics=metrics,
+			onResult=None if args.quiet else _OnResult,
+		)
+	except (OSError, ValueError, RuntimeError) as e:
+		# errors of the job file, or of opening its courses and assignments;
+		# errors of each job are in its result
+		print(f'zyAPI: error: {e}', file=sys.stderr)
+		return 2
+
+	if args.summary_json is not None:
+		if metrics is not None:
+			summary['metrics'] = metrics.GetSummary()
+		with open(args.summary_json, 'w') as f:
+			json.dump(summary, f, indent='\t')
+
+	print(JobRunner.FormatSummary(summary), file=sys.stderr)
+	if metrics is not None:
+		print(metrics.FormatSummary(), file=sys.stderr)
+
+	return 0 if all(result.IsSuccess() for result in results) else 1
+
+
+def Serve(args: argparse.Namespace) -> int:
+	from .Instrumentation import Instrumentation, MetricsCollector
+	from .Jobs import JobFile
+	from .Service import ExportServer, ExportService
+
+	metrics = MetricsCollector() if args.metrics else None
+	try:
+		jobFile = JobFile.FromFile(args.configFile, requireJobs=False)
+		service = ExportService(
+			jobFile,
+			instrumentation=Instrumentation(
+				[ metrics ] if metrics is not None else []
+			),
+		)
+		service.Warm()
+		server = ExportServer(
+			service,
+			address=args.address,
+			port=args.port,
+			maxJobs=args.max_jobs,
+			maxQueuedJobs=args.max_queued_jobs,
+		)
+	except (OSError, ValueError, RuntimeError) as e:
+		print(f'zyAPI: error: {e}', file=sys.stderr)
+		return 2
+
+	print(f'Serving on {server.GetBaseUrl()}', flush=True)
+	try:
+		server.server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server.server_close()
+		server.executor.shutdown(wait=True, cancel_futures=True)
+		if metrics is not None:
+			print(metrics.FormatSummary(), file=sys.stderr)
+
+	return 0
+
+
+def main() -> int:
 	parser = argparse.ArgumentParser(
 		description='zyAPI - A Python package for zyBooks\'s API'
 	)
@@ -23,9 +104,82 @@ def main():
 		action='version',
 		version=f'{__version__}'
 	)
+	parser.add_argument(
+		'--log-level', type=str, default='WARNING',
+		choices=[ 'DEBUG', 'INFO', 'WARNING', 'ERROR' ],
+	)
+
+	subParsers = parser.add_subparsers(dest='command')
+
+	runParser = subParsers.add_parser(
+		'run',
+		help='run the exports of a job file (JSON, or YAML with PyYAML)',
+	)
+	runParser.add_argument('jobFile', type=str)
+	runParser.add_argument(
+		'--max-workers', type=int, default=None,
+		help='the number of jobs run concurrently ' +
+			'(maxWorkers of the job file if not given)'
+	)
+	runParser.add_argument(
+		'--output-dir', type=str, default=None,
+		help='overrides outputDir of the job file'
+	)
+	runParser.add_argument(
+		'--format', type=str, default=None, choices=[ 'csv', 'parquet' ],
+		help='overrides the output format of every job'
+	)
+	runParser.add_argument(
+		'--metrics', action='store_true',
+		help='print the time spent in each stage of the exports'
+	)
+	runParser.add_argument(
+		'--summary-json', type=str, default=None,
+		help='also write the summary of the run to this JSON file'
+	)
+	runParser.add_argument(
+		'--quiet', action='store_true',
+		help='don\'t print the progress of each job'
+	)
+	runParser.set_defaults(func=RunJobs)
+
+	serveParser = subParsers.add_parser(
+		'serve',
+		help='serve exports over HTTP on localhost, keeping sessions, ' +
+			'caches and opened assignments warm',
+	)
+	serveParser.add_argument(
+		'configFile', type=str,
+		help='a job file; its jobs, if any, are opened at start'
+	)
+	serveParser.add_argument('--address', type=str, default='127.0.0.1')
+	serveParser.add_argument('--port', type=int, default=8765)
+	serveParser.add_argument(
+		'--max-jobs', type=int, default=None,
+		help='the number of exports run concurrently ' +
+			'(maxWorkers of the job file if not given)'
+	)
+	serveParser.add_argument(
+		'--max-queued-jobs', type=int, default=16,
+		help='the number of exports waiting to run before requests are ' +
+			'turned away with 503'
+	)
+	serveParser.add_argument(
+		'--metrics', action='store_true',
+		help='print the time spent in each stage of the exports on exit'
+	)
+	serveParser.set_defaults(func=Serve)
 
 	args = parser.parse_args()
 
+	logging.basicConfig(level=getattr(logging, args.log_level))
+
+	if args.command is None:
+		parser.print_help()
+		return 0
+
+	return args.func(args)
+
 
 if __name__ == '__main__':
-	main()
+	sys.exit(main())